@@ -0,0 +1,182 @@
+import hashlib
+import numpy as np
+
+from collections import OrderedDict, namedtuple
+from irmetrics.relevance import multilabel
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def fingerprint(x, content=False):
+    """Compute a hashable fingerprint of an array.
+
+    Parameters
+    ----------
+    x : ndarray
+        The array to fingerprint.
+    content : bool, default=False
+        If False, identify the array by its buffer: the memory address,
+        strides and dtype. Views of the same data that differ only in the
+        number of columns share the fingerprint. If True, hash the content of
+        the array instead.
+
+    Returns
+    -------
+    key : tuple
+        The fingerprint of the array, excluding the last dimension for
+        ``content=False``.
+    n_cols : int
+        The size of the last dimension.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.cache import fingerprint
+    >>> x = np.array([[1, 2, 3]])
+    >>> fingerprint(x)[0] == fingerprint(x[:, :2])[0]
+    True
+    >>> fingerprint(x, content=True) == fingerprint(x.copy(), content=True)
+    True
+    """
+    if not content:
+        address = x.__array_interface__["data"][0]
+        return (address, x.shape[:-1], x.strides, x.dtype.str), x.shape[-1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    if x.dtype == object:
+        digest.update(repr(x.tolist()).encode())
+    else:
+        digest.update(np.ascontiguousarray(x))
+    return (x.shape, x.dtype.str, digest.hexdigest()), x.shape[-1]
+
+
+class RelevanceCache:
+    """Memoize the relevance judgements for the repeated evaluations.
+    The instances of this class are relevance functions themselves: pass one
+    to all metrics calculated for the same inputs, then the judgements are
+    calculated only once. Smaller cutoffs ``k`` reuse the judgements
+    calculated for the larger ones as long as ``y_true`` is the same. The
+    cumulative sums of the judgements are cached as well, `topk.precision`
+    and `topk.recall` read the counts at any cutoff from them.
+
+    The cache keeps the references to the inputs, modifying them in-place
+    requires calling ``invalidate``.
+
+    Parameters
+    ----------
+    relevance : callable, default=topk.relevance.multilabel
+        A function that calculates relevance judgements based on input
+        ``y_pred`` and ``y_true``. The judgement for each position should
+        not depend on the other positions.
+    maxsize : int, default=16
+        The maximal number of cached inputs, the least recently used ones
+        are evicted first.
+    content : bool, default=False
+        Identify the inputs by their content instead of the buffers, see
+        ``irmetrics.cache.fingerprint``. This is needed when the inputs are
+        not numpy arrays (e.g. lists), but requires hashing the data.
+
+    Examples
+    --------
+    >>> from irmetrics.topk import rr, recall
+    >>> from irmetrics.cache import RelevanceCache
+    >>> cache = RelevanceCache()
+    >>> y_true = np.array([1, 2])
+    >>> y_pred = np.array([[0, 1, 4], [2, 1, 0]])
+    >>> rr(y_true, y_pred, relevance=cache)
+    array([0.5, 1. ])
+    >>> recall(y_true, y_pred, k=1, relevance=cache)
+    array([0., 1.])
+    >>> cache.cache_info()
+    CacheInfo(hits=1, misses=1, maxsize=16, currsize=1)
+    """
+
+    def __init__(self, relevance=multilabel, maxsize=16, content=False):
+        self.relevance = relevance
+        self.maxsize = maxsize
+        self.content = content
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __call__(self, y_true, y_pred):
+        relevant, _ = self._lookup(y_true, y_pred)
+        return relevant
+
+    def cumsum(self, y_true, y_pred):
+        """Calculate the number of relevant items at each position.
+
+        Parameters
+        ----------
+        y_true : ndarray of shape (n_samples, n_true)
+            Ground true labels for a given query.
+        y_pred : ndarray of shape (n_samples, n_labels)
+            Target labels sorted by relevance (as returned by an IR system).
+
+        Returns
+        -------
+        cumsum : ndarray of shape (n_samples, n_labels) or None
+            The cumulative sums of the relevance judgements, None if the
+            judgements are not an ndarray (e.g. sparse or packed).
+        """
+        relevant, entry = self._lookup(y_true, y_pred)
+        if not isinstance(entry["relevant"], np.ndarray):
+            return None
+
+        # The binary judgements are counted with the smallest dtype
+        if entry.get("cumsum") is None:
+            judgements = entry["relevant"]
+            dtype = None
+            if judgements.dtype == bool:
+                dtype = np.min_scalar_type(entry["n_cols"])
+            entry["cumsum"] = np.cumsum(judgements, axis=-1, dtype=dtype)
+        return entry["cumsum"][..., :relevant.shape[-1]]
+
+    def invalidate(self, x=None):
+        """Remove the cached judgements.
+
+        Parameters
+        ----------
+        x : ndarray, default=None
+            Remove only the entries that were calculated from ``x`` (either
+            ``y_true`` or ``y_pred``). If None, remove all entries.
+        """
+        if x is None:
+            self._entries.clear()
+            return
+
+        self._entries = OrderedDict(
+            (key, entry) for key, entry in self._entries.items()
+            if not any(np.may_share_memory(x, i) for i in entry["inputs"])
+        )
+
+    def cache_info(self):
+        """Report the cache statistics, the same as ``functools.lru_cache``.
+        """
+        return CacheInfo(
+            self._hits, self._misses, self.maxsize, len(self._entries))
+
+    def _lookup(self, y_true, y_pred):
+        # Different cutoffs also truncate y_true, keep its size in the key
+        key_true = fingerprint(y_true, self.content)
+        key_pred, n_cols = fingerprint(y_pred, self.content)
+        key = (self.relevance, key_true, key_pred)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry["n_cols"] >= n_cols:
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return entry["relevant"][..., :n_cols], entry
+
+        self._misses += 1
+        entry = {
+            "inputs": (y_true, y_pred),
+            "n_cols": n_cols,
+            "relevant": self.relevance(y_true, y_pred),
+        }
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry["relevant"], entry
@@ -0,0 +1,372 @@
+import io
+import os
+import sys
+import shutil
+import zipfile
+import argparse
+import tempfile
+import warnings
+import numpy as np
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from irmetrics import topk
+from irmetrics.io import from_arrow, valid
+from irmetrics.relevance import multilabel
+
+MEASURES = ["rr", "recall", "precision", "ndcg", "ap", "err", "rbp"]
+
+
+class NpySource:
+    """Read the batches of ``.npy`` files, the files are memory-mapped."""
+
+    pad_token = None
+
+    def __init__(self, y_true, y_pred, batch_size):
+        self.y_true = y_true
+        self.y_pred = y_pred
+        self.batch_size = batch_size
+
+    def tasks(self):
+        n_samples = np.load(self.y_pred, mmap_mode="r").shape[0]
+        return range(0, n_samples, self.batch_size)
+
+    def read(self, start):
+        stop = start + self.batch_size
+        return (
+            np.load(self.y_true, mmap_mode="r")[start:stop],
+            np.load(self.y_pred, mmap_mode="r")[start:stop],
+        )
+
+
+class ParquetSource:
+    """Read the row groups of a ``.parquet`` file with list columns."""
+
+    def __init__(self, path, y_true, y_pred, pad_token=None):
+        self.path = path
+        self.y_true = y_true
+        self.y_pred = y_pred
+        self.pad_token = pad_token
+
+    def tasks(self):
+        import pyarrow.parquet as pq
+
+        return range(pq.ParquetFile(self.path).num_row_groups)
+
+    def read(self, group):
+        import pyarrow.parquet as pq
+
+        table = pq.ParquetFile(self.path).read_row_group(
+            group, columns=[self.y_true, self.y_pred])
+        return tuple(
+            self._labels(table.column(name))
+            for name in (self.y_true, self.y_pred)
+        )
+
+    def _labels(self, column):
+        if hasattr(column.type, "value_type"):
+            return from_arrow(column, self.pad_token)
+        return column.to_numpy()
+
+
+class CsvSource:
+    """Read the chunks of a ``.csv`` file, the lists are space-separated.
+    The main process only finds the byte ranges of the chunks (the line
+    breaks), the workers read and parse the ranges themselves. The quoted
+    values can't contain line breaks.
+    """
+
+    # Splitting into columns pads the ragged lists with None
+    pad_token = None
+
+    # The number of bytes scanned for the line breaks at once
+    block_size = 2 ** 24
+
+    def __init__(self, path, y_true, y_pred, batch_size):
+        self.path = path
+        self.y_true = y_true
+        self.y_pred = y_pred
+        self.batch_size = batch_size
+
+    def _line_ends(self):
+        # The positions after each line break, block by block
+        with open(self.path, "rb") as f:
+            offset = 0
+            for block in iter(partial(f.read, self.block_size), b""):
+                data = np.frombuffer(block, dtype=np.uint8)
+                yield np.flatnonzero(data == ord("\n")) + offset + 1
+                offset += len(block)
+
+    def tasks(self):
+        # The first line is the header, the rows are counted after it
+        start, seen = None, 0
+        for ends in self._line_ends():
+            if start is None and ends.size:
+                start, ends = ends[0], ends[1:]
+            for stop in ends[self.batch_size - seen - 1::self.batch_size]:
+                yield start, stop
+                start = stop
+            seen = (seen + ends.size) % self.batch_size
+
+        # The last line may lack the line break
+        size = os.path.getsize(self.path)
+        if start is not None and start < size:
+            yield start, size
+
+    def read(self, task):
+        import pandas as pd
+
+        start, stop = task
+        names = pd.read_csv(self.path, nrows=0).columns
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(stop - start)
+        chunk = pd.read_csv(
+            io.BytesIO(data), header=None, names=names,
+            usecols=[self.y_true, self.y_pred], dtype=str)
+        return tuple(
+            chunk[name].str.split(expand=True).to_numpy()
+            for name in (self.y_true, self.y_pred)
+        )
+
+
+def source(paths, y_true="y_true", y_pred="y_pred", batch_size=65536,
+           pad_token=None):
+    """Choose the reader of the input files by their extensions.
+
+    Parameters
+    ----------
+    paths : list of str
+        Either a single ``.parquet`` or ``.csv`` file with the ``y_true`` and
+        ``y_pred`` columns or two ``.npy`` files with ``y_true`` and
+        ``y_pred`` arrays.
+    y_true : str, default="y_true"
+        The column with the true labels.
+    y_pred : str, default="y_pred"
+        The column with the predicted labels.
+    batch_size : int, default=65536
+        The number of rows in a batch, the parquet files are read by row
+        groups.
+    pad_token : scalar, default=None
+        The value to pad the ragged lists of a parquet file with.
+
+    Returns
+    -------
+    source : NpySource, ParquetSource or CsvSource
+        The reader with the ``tasks`` and ``read`` methods.
+    """
+    if len(paths) == 2 and all(path.endswith(".npy") for path in paths):
+        return NpySource(*paths, batch_size)
+    if len(paths) == 1 and paths[0].endswith(".parquet"):
+        return ParquetSource(paths[0], y_true, y_pred, pad_token)
+    if len(paths) == 1 and paths[0].endswith(".csv"):
+        return CsvSource(paths[0], y_true, y_pred, batch_size)
+    raise ValueError(
+        "Expected a .parquet file, a .csv file or two .npy files, "
+        "got {}".format(paths))
+
+
+def _relevance(y_true, y_pred, pad_token=None):
+    # The padding of y_pred would be relevant to the padding of y_true
+    return multilabel(y_true, y_pred) & valid(y_pred, pad_token)
+
+
+def _kwargs(name, pad_token):
+    kwargs = {"relevance": partial(_relevance, pad_token=pad_token)}
+    if name == "recall":
+        kwargs["pad_token"] = pad_token
+    return kwargs
+
+
+def evaluate(source, task, measures, ks, dedup=False):
+    """Evaluate a single batch of the source, the repeated rows are
+    evaluated once if ``dedup`` is True. The padded positions of the ragged
+    lists are never relevant.
+
+    Returns
+    -------
+    results : dict
+        The per-query values of each measure and cutoff,
+        e.g. ``{"rr@10": ...}``.
+    """
+    y_true, y_pred = source.read(task)
+    return {
+        "{}@{}".format(name, k or "all"): np.atleast_1d(
+            getattr(topk, name)(y_true, y_pred, k, dedup=dedup,
+                                **_kwargs(name, source.pad_token)))
+        for name in measures
+        for k in ks
+    }
+
+
+def _recorded(source, task, measures, ks, dedup):
+    # The warnings of all batches (and workers) are reported once by `run`
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        results = evaluate(source, task, measures, ks, dedup)
+    return results, [(w.category, str(w.message)) for w in caught]
+
+
+def _reported(batches):
+    seen = set()
+    for results, caught in batches:
+        for category, message in caught:
+            if (category, message) not in seen:
+                seen.add((category, message))
+                warnings.warn(message, category, stacklevel=2)
+        yield results
+
+
+def _imap(executor, source, measures, ks, n_jobs, dedup):
+    # Keep a bounded number of the batches in flight, preserving the order
+    pending = deque()
+    for task in source.tasks():
+        pending.append(executor.submit(
+            _recorded, source, task, measures, ks, dedup))
+        if len(pending) >= 2 * n_jobs:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run(source, measures=("rr", "recall"), ks=(None,), n_jobs=1,
+        dedup=False):
+    """Evaluate all batches of the source, possibly in parallel.
+
+    Parameters
+    ----------
+    source : NpySource, ParquetSource or CsvSource
+        The input data, see ``irmetrics.cli.source``.
+    measures : iterable of str, default=("rr", "recall")
+        The names of the measures from `irmetrics.topk`.
+    ks : iterable of int, default=(None,)
+        The cutoffs, None means all outputs.
+    n_jobs : int, default=1
+        The number of worker processes. If 1, evaluate in this process.
+    dedup : bool, default=False
+        Evaluate the repeated rows of a batch once, see
+        ``irmetrics.io.unique_rows``.
+
+    Yields
+    ------
+    results : dict
+        The per-query values for each batch in the order of the inputs. The
+        same warnings of different batches are issued once.
+    """
+    if n_jobs == 1:
+        yield from _reported(
+            _recorded(source, task, measures, ks, dedup)
+            for task in source.tasks()
+        )
+        return
+
+    with ProcessPoolExecutor(n_jobs) as executor:
+        yield from _reported(
+            _imap(executor, source, measures, ks, n_jobs, dedup))
+
+
+class _Writer:
+    # Stream parquet row groups, the npz columns are spooled to temporary
+    # files and copied to the archive at the end
+    def __init__(self, path):
+        self.path = path
+        self.columns = {}
+        self.writer = None
+
+    def write(self, results):
+        if self.path is None:
+            return
+        if not self.path.endswith(".parquet"):
+            self._spool(results)
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table(results)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def _spool(self, results):
+        for name, values in results.items():
+            if name not in self.columns:
+                spool = tempfile.TemporaryFile()
+                self.columns[name] = [spool, values.dtype, 0]
+            column = self.columns[name]
+            column[0].write(np.ascontiguousarray(values, column[1]).tobytes())
+            column[2] += values.size
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if not self.columns:
+            return
+
+        # The same as np.savez, the .npy files of the columns are stored
+        path = self.path if self.path.endswith(".npz") else self.path + ".npz"
+        with zipfile.ZipFile(path, "w", allowZip64=True) as archive:
+            for name, (spool, dtype, size) in self.columns.items():
+                header = {
+                    "descr": np.lib.format.dtype_to_descr(dtype),
+                    "fortran_order": False,
+                    "shape": (size,),
+                }
+                with archive.open(name + ".npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array_header_1_0(f, header)
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, f)
+                spool.close()
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog="irmetrics",
+        description="Evaluate the rankings stored in parquet, csv or npy "
+        "files, the files are read in batches.",
+    )
+    parser.add_argument(
+        "paths", nargs="+",
+        help="a .parquet or .csv file, or the y_true and y_pred .npy files")
+    parser.add_argument("--y-true", default="y_true",
+                        help="the column with the true labels")
+    parser.add_argument("--y-pred", default="y_pred",
+                        help="the column with the predicted labels")
+    parser.add_argument("-m", "--measures", nargs="+", default=["rr"],
+                        choices=MEASURES, help="the measures to calculate")
+    parser.add_argument("-k", nargs="+", type=int, default=[None],
+                        help="the cutoffs")
+    parser.add_argument("-o", "--output",
+                        help="the .parquet or .npz file for per-query results")
+    parser.add_argument("-j", "--n-jobs", type=int, default=1,
+                        help="the number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=65536,
+                        help="the number of rows in a batch")
+    parser.add_argument("--dedup", action="store_true",
+                        help="evaluate the repeated rows of a batch once")
+    parser.add_argument("--pad-token", type=int,
+                        help="the integer label to pad ragged parquet lists")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Run the command-line evaluation, see ``irmetrics --help``."""
+    args = parse_args(args)
+    inputs = source(args.paths, args.y_true, args.y_pred, args.batch_size,
+                    args.pad_token)
+
+    writer = _Writer(args.output)
+    sums, counts = {}, {}
+    batches = run(inputs, args.measures, args.k, args.n_jobs, args.dedup)
+    for results in batches:
+        writer.write(results)
+        for name, values in results.items():
+            finite = values[~np.isnan(values)]
+            sums[name] = sums.get(name, 0.) + finite.sum()
+            counts[name] = counts.get(name, 0) + finite.size
+    writer.close()
+
+    for name in sums:
+        mean = sums[name] / counts[name] if counts[name] else np.nan
+        sys.stdout.write("{}\t{:.6f}\t{}\n".format(name, mean, counts[name]))
@@ -1,6 +1,6 @@
 import numpy as np
-from irmetrics.io import to_scalar, _ensure_io
-from irmetrics.relevance import multilabel, relevant_counts
+from irmetrics.io import to_scalar, _ensure_io, lengths, valid, _encode
+from irmetrics.relevance import multilabel, relevant_counts, _sortable
 
 
 def coverage(y_pred, pad_token=None):
@@ -13,6 +13,7 @@ def coverage(y_pred, pad_token=None):
         Target labels sorted by relevance (as returned by an IR system).
     pad_token : scalar, str, default=None
         The value that was used to pad the predictions to get the same length.
+        See `irmetrics.io.valid` for the details.
 
     Returns
     -------
@@ -39,15 +40,36 @@ def coverage(y_pred, pad_token=None):
     >>> coverage([-1], pad_token=-1)
     0
     """
-    outputs = np.not_equal(y_pred, pad_token).sum(axis=-1) > 0
+    outputs = lengths(np.atleast_1d(y_pred), pad_token) > 0
     return to_scalar(outputs.astype(np.int32))
 
 
+def _labels(x, pad_token):
+    mask = valid(x, pad_token)
+    rows, _ = np.nonzero(mask)
+    return rows, x[mask]
+
+
+def _label_codes(true_labels, pred_labels):
+    # Label encoding makes the sort-merge independent of the dtype
+    if _sortable(true_labels, pred_labels):
+        labels = np.concatenate([true_labels, pred_labels])
+        uniq, codes = np.unique(labels, return_inverse=True)
+        return codes, max(uniq.size, 1)
+
+    # The mixed labels (e.g. str and int) are compared as python objects
+    labels = np.concatenate([
+        true_labels.astype(object), pred_labels.astype(object)])
+    codes = _encode(labels)
+    return codes, int(codes.max(initial=0)) + 1
+
+
 @_ensure_io
-def iou(y_true, y_pred, k=None, relevance=multilabel, n_uniq=relevant_counts):
-    """Compute the approximate version of Intersection over Union.
-    The approximation comes in assumption that `y_true` and `y_pred`
-    contain only unique values.
+def iou(y_true, y_pred, k=None, relevance=multilabel, n_uniq=relevant_counts,
+        pad_token=None):
+    """Compute Intersection over Union of the sets of labels.
+    Duplicates and padding are ignored, so the rows of ``y_true`` and
+    ``y_pred`` may have different number of unique labels.
 
     Parameters
     ----------
@@ -57,12 +79,13 @@ def iou(y_true, y_pred, k=None, relevance=multilabel, n_uniq=relevant_counts):
     y_pred : iterable, ndarray of shape (n_samples, n_labels)
         Target labels sorted by relevance (as returned by an IR system).
     k : int, default=None
-        Has no effect provided only for api compatibility.
+        Only consider the highest k labels. If None, use all outputs.
     relevance : callable, default=topk.relevance.multilabel
-        A function that calculates relevance judgements based on input
-        ``y_pred`` and ``y_true``.
+        Has no effect provided only for api compatibility.
     n_uniq : callable, default=topk.relevance.relevant_counts
-        A function that calculates number of unique labels per query.
+        Has no effect provided only for api compatibility.
+    pad_token : scalar, str, default=None
+        The value that was used to pad the labels to get the same length.
 
     Returns
     -------
@@ -88,20 +111,211 @@ def iou(y_true, y_pred, k=None, relevance=multilabel, n_uniq=relevant_counts):
     >>> y_pred = [0, 1, 4]
     >>> iou(y_true, y_pred)
     0.3333333333333333
+    >>> iou([1, 2, -1], [2, 2, 1], pad_token=-1)
+    1.0
+    """
+    n_samples = max(y_true.shape[0], y_pred.shape[0])
+    y_true = np.broadcast_to(y_true, (n_samples, y_true.shape[-1]))
+    y_pred = np.broadcast_to(y_pred, (n_samples, y_pred.shape[-1]))
+
+    true_rows, true_labels = _labels(y_true, pad_token)
+    pred_rows, pred_labels = _labels(y_pred, pad_token)
+
+    codes, n_codes = _label_codes(true_labels, pred_labels)
+
+    # Sorting (row, label) pairs encoded as integers removes the duplicates
+    true = np.unique(true_rows * n_codes + codes[:true_rows.size])
+    pred = np.unique(pred_rows * n_codes + codes[true_rows.size:])
+    both = np.intersect1d(true, pred, assume_unique=True)
+
+    intersection = np.bincount(both // n_codes, minlength=n_samples)
+    true_counts = np.bincount(true // n_codes, minlength=n_samples)
+    pred_counts = np.bincount(pred // n_codes, minlength=n_samples)
+    return intersection / (true_counts + pred_counts - intersection)
+
+
+def exposure(y_pred, n_items, pad_token=None, counts=None):
+    """Count how many times each item of the catalog was recommended.
+    The counts can be accumulated over the batches of ``y_pred``, this way
+    the memory is proportional to the size of the catalog only.
+
+    Parameters
+    ----------
+    y_pred : iterable, ndarray of shape (n_samples, n_labels)
+        Integer codes of the items in ``[0, n_items)`` as returned by an IR
+        system.
+    n_items : int
+        The size of the catalog.
+    pad_token : scalar, default=None
+        The value that was used to pad the predictions to get the same length.
+    counts : ndarray of shape (n_items,), default=None
+        The counts for the previous batches, updated in-place.
+        If None, start counting from zero.
+
+    Returns
+    -------
+    counts : ndarray of shape (n_items,)
+        The number of impressions of each item.
+
+    Raises
+    -------
+    ValueError
+        If ``y_pred`` contains the codes outside of ``[0, n_items)``.
+
+    Examples
+    --------
+    >>> from irmetrics.coverage import exposure
+    >>> counts = exposure([[0, 1], [1, -1]], n_items=4, pad_token=-1)
+    >>> counts
+    array([1, 2, 0, 0])
+    >>> exposure([[3, 1]], n_items=4, counts=counts)
+    array([1, 3, 0, 1])
     """
+    y_pred = np.asarray(y_pred)
+    items = y_pred[valid(y_pred, pad_token)].astype(np.int64, copy=False)
+
+    if counts is None:
+        counts = np.zeros(n_items, dtype=np.int64)
 
-    if np.any(n_uniq(y_pred, y_true) > 1):
-        raise ValueError("y_pred has duplicates along the last axis")
+    if items.size == 0:
+        return counts
 
-    if np.any(n_uniq(y_true, y_true) > 1):
-        raise ValueError("y_true has duplicates along the last axis")
+    if items.min() < 0 or items.max() >= n_items:
+        msg = "y_pred is expected to contain codes in [0, {}), got [{}, {}]"
+        raise ValueError(msg.format(n_items, items.min(), items.max()))
 
-    relevant = relevance(y_pred, y_true)
+    # The cost depends on the batch, not on the codes (or the catalog)
+    uniques, batch = np.unique(items, return_counts=True)
+    np.add.at(counts, uniques, batch)
+    return counts
 
-    # Approximate intersection
-    intersection = relevant.sum(axis=-1)
 
-    # Approximate union
-    union = (y_pred.shape[-1] + y_true.shape[-1] - intersection)
+def catalog_coverage(counts):
+    """Compute the Catalog Coverage.
+    Calculate the fraction of the catalog that was recommended at least once.
+
+    Parameters
+    ----------
+    counts : ndarray of shape (n_items,)
+        The number of impressions of each item, see
+        `irmetrics.coverage.exposure`.
+
+    Returns
+    -------
+    coverage : float in [0., 1.]
+        The fraction of items with nonzero impressions, 0 for an empty
+        catalog.
+
+    Examples
+    --------
+    >>> from irmetrics.coverage import catalog_coverage
+    >>> catalog_coverage(np.array([1, 2, 0, 0]))
+    0.5
+    """
+    return np.count_nonzero(counts) / max(counts.size, 1)
+
+
+def gini(counts):
+    """Compute the Gini index of the item exposure.
+    The score is 0 if all items are recommended equally often and approaches
+    1 when all impressions go to a single item.
+
+    Parameters
+    ----------
+    counts : ndarray of shape (n_items,)
+        The number of impressions of each item, see
+        `irmetrics.coverage.exposure`.
+
+    Returns
+    -------
+    gini : float in [0., 1.]
+        The Gini index of the impressions, 0 if there are none.
+
+    References
+    ----------
+    `Wikipedia entry for Gini coefficient
+    <https://en.wikipedia.org/wiki/Gini_coefficient>`_
+
+    Examples
+    --------
+    >>> from irmetrics.coverage import gini
+    >>> gini(np.array([1, 1, 1, 1]))
+    0.0
+    >>> gini(np.array([0, 0, 0, 4]))
+    0.75
+    """
+    counts = np.sort(counts).astype(np.float64)
+    n_items = counts.size
+    if not counts.sum():
+        return 0.
+    ranks = np.arange(1, n_items + 1)
+    total = np.dot(ranks, counts) * 2 / (n_items * counts.sum())
+    return total - (n_items + 1) / n_items
+
+
+def concentration(counts, top_n=10):
+    """Compute the share of impressions of the most recommended items.
+
+    Parameters
+    ----------
+    counts : ndarray of shape (n_items,)
+        The number of impressions of each item, see
+        `irmetrics.coverage.exposure`.
+    top_n : int, default=10
+        The number of the most recommended items.
+
+    Returns
+    -------
+    concentration : float in [0., 1.]
+        The fraction of impressions that go to the ``top_n`` items, 0 if
+        there are no impressions or ``top_n`` is 0.
+
+    Examples
+    --------
+    >>> from irmetrics.coverage import concentration
+    >>> concentration(np.array([1, 2, 0, 5]), top_n=1)
+    0.625
+    """
+    top_n = min(top_n, counts.size)
+    if top_n <= 0 or not counts.sum():
+        return 0.
+    top = np.partition(counts, counts.size - top_n)[counts.size - top_n:]
+    return top.sum() / counts.sum()
+
+
+def novelty(counts, popularity=None):
+    """Compute the Novelty of recommendations.
+    Calculate the mean self-information ``-log2(p)`` of the recommended
+    items, where ``p`` is the popularity of an item.
+
+    Parameters
+    ----------
+    counts : ndarray of shape (n_items,)
+        The number of impressions of each item, see
+        `irmetrics.coverage.exposure`.
+    popularity : ndarray of shape (n_items,), default=None
+        The probability of each item, e.g. the fraction of users that
+        interacted with it. If None, use the fraction of impressions.
+
+    Returns
+    -------
+    novelty : float
+        The mean self-information of the impressions in bits, 0 if there
+        are no impressions.
+
+    Examples
+    --------
+    >>> from irmetrics.coverage import novelty
+    >>> novelty(np.array([2, 2, 0, 0]))
+    1.0
+    >>> novelty(np.array([2, 2, 0, 0]), popularity=np.full(4, 0.25))
+    2.0
+    """
+    if not counts.sum():
+        return 0.
+    if popularity is None:
+        popularity = counts / counts.sum()
 
-    return intersection / union
+    shown = counts > 0
+    information = -np.log2(popularity[shown])
+    return np.dot(counts[shown], information) / counts.sum()
@@ -0,0 +1,254 @@
+import numpy as np
+
+from irmetrics import flat as _flat
+from irmetrics.io import _ensure_array
+
+# The columns that keep the original order of the rows after the shuffle
+_ORDER = ["__irmetrics_partition", "__irmetrics_row"]
+
+
+def _block(y_true, y_pred, measure, k, kwargs):
+    return np.atleast_1d(measure(y_true, y_pred, k, **kwargs)).astype(float)
+
+
+def evaluate(y_true, y_pred, measure, k=None, **kwargs):
+    """Evaluate the measure for the dask arrays block by block.
+
+    Parameters
+    ----------
+    y_true : dask.array.Array of shape (n_samples,) or (n_samples, n_true)
+        True labels of entities to be ranked.
+    y_pred : dask.array.Array of shape (n_samples, n_labels)
+        Target labels sorted by relevance (as returned by an IR system).
+        The labels of a sample should be in the same block, the arrays are
+        rechunked along the columns otherwise.
+    measure : callable
+        The measure (one from `irmetrics.topk`) to calculate.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    **kwargs : dict
+        The other parameters of the measure.
+
+    Returns
+    -------
+    values : dask.array.Array of shape (n_samples,)
+        The lazy values of the measure for all samples.
+
+    Examples
+    --------
+    >>> import dask.array as da
+    >>> from irmetrics.dask import evaluate
+    >>> from irmetrics.topk import rr
+    >>> y_true = da.from_array([1, 2, 3, 4], chunks=2)
+    >>> y_pred = da.from_array([[0, 1], [2, 0], [0, 1], [0, 4]], chunks=2)
+    >>> evaluate(y_true, y_pred, rr).compute()
+    array([0.5, 1. , 0. , 0.5])
+    """
+    import dask.array as da
+
+    y_pred = da.asarray(y_pred)
+    y_pred = y_pred.rechunk({1: -1})
+
+    y_true = da.asarray(y_true)
+    if y_true.ndim == 1:
+        y_true = y_true[:, None]
+    y_true = y_true.rechunk((y_pred.chunks[0], -1))
+
+    return da.map_blocks(
+        _block, y_true, y_pred, measure=measure, k=k, kwargs=kwargs,
+        drop_axis=1, dtype=np.float64,
+    )
+
+
+def _labels(column):
+    labels = _ensure_array(column)
+    if labels is column:
+        return np.array(column.tolist())
+    return labels
+
+
+def _frame(df, y_true_col, y_pred_col, measure, k, kwargs):
+    from pandas import Series
+
+    values = np.atleast_1d(measure(
+        _labels(df[y_true_col]), _labels(df[y_pred_col]), k, **kwargs))
+    return Series(values, index=df.index, dtype=np.float64)
+
+
+def frame(ddf, y_true_col, y_pred_col, measure, k=None, **kwargs):
+    """Evaluate the measure for the dask dataframe partition by partition.
+
+    Parameters
+    ----------
+    ddf : dask.dataframe.DataFrame
+        The dataframe with a row per query.
+    y_true_col : str
+        The column with the true labels (scalars or lists).
+    y_pred_col : str
+        The column with the lists of the predicted labels. The columns
+        backed by ``pyarrow`` (e.g. read from parquet) are converted without
+        copying, see `irmetrics.io.from_arrow`. Note that ``dask`` converts
+        the object columns to strings unless ``dataframe.convert-string``
+        is disabled.
+    measure : callable
+        The measure (one from `irmetrics.topk`) to calculate.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    **kwargs : dict
+        The other parameters of the measure.
+
+    Returns
+    -------
+    values : dask.dataframe.Series
+        The lazy values of the measure, aligned with ``ddf``.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> import pyarrow as pa
+    >>> import dask.dataframe as dd
+    >>> from irmetrics.dask import frame
+    >>> from irmetrics.topk import rr
+    >>> y_pred = pd.Series(
+    ...     [[0, 1], [2, 0]], dtype=pd.ArrowDtype(pa.list_(pa.int64())))
+    >>> df = pd.DataFrame({"y_true": [1, 2], "y_pred": y_pred})
+    >>> ddf = dd.from_pandas(df, npartitions=2)
+    >>> frame(ddf, "y_true", "y_pred", rr).compute().tolist()
+    [0.5, 1.0]
+    """
+    return ddf.map_partitions(
+        _frame, y_true_col, y_pred_col, measure, k, kwargs,
+        meta=(None, np.float64),
+    )
+
+
+def _number(df, partition_info=None):
+    number = partition_info["number"] if partition_info else 0
+    return df.assign(**dict(zip(_ORDER, (number, np.arange(len(df))))))
+
+
+def _partition(df, query_col, relevance_col, measure, k, kwargs):
+    df = df.sort_values(_ORDER, kind="stable")
+    return _flat.flat(df, query_col, relevance_col, measure, k, **kwargs)
+
+
+def flat(ddf, query_col, relevance_col, measure, k=None, shuffle=True,
+         **kwargs):
+    """Evaluate the measure for the dask dataframe in the flat format, see
+    `irmetrics.flat.flat`.
+
+    Parameters
+    ----------
+    ddf : dask.dataframe.DataFrame
+        Dataset in the flat form: each row corresponds to a sample with the
+        given query_id and relevance judgement (higher is better).
+    query_col :  str
+        The column that corresponds to query identificator.
+    relevance_col :  str
+        The column that corresponds to relevance judgements.
+    measure :  callable
+        The desired measure to be calculated (one from `irmetrics.topk`).
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    shuffle : bool, default=True
+        Shuffle the rows, so all rows of a query are in the same partition.
+        The order of the rows within a query is kept. If False, the rows of
+        each query should already be in a single partition.
+    **kwargs : dict
+        The other parameters of the measure.
+
+    Returns
+    -------
+    measures : dask.dataframe.Series
+        The lazy values of the corresponding measure per each query.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> import dask.dataframe as dd
+    >>> from irmetrics.topk import rr
+    >>> from irmetrics.dask import flat
+    >>> df = pd.DataFrame({"quid": [1, 2, 1, 2], "rel": [1, 0, 0, 1]})
+    >>> ddf = dd.from_pandas(df, npartitions=2, sort=False)
+    >>> flat(ddf, "quid", "rel", rr).compute().sort_index().tolist()
+    [1.0, 0.5]
+    """
+    ddf = ddf.map_partitions(_number)
+    if shuffle:
+        ddf = ddf.shuffle(on=query_col)
+
+    return ddf.map_partitions(
+        _partition, query_col, relevance_col, measure, k, kwargs,
+        meta=(relevance_col, np.float64),
+    )
+
+
+def _moments(x):
+    x = np.asarray(x, dtype=np.float64)
+    x = x[~np.isnan(x)]
+    mean = x.mean() if x.size else 0.
+    return np.array([[x.size, mean, np.square(x - mean).sum()]])
+
+
+def _combine(moments, axis=0, keepdims=True):
+    # Chan et al.: the squared deviations from the block means are moved
+    # to the common mean, the large sums of squares never cancel
+    count, means, deviations = np.asarray(moments).reshape(-1, 3).T
+    total = count.sum()
+    mean = np.dot(count, means) / total if total else 0.
+    deviations = deviations.sum() + np.dot(count, np.square(means - mean))
+    return np.array([[total, mean, deviations]])
+
+
+def _identity(moments, axis=0, keepdims=True):
+    return moments
+
+
+def _aggregate(moments, axis=0, keepdims=False):
+    count, mean, deviations = _combine(moments)[0]
+    if not count:
+        return np.array([0., np.nan, np.nan])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.array([count, mean, deviations / (count - 1)])
+
+
+def summary(values, split_every=None):
+    """Calculate the number of values, the mean and the variance by a tree
+    reduction of the per-block (count, mean, squared deviations), combined
+    pairwise by the parallel algorithm of Chan et al. The ``np.nan`` values
+    are ignored.
+
+    Parameters
+    ----------
+    values : dask.array.Array or dask.dataframe.Series
+        The values of a measure, e.g. the outputs of ``irmetrics.dask.flat``.
+    split_every : int, default=None
+        The number of blocks combined at each level of the tree.
+
+    Returns
+    -------
+    summary : dask.array.Array of shape (3,)
+        The lazy number of values, the mean and the variance (``ddof=1``).
+
+    Examples
+    --------
+    >>> import dask.array as da
+    >>> from irmetrics.dask import summary
+    >>> summary(da.from_array([0., 0.5, 1., 0.5], chunks=1)).compute()
+    array([4.        , 0.5       , 0.16666667])
+    """
+    import dask.array as da
+
+    if hasattr(values, "to_dask_array"):
+        values = values.to_dask_array()
+    values = da.asarray(values)
+
+    chunks = ((1,) * values.numblocks[0], (3,))
+    moments = values.map_blocks(
+        _moments, chunks=chunks, new_axis=1, dtype=np.float64)
+    return da.reduction(
+        moments, _identity, _aggregate, axis=0, combine=_combine,
+        split_every=split_every, dtype=np.float64, concatenate=True)
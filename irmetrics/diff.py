@@ -0,0 +1,200 @@
+import numpy as np
+
+from collections import namedtuple
+from irmetrics.io import _ensure_array
+from irmetrics.systems import Qrels
+from irmetrics.topk import ndcg, rr
+
+Changes = namedtuple("Changes", ["ids", "deltas"])
+Diff = namedtuple("Diff", [
+    "improved", "degraded", "unchanged", "undefined", "mean",
+    "wins", "losses"])
+
+
+def _top(ids, deltas, n):
+    # The n largest deltas, sorted in descending order
+    if deltas.size > n:
+        index = np.argpartition(-deltas, n - 1)[:n]
+        ids, deltas = ids[index], deltas[index]
+    order = np.argsort(-deltas, kind="stable")
+    return ids[order], deltas[order]
+
+
+class RunDiff:
+    """Per-query differences of the measures between two runs.
+    The inputs are processed in chunks: the counts and the sums are
+    accumulated, only ``top_n`` largest wins and losses are kept, so the
+    memory doesn't depend on the number of queries.
+
+    Parameters
+    ----------
+    measures : iterable of callable, default=(topk.ndcg, topk.rr)
+        The measures (from `irmetrics.topk`) to compare.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    top_n : int, default=10
+        The number of the largest wins and losses to keep.
+    tol : float, default=0.
+        The changes not larger than ``tol`` (in absolute value) are
+        considered unchanged.
+    **kwargs : dict
+        The other parameters of the measures.
+
+    Examples
+    --------
+    >>> from irmetrics.diff import RunDiff
+    >>> from irmetrics.topk import rr
+    >>> diff = RunDiff([rr], top_n=1)
+    >>> diff.update([1, 2, 3], [[0, 1], [2, 0], [3, 0]],
+    ...             [[1, 0], [0, 2], [3, 0]])
+    >>> report = diff.report()["rr"]
+    >>> report.improved, report.degraded, report.unchanged
+    (1, 1, 1)
+    >>> report.wins
+    Changes(ids=array([0]), deltas=array([0.5]))
+    """
+
+    def __init__(self, measures=(ndcg, rr), k=None, top_n=10, tol=0.,
+                 **kwargs):
+        self.measures = list(measures)
+        self.k = k
+        self.top_n = top_n
+        self.tol = tol
+        self.kwargs = kwargs
+        self.n_queries = 0
+
+        names = [f.__name__ for f in self.measures]
+        empty = Changes(np.empty(0, dtype=int), np.empty(0))
+        self._counts = {name: np.zeros(4, dtype=int) for name in names}
+        self._sums = {name: 0. for name in names}
+        self._wins = {name: empty for name in names}
+        self._losses = {name: empty for name in names}
+
+    def _values(self, qrels, old, new, measure):
+        # Both runs are evaluated in a single call if possible
+        if old.shape == new.shape:
+            runs = np.stack([old, new])
+            return qrels.evaluate(runs, measure, self.k, **self.kwargs)
+        return [
+            qrels.evaluate(run[None], measure, self.k, **self.kwargs)[0]
+            for run in (old, new)
+        ]
+
+    def _update(self, name, ids, deltas):
+        defined = ~np.isnan(deltas)
+        ids, deltas = ids[defined], deltas[defined]
+
+        improved, degraded = deltas > self.tol, deltas < -self.tol
+        self._counts[name] += [
+            np.count_nonzero(improved),
+            np.count_nonzero(degraded),
+            deltas.size - np.count_nonzero(improved | degraded),
+            np.count_nonzero(~defined),
+        ]
+        self._sums[name] += deltas.sum()
+
+        wins, losses = self._wins[name], self._losses[name]
+        self._wins[name] = Changes(*_top(
+            np.concatenate([wins.ids, ids[improved]]),
+            np.concatenate([wins.deltas, deltas[improved]]),
+            self.top_n,
+        ))
+        ids, deltas = _top(
+            np.concatenate([losses.ids, ids[degraded]]),
+            -np.concatenate([losses.deltas, deltas[degraded]]),
+            self.top_n,
+        )
+        self._losses[name] = Changes(ids, -deltas)
+
+    def update(self, y_true, old, new, ids=None):
+        """Add a chunk of queries.
+
+        Parameters
+        ----------
+        y_true : iterable, ndarray of shape (n_queries, n_true)
+            True labels of entities to be ranked.
+        old : iterable, ndarray of shape (n_queries, n_labels)
+            The predicted labels of the old run.
+        new : iterable, ndarray of shape (n_queries, n_labels)
+            The predicted labels of the new run.
+        ids : iterable, ndarray of shape (n_queries,), default=None
+            The query ids. If None, use the positions of the queries among
+            all chunks.
+        """
+        qrels = Qrels(y_true)
+        old = np.asarray(_ensure_array(old))
+        new = np.asarray(_ensure_array(new))
+        if ids is None:
+            ids = np.arange(self.n_queries, self.n_queries + qrels.n_queries)
+        ids = np.asarray(ids)
+        self.n_queries += qrels.n_queries
+
+        for measure in self.measures:
+            before, after = self._values(qrels, old, new, measure)
+            self._update(measure.__name__, ids, after - before)
+
+    def report(self):
+        """Summarize the differences of all measures.
+
+        Returns
+        -------
+        report : dict of Diff
+            For each measure: the number of ``improved``, ``degraded``,
+            ``unchanged`` queries and the queries with the ``undefined``
+            (``np.nan``) values, the ``mean`` change of the defined values,
+            the largest ``wins`` and ``losses`` (ids and changes, sorted
+            by the absolute change).
+        """
+        report = {}
+        for name, counts in self._counts.items():
+            n_defined = counts[:3].sum()
+            mean = self._sums[name] / n_defined if n_defined else np.nan
+            report[name] = Diff(
+                *counts.tolist(), mean, self._wins[name], self._losses[name])
+        return report
+
+
+def diff(y_true, old, new, measures=(ndcg, rr), k=None, top_n=10, tol=0.,
+         ids=None, **kwargs):
+    """Compare two runs query by query, see ``irmetrics.diff.RunDiff``.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_queries,) or (n_queries, n_true)
+        True labels of entities to be ranked.
+    old : iterable, ndarray of shape (n_queries, n_labels)
+        The predicted labels of the old run.
+    new : iterable, ndarray of shape (n_queries, n_labels)
+        The predicted labels of the new run.
+    measures : iterable of callable, default=(topk.ndcg, topk.rr)
+        The measures (from `irmetrics.topk`) to compare.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    top_n : int, default=10
+        The number of the largest wins and losses to report.
+    tol : float, default=0.
+        The changes not larger than ``tol`` (in absolute value) are
+        considered unchanged.
+    ids : iterable, ndarray of shape (n_queries,), default=None
+        The query ids. If None, use the positions of the queries.
+    **kwargs : dict
+        The other parameters of the measures.
+
+    Returns
+    -------
+    report : dict of Diff
+        The summary for each measure, see ``RunDiff.report``.
+
+    Examples
+    --------
+    >>> from irmetrics.diff import diff
+    >>> from irmetrics.topk import rr
+    >>> report = diff([1, 2], [[0, 1], [2, 0]], [[1, 0], [0, 2]], [rr])
+    >>> report["rr"].losses
+    Changes(ids=array([1]), deltas=array([-0.5]))
+    """
+    run_diff = RunDiff(measures, k, top_n, tol, **kwargs)
+    run_diff.update(y_true, old, new, ids)
+    return run_diff.report()
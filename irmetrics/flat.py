@@ -1,4 +1,18 @@
+import numpy as np
+
 from functools import partial
+from irmetrics import sparse
+from irmetrics.topk import rr, ndcg, err, rbp
+
+
+# The measures that are calculated directly from the positions of nonzero
+# relevance judgements, without splitting the data into the groups
+_KERNELS = {
+    rr: sparse._rr,
+    ndcg: sparse._ndcg,
+    err: sparse._err,
+    rbp: sparse._rbp,
+}
 
 
 def _relevance(y_true, y_pred):
@@ -14,7 +28,26 @@ def _relevance(y_true, y_pred):
     return y_true
 
 
-def flat(df, query_col, relevance_col, measure, k=None):
+def _positions(df, query_col, relevance_col, k=None):
+    groups = df.groupby(query_col)
+    rows = groups.ngroup().to_numpy(dtype=int, na_value=-1)
+    cols = groups.cumcount().to_numpy()
+    data = df[relevance_col].to_numpy(dtype=float)
+
+    # Stable sort keeps the original order of the entries within a query
+    order = np.argsort(rows, kind="stable")
+    rows, cols, data = rows[order], cols[order], data[order]
+
+    # Drop the missing queries, zero judgements and everything beyond k
+    keep = (rows >= 0) & (data != 0)
+    if k is not None:
+        keep &= cols < k
+
+    index = groups.size().index
+    return (rows[keep], cols[keep], data[keep], len(index)), index
+
+
+def flat(df, query_col, relevance_col, measure, k=None, **kwargs):
     """
     Calculate the corresponding measure for the data in flat format, with
     precalculated relevance judgements:
@@ -42,10 +75,16 @@ def flat(df, query_col, relevance_col, measure, k=None):
         The column that corresponds to relevance judgements.
     measure :  callable
         The desired measure to be calculated (one from `irmetrics.topk`).
-        Currently, only ``topk.ndcg`` and ``topk.rr`` are supported.
+        Currently, only ``topk.ndcg``, ``topk.rr``, ``topk.err`` and
+        ``topk.rbp`` are supported. These are calculated for all queries at
+        once from the positions of nonzero judgements, see
+        `irmetrics.sparse`.
     k : int, default=None
         Only consider the highest k scores in the ranking. If None, use all
         outputs.
+    **kwargs : dict
+        The other parameters of the measure, e.g. ``max_grade`` for
+        ``topk.err``.
 
     Returns
     -------
@@ -64,5 +103,14 @@ def flat(df, query_col, relevance_col, measure, k=None):
     2    0.5
     Name: rel, dtype: float64
     """
-    f = partial(measure, y_pred=None, k=k, relevance=_relevance)
-    return df.groupby(query_col)[relevance_col].apply(f)
+    kernel = _KERNELS.get(measure)
+    if kernel is None:
+        f = partial(measure, y_pred=None, k=k, relevance=_relevance, **kwargs)
+        return df.groupby(query_col)[relevance_col].apply(f)
+
+    # pandas is an optional dependency, the dataframe is already there
+    from pandas import Series
+
+    positions, index = _positions(df, query_col, relevance_col, k)
+    return Series(
+        kernel(*positions, **kwargs), index=index, name=relevance_col)
@@ -0,0 +1,137 @@
+import numpy as np
+
+from collections import namedtuple
+from irmetrics.io import _encode
+
+
+Groups = namedtuple("Groups", ["labels", "count", "mean", "var", "weight"])
+
+
+def _codes(labels):
+    try:
+        return np.unique(labels, return_inverse=True)
+    except TypeError:
+        # Incomparable objects (e.g. None and str) keep their first order
+        codes = _encode(labels)
+        _, first = np.unique(codes, return_index=True)
+        return labels[first], codes
+
+
+def _aggregate(values, labels, weights, ddof):
+    uniq, codes = _codes(labels)
+    n_groups, n_metrics = uniq.size, values.shape[-1]
+
+    # Each (segment, metric) pair gets its own bin
+    index = (codes.reshape(-1, 1) * n_metrics + np.arange(n_metrics)).ravel()
+    size = n_groups * n_metrics
+
+    finite = ~np.isnan(values.ravel())
+    weights = np.repeat(weights, n_metrics) * finite
+    values = np.where(finite, values.ravel(), 0.)
+
+    count = np.bincount(index, finite, minlength=size).astype(np.int64)
+    weight = np.bincount(index, weights, minlength=size)
+    mean = np.bincount(index, weights * values, minlength=size) / weight
+
+    deviations = weights * (values - mean[index]) ** 2
+    var = np.bincount(index, deviations, minlength=size)
+    var /= np.where(weight > ddof, weight - ddof, np.nan)
+
+    shape = (n_groups, n_metrics)
+    return Groups(uniq, *(
+        stat.reshape(shape) for stat in (count, mean, var, weight)))
+
+
+def _columns(segments, index):
+    # Align the pandas objects with the per-query values (e.g. `flat` outputs)
+    if hasattr(segments, "reindex") and index is not None:
+        segments = segments.reindex(index)
+
+    if isinstance(segments, dict) or hasattr(segments, "columns"):
+        return {name: np.asarray(segments[name]) for name in segments}
+    return np.asarray(segments)
+
+
+def grouped(values, segments, weights=None, ddof=1):
+    """Aggregate per-query measures by the query segments.
+    Calculate the number of queries, the sums of their weights, means and
+    variances of the measures for all segments at once. The missing values
+    (``np.nan``) are ignored, the same as in ``pandas``.
+
+    Parameters
+    ----------
+    values : iterable, ndarray of shape (n_queries,) or (n_queries, n_metrics)
+        The per-query values of the measures (one from `irmetrics.topk`).
+    segments : iterable, ndarray of shape (n_queries,) or
+        (n_queries, n_columns), dict or pandas.DataFrame. The segment labels
+        of each query, one column per slicing dimension. The pandas objects
+        are aligned by index with ``values`` if it is a pandas.Series. The
+        segments are sorted by their labels, unless the labels can't be
+        compared (e.g. ``None`` and strings): then they are in the order of
+        the first occurrence, and the missing labels form their own segment.
+    weights : iterable, ndarray of shape (n_queries,), default=None
+        The weights of each query. If None, all queries have unit weight.
+    ddof : int, default=1
+        The delta degrees of freedom for the variance, it is subtracted from
+        the sum of the weights.
+
+    Returns
+    -------
+    groups : Groups, list or dict
+        For a single column of ``segments`` the named tuple with fields:
+        ``labels`` of shape (n_segments,), ``count`` (the number of
+        queries), ``mean``, ``var`` and ``weight`` (the sum of the weights
+        of the queries) of shape (n_segments,) or (n_segments, n_metrics).
+        For multiple columns the list (dict for the named columns) of the
+        named tuples.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.grouped import grouped
+    >>> from irmetrics.topk import rr
+    >>> y_true = [1, 1, 1, 1]
+    >>> y_pred = [[1, 2], [2, 1], [1, 2], [2, 3]]
+    >>> devices = ["mobile", "mobile", "desktop", "desktop"]
+    >>> groups = grouped(rr(y_true, y_pred), devices)
+    >>> groups.labels
+    array(['desktop', 'mobile'], dtype='<U7')
+    >>> groups.mean
+    array([0.5 , 0.75])
+
+    The outputs of `irmetrics.flat.flat` are aligned with the segments:
+
+    >>> import pandas as pd
+    >>> from irmetrics.flat import flat
+    >>> df = pd.DataFrame({
+    ...    "query_id": [0, 0, 1, 1, 2, 2],
+    ...    "click": [0, 1, 1, 0, 1, 0],
+    ...    "device": ["mobile", "mobile", "desktop", "desktop", "mobile",
+    ...               "mobile"],
+    ... })
+    >>> values = flat(df, "query_id", "click", measure=rr)
+    >>> segments = df.groupby("query_id")[["device"]].first()
+    >>> grouped(values, segments)["device"].mean
+    array([1.  , 0.75])
+    """
+    index = values.index if hasattr(values, "reindex") else None
+    columns = _columns(segments, index)
+    values = np.asarray(values, dtype=np.float64)
+    squeeze = values.ndim == 1
+    values = values.reshape(values.shape[0], -1)
+
+    if weights is None:
+        weights = np.ones(values.shape[0])
+    weights = np.asarray(weights, dtype=np.float64)
+
+    def aggregate(labels):
+        groups = _aggregate(values, labels, weights, ddof)
+        if not squeeze:
+            return groups
+        return Groups(groups.labels, *(stat[:, 0] for stat in groups[1:]))
+
+    if isinstance(columns, dict):
+        return {name: aggregate(labels) for name, labels in columns.items()}
+    if columns.ndim == 1:
+        return aggregate(columns)
+    return [aggregate(labels) for labels in columns.T]
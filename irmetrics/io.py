@@ -1,7 +1,10 @@
+import hashlib
 import warnings
 import numpy as np
 
 from functools import wraps
+from irmetrics import sparse
+from irmetrics.cache import RelevanceCache
 from irmetrics.relevance import multilabel
 
 
@@ -11,7 +14,184 @@ def to_scalar(x):
     return x
 
 
+def valid(x, pad_token=None):
+    """Compute the mask of entries that are not padding.
+    Where possible the mask is obtained without comparing the elements: only
+    object arrays may contain ``None`` and only floating point arrays may
+    contain ``np.nan``. Integer sentinels (e.g. ``-1``) keep the integer
+    dtype of the labels and are compared as integers.
+
+    Parameters
+    ----------
+    x : ndarray of shape (n_samples, n_labels)
+        Padded labels.
+    pad_token : scalar, str, default=None
+        The value that was used to pad the labels to get the same length.
+
+    Returns
+    -------
+    valid : boolean ndarray of shape (n_samples, n_labels)
+        True for the entries that are not ``pad_token``.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.io import valid
+    >>> valid(np.array([[1, -1]]), pad_token=-1)
+    array([[ True, False]])
+    >>> valid(np.array([[1., np.nan]]), pad_token=np.nan)
+    array([[ True, False]])
+    """
+    x = np.asarray(x)
+    if _unpadded(x, pad_token):
+        return np.ones(x.shape, dtype=bool)
+
+    # NaN is the only value that is not equal to itself
+    if pad_token != pad_token:
+        return x == x
+
+    return np.broadcast_to(x != pad_token, x.shape)
+
+
+def lengths(x, pad_token=None):
+    """Calculate the number of entries that are not padding.
+
+    Parameters
+    ----------
+    x : ndarray of shape (n_samples, n_labels)
+        Padded labels.
+    pad_token : scalar, str, default=None
+        The value that was used to pad the labels to get the same length.
+
+    Returns
+    -------
+    lengths : ndarray of shape (n_samples,)
+        The number of entries different from ``pad_token``.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.io import lengths
+    >>> lengths(np.array([[1, 2, -1], [1, -1, -1]]), pad_token=-1)
+    array([2, 1])
+    """
+    x = np.asarray(x)
+    if _unpadded(x, pad_token):
+        return np.full(x.shape[:-1], x.shape[-1])
+    return valid(x, pad_token).sum(-1)
+
+
+def _unpadded(x, pad_token):
+    if x.dtype == object:
+        return False
+
+    # Only object arrays may contain None
+    if pad_token is None:
+        return True
+
+    # Only floating point arrays may contain NaN
+    return pad_token != pad_token and x.dtype.kind not in "fc"
+
+
+def _arrow(x):
+    if type(x).__module__.startswith("pyarrow"):
+        return x
+
+    # pandas columns backed by pyarrow
+    if str(getattr(x, "dtype", "")).endswith("[pyarrow]"):
+        return x.array.__arrow_array__()
+    return None
+
+
+def _is_list(column):
+    import pyarrow as pa
+
+    return any(f(column.type) for f in (
+        pa.types.is_list,
+        pa.types.is_large_list,
+        pa.types.is_fixed_size_list,
+    ))
+
+
+def from_arrow(column, pad_token=None):
+    """Convert a column of lists to a matrix of labels.
+    The values of ``pyarrow`` list arrays are used without copying when all
+    lists have the same length and the values are numeric with no nulls.
+    Ragged lists are padded with ``pad_token`` without iterating in python.
+    This function is called implicitly for ``pyarrow`` and ``pandas``
+    list columns passed as ``y_true`` or ``y_pred``.
+
+    Parameters
+    ----------
+    column : pyarrow.Array, pyarrow.ChunkedArray or pandas.Series
+        A column of type ``list``, ``large_list`` or ``fixed_size_list``,
+        e.g. ``pandas`` column with ``pd.ArrowDtype`` or a column of
+        ``pyarrow.Table`` read from parquet.
+    pad_token : scalar, str, default=None
+        The value used to pad the ragged lists to get the same length.
+        Integer sentinels (e.g. ``-1``) keep the dtype of integer labels.
+
+    Returns
+    -------
+    labels : ndarray of shape (n_samples, n_labels)
+        The labels, ``n_labels`` is the length of the longest list.
+
+    Examples
+    --------
+    >>> import pyarrow as pa
+    >>> from irmetrics.io import from_arrow
+    >>> from_arrow(pa.array([[1, 2], [3, 4]]))
+    array([[1, 2],
+           [3, 4]])
+    >>> from_arrow(pa.array([[1, 2], [3]]), pad_token=-1)
+    array([[ 1,  2],
+           [ 3, -1]])
+    """
+    column = _arrow(column)
+
+    # Only a single chunk is used without copying
+    if hasattr(column, "chunks") and column.num_chunks == 1:
+        column = column.chunk(0)
+    elif hasattr(column, "chunks"):
+        column = column.combine_chunks()
+
+    n_samples = len(column)
+    if hasattr(column.type, "list_size"):
+        values = column.flatten().to_numpy(zero_copy_only=False)
+        return values.reshape(n_samples, column.type.list_size)
+
+    # Offsets account for slicing, values don't
+    offsets = column.offsets.to_numpy()
+    values = column.values.to_numpy(zero_copy_only=False)
+    values = values[offsets[0]:offsets[-1]]
+    offsets = offsets - offsets[0]
+
+    sizes = np.diff(offsets)
+    width = sizes.max(initial=0)
+    if np.all(sizes == width):
+        return values.reshape(n_samples, width)
+
+    dtype = object
+    if pad_token is not None:
+        dtype = np.result_type(values, np.asarray(pad_token))
+
+    rows = np.repeat(np.arange(n_samples), sizes)
+    cols = np.arange(values.shape[0]) - np.repeat(offsets[:-1], sizes)
+
+    labels = np.full((n_samples, width), pad_token, dtype=dtype)
+    labels[rows, cols] = values
+    return labels
+
+
+def _ensure_array(x):
+    column = _arrow(x)
+    if column is not None and _is_list(column):
+        return from_arrow(column)
+    return x
+
+
 def ensure_inputs(y_true, y_pred, k=None):
+    y_true, y_pred = _ensure_array(y_true), _ensure_array(y_pred)
     y_true, y_pred = np.atleast_2d(y_true, y_pred)
 
     # `np.atleast_2d` adds a new axis as a batch dimension
@@ -26,31 +206,228 @@ def ensure_inputs(y_true, y_pred, k=None):
     return y_true, y_pred
 
 
+def _repeated(y_pred, pad_token=None):
+    # Sorting is O(n log n) per row, object labels may be incomparable
+    if y_pred.dtype == object:
+        repeat_count = (y_pred[:, :, None] == y_pred[:, None]).sum(axis=-1)
+        return np.any((repeat_count > 1) & valid(y_pred, pad_token))
+
+    ordered = np.sort(y_pred, axis=-1)
+    same = ordered[:, 1:] == ordered[:, :-1]
+    return np.any(same & valid(ordered[:, 1:], pad_token))
+
+
+def _warn_repeated(y_pred, pad_token=None):
+    # Repeated padding is fine as long as it is known
+    if _repeated(y_pred, pad_token):
+        message = (
+            "Repeated predictions detected. "
+            "This is an error unless the predictions are padded. "
+            "Use np.nan as a padding token to suppress the warning for "
+            "integer labels."
+        )
+        warnings.warn(message, RuntimeWarning)
+
+
+def _validated(relevance, y_pred, pad_token):
+    # Sorting the predictions is O(n p log p), the canonical CSR judgements
+    # (a few hits of long lists) are not checked
+    checked = []
+
+    def validated(y_true_, y_pred_):
+        relevant = relevance(y_true_, y_pred_)
+        if not checked and not sparse._canonical(relevant):
+            _warn_repeated(y_pred, pad_token)
+        checked.append(True)
+        return relevant
+
+    return validated
+
+
 def _validate_unique(f):
     @wraps(f)
     def wrapper(y_true, y_pred, k=None, relevance=multilabel, **kwargs):
-        repeat_count = (y_pred[:, :, None] == y_pred[:, None]).sum(axis=-1)
-        if np.any(repeat_count > 1):
-            message = (
-                "Repeated predictions detected. "
-                "This is an error unless the predictions are padded. "
-                "Use np.nan as a padding token to suppress the warning for "
-                "integer labels."
-            )
-            warnings.warn(message, RuntimeWarning)
+        pad_token = kwargs.get("pad_token")
+
+        # The cache serves the counts without the judgements
+        if isinstance(relevance, RelevanceCache):
+            _warn_repeated(y_pred, pad_token)
+        else:
+            relevance = _validated(relevance, y_pred, pad_token)
         return f(y_true, y_pred, k, relevance=relevance, **kwargs)
 
     return wrapper
 
 
+def _encode(x):
+    # Object labels are hashed as the integer codes of their values
+    if x.dtype != object:
+        return x
+    codes = {}
+    encoded = [codes.setdefault(v, len(codes)) for v in x.ravel().tolist()]
+    return np.array(encoded, dtype=np.int64).reshape(x.shape)
+
+
+def _digest(text):
+    digest = hashlib.blake2b(text.encode(), digest_size=8).digest()
+    return np.uint64(int.from_bytes(digest, "little"))
+
+
+def _mix(h):
+    # The finalizer of splitmix64, the multiplications wrap around
+    h = h ^ (h >> np.uint64(30))
+    h *= np.uint64(0xbf58476d1ce4e5b9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94d049bb133111eb)
+    h ^= h >> np.uint64(31)
+    return h
+
+
+def row_hashes(x):
+    """Compute the 64-bit hashes of the rows of an array.
+
+    Parameters
+    ----------
+    x : iterable or ndarray of shape (n_samples, ...)
+        The array to hash. The object arrays are hashed by the ``repr`` of
+        their rows, the others by the raw bytes.
+
+    Returns
+    -------
+    hashes : ndarray of shape (n_samples,)
+        The hashes of the rows, ``np.uint64``.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.io import row_hashes
+    >>> hashes = row_hashes(np.array([[1, 2], [2, 1], [1, 2]]))
+    >>> hashes[0] == hashes[2], hashes[0] == hashes[1]
+    (True, False)
+    """
+    x = np.asarray(x)
+    x = x.reshape(x.shape[0], -1)
+    if x.dtype == object:
+        return np.array([_digest(repr(row)) for row in x.tolist()])
+
+    # The 64-bit words of a row are summed with odd multipliers of their
+    # columns (the products wrap around), then mixed once per row
+    words = _words(x)
+    salt = _digest(x.dtype.str + str(x.shape[1]))
+    columns = _mix(salt + np.arange(words.shape[1], dtype=np.uint64))
+    return _mix(words.dot(columns | np.uint64(1)) ^ salt)
+
+
+def _words(x):
+    width = x.itemsize * int(np.prod(x.shape[1:]))
+    raw = np.ascontiguousarray(x).view(np.uint8).reshape(x.shape[0], width)
+    if raw.shape[1] % 8:
+        raw = np.pad(raw, ((0, 0), (0, -raw.shape[1] % 8)))
+    return raw.view("<u8")
+
+
+def _broadcast_rows(y_true, y_pred):
+    n_samples = max(y_true.shape[0], y_pred.shape[0])
+    return (
+        np.broadcast_to(y_true, (n_samples,) + y_true.shape[1:]),
+        np.broadcast_to(y_pred, (n_samples,) + y_pred.shape[1:]),
+    )
+
+
+def _equal_rows(x, rows, first):
+    # The bytes are compared, so the NaN labels are equal to themselves
+    return np.array_equal(_words(x[rows]), _words(x[first]))
+
+
+def unique_rows(y_true, y_pred):
+    """Find the unique pairs of (y_true, y_pred) rows.
+    The rows are grouped by the 64-bit hashes of the labels, see
+    ``irmetrics.io.row_hashes``, the object labels are encoded as integers
+    first. The rows sharing a hash are compared with the first one, on hash
+    collisions the rows are grouped by their bytes instead. Any measure can
+    be calculated once per unique row and then either expanded with
+    ``inverse`` or aggregated with the ``counts`` as weights. The metrics
+    from `irmetrics.topk` do this with ``dedup=True`` (expand) or
+    ``dedup="mean"`` (the weighted mean).
+
+    Parameters
+    ----------
+    y_true : ndarray of shape (n_samples, n_true)
+        True labels of entities to be ranked.
+    y_pred : ndarray of shape (n_samples, n_labels)
+        Target labels sorted by relevance (as returned by an IR system).
+
+    Returns
+    -------
+    index : ndarray of shape (n_unique,)
+        The first occurrence of each unique row.
+    inverse : ndarray of shape (n_samples,)
+        The unique row of each sample, ``index[inverse]`` has the same labels
+        as the samples.
+    counts : ndarray of shape (n_unique,)
+        The number of samples with each unique row.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.io import unique_rows
+    >>> y_true = np.array([["a"], ["b"], ["a"]], dtype=object)
+    >>> y_pred = np.array([["a", "b"], ["a", "b"], ["a", "b"]], dtype=object)
+    >>> index, inverse, counts = unique_rows(y_true, y_pred)
+    >>> index[inverse], counts[inverse]
+    (array([0, 1, 0]), array([2, 1, 2]))
+    """
+    y_true, y_pred = _encode(y_true), _encode(y_pred)
+    n_samples = max(y_true.shape[0], y_pred.shape[0])
+    hashes = _mix(row_hashes(y_true) ^ _mix(row_hashes(y_pred)))
+    hashes = np.broadcast_to(hashes, n_samples)
+    _, index, inverse, counts = np.unique(
+        hashes, return_index=True, return_inverse=True, return_counts=True)
+
+    # Only the rows sharing a hash with an earlier row are compared
+    y_true, y_pred = _broadcast_rows(y_true, y_pred)
+    rows = np.flatnonzero(counts[inverse] > 1)
+    first = index[inverse[rows]]
+    rows, first = rows[rows != first], first[rows != first]
+    if _equal_rows(y_true, rows, first) and _equal_rows(y_pred, rows, first):
+        return index, inverse, counts
+
+    # Hash collisions, the rows are compared byte by byte
+    raw = np.hstack([_words(y_true), _words(y_pred)])
+    rows = raw.view(np.dtype((np.void, raw.shape[1] * 8)))[:, 0]
+    _, index, inverse, counts = np.unique(
+        rows, return_index=True, return_inverse=True, return_counts=True)
+    return index, inverse, counts
+
+
+def _deduplicated(f, y_true, y_pred, k, dedup, kwargs):
+    if dedup not in (True, "mean"):
+        raise ValueError(
+            "Expected dedup to be False, True or 'mean', got {}".format(dedup))
+
+    y_true, y_pred = _broadcast_rows(y_true, y_pred)
+    index, inverse, counts = unique_rows(y_true, y_pred)
+    outputs = np.asarray(f(y_true[index], y_pred[index], k, **kwargs))
+
+    # The samples are along the last axis of the raw outputs
+    if dedup == "mean":
+        return np.average(outputs, weights=counts, axis=-1)
+    return np.take(outputs, inverse, axis=-1)
+
+
 def _ensure_io(f):
     @wraps(f)
-    def wrapper(y_true, y_pred, k=None, relevance=multilabel, **kwargs):
+    def wrapper(y_true, y_pred, k=None, relevance=multilabel, dedup=False,
+                **kwargs):
         # Ensure (n_samples, n_labels) shapes for the inputs
         y_true_, y_pred_ = ensure_inputs(y_true, y_pred, k)
 
-        # Calculate the measure
-        raw_outputs = f(y_true_, y_pred_, k, relevance=relevance, **kwargs)
+        # Calculate the measure, once per unique row if needed
+        kwargs["relevance"] = relevance
+        if dedup:
+            raw_outputs = _deduplicated(f, y_true_, y_pred_, k, dedup, kwargs)
+        else:
+            raw_outputs = f(y_true_, y_pred_, k, **kwargs)
 
         # Remove unwanted dimensions if any
         return to_scalar(np.squeeze(raw_outputs))
@@ -0,0 +1,210 @@
+import time
+import numpy as np
+
+
+def _compensated(total, value):
+    # Adds a value to the (sum, compensation) pair, the rounding error of
+    # the sum is exact (TwoSum) and accumulated in the compensation
+    high = total[0] + value
+    low = high - total[0]
+    error = (total[0] - (high - low)) + (value - low)
+    return np.array([high, total[1] + error])
+
+
+class Window:
+    """Sliding-window mean of per-query measures.
+    The time is split into buckets of ``resolution`` seconds. The running
+    sum and count of all values are kept, the sum with the compensation of
+    its rounding errors, and a ring buffer of ``n_buckets`` entries holds
+    their values at the start of each bucket. The totals of any window (in
+    whole buckets) are then the differences to the start of its first
+    bucket: the memory is constant and nothing is summed on expiry.
+
+    Parameters
+    ----------
+    n_buckets : int
+        The number of buckets to keep, the longest window is
+        ``n_buckets * resolution`` seconds.
+    resolution : float, default=60.
+        The width of a bucket in seconds.
+    measure : callable, default=None
+        The measure (one from `irmetrics.topk`) used to evaluate the raw
+        ``(y_true, y_pred)`` inputs, see ``Window.add``.
+    clock : callable, default=time.monotonic
+        The source of the current time in seconds.
+
+    Examples
+    --------
+    >>> from irmetrics.online import Window
+    >>> from irmetrics.topk import rr
+    >>> window = Window(n_buckets=15, resolution=60., measure=rr)
+    >>> window.update([1., 0.5], now=0.)
+    >>> window.add([1, 1], [[0, 1], [2, 3]], now=120.)
+    >>> window.mean(now=120.)
+    0.5
+    >>> # MRR over the last minute (the current bucket)
+    >>> window.mean(60., now=120.)
+    0.25
+    """
+
+    def __init__(self, n_buckets, resolution=60., measure=None,
+                 clock=time.monotonic):
+        self.n_buckets = n_buckets
+        self.resolution = resolution
+        self.measure = measure
+        self.clock = clock
+
+        # The (sum, compensation) and the counts before each bucket
+        self._starts = np.zeros((n_buckets, 2))
+        self._start_counts = np.zeros(n_buckets, dtype=np.int64)
+        self._sum = np.zeros(2)
+        self._count = 0
+        self._bucket = None
+
+    def _advance(self, now):
+        bucket = int((self.clock() if now is None else now) // self.resolution)
+        if self._bucket is None:
+            self._bucket = bucket
+
+        # The new buckets (at most the whole ring) start with the totals
+        first = max(self._bucket + 1, bucket - self.n_buckets + 1)
+        index = np.arange(first, bucket + 1) % self.n_buckets
+        self._starts[index] = self._sum
+        self._start_counts[index] = self._count
+
+        # Late values are added to the latest bucket
+        self._bucket = max(self._bucket, bucket)
+        return self._bucket
+
+    def update(self, values, now=None):
+        """Add a batch of per-query values, ``np.nan`` values are ignored.
+
+        Parameters
+        ----------
+        values : scalar, iterable or ndarray of shape (n_samples,)
+            The values of the measure.
+        now : float, default=None
+            The current time in seconds. If None, use ``clock``.
+        """
+        values = np.atleast_1d(values)
+        values = values[~np.isnan(values)]
+
+        self._advance(now)
+        self._sum = _compensated(self._sum, values.sum())
+        self._count += values.size
+
+    def add(self, y_true, y_pred, now=None, **kwargs):
+        """Evaluate ``measure`` on the raw inputs and add the values.
+        The keyword arguments are passed to ``measure``.
+        """
+        self.update(self.measure(y_true, y_pred, **kwargs), now)
+
+    def totals(self, window=None, now=None):
+        """Calculate the sum and the number of values within the window.
+
+        Parameters
+        ----------
+        window : float, default=None
+            The length of the window in seconds, rounded up to the whole
+            buckets. If None, use the longest window available.
+        now : float, default=None
+            The current time in seconds. If None, use ``clock``.
+
+        Returns
+        -------
+        sum : float
+            The sum of the values within the window.
+        count : int
+            The number of values within the window.
+        """
+        last = self._advance(now)
+        n_buckets = self.n_buckets
+        if window is not None and window < n_buckets * self.resolution:
+            n_buckets = int(np.ceil(window / self.resolution))
+        if n_buckets <= 0:
+            return 0., 0
+
+        index = (last - n_buckets + 1) % self.n_buckets
+        total = (self._sum - self._starts[index]).sum()
+        return float(total), int(self._count - self._start_counts[index])
+
+    def mean(self, window=None, now=None):
+        """Calculate the mean value within the window, see ``totals``."""
+        total, count = self.totals(window, now)
+        return total / count if count else np.nan
+
+
+class Decayed:
+    """Exponentially time-decayed mean of per-query measures.
+    Each value is weighted by ``0.5 ** (age / halflife)``, the state is
+    just the decayed sum and the decayed count.
+
+    Parameters
+    ----------
+    halflife : float
+        The time in seconds after which the weight of a value halves.
+    measure : callable, default=None
+        The measure (one from `irmetrics.topk`) used to evaluate the raw
+        ``(y_true, y_pred)`` inputs, see ``Decayed.add``.
+    clock : callable, default=time.monotonic
+        The source of the current time in seconds.
+
+    Examples
+    --------
+    >>> from irmetrics.online import Decayed
+    >>> decayed = Decayed(halflife=60.)
+    >>> decayed.update([1., 1.], now=0.)
+    >>> decayed.update([0.], now=60.)
+    >>> decayed.mean(now=60.)
+    0.5
+    """
+
+    def __init__(self, halflife, measure=None, clock=time.monotonic):
+        self.halflife = halflife
+        self.measure = measure
+        self.clock = clock
+        self._sum = 0.
+        self._count = 0.
+        self._time = None
+
+    def _decay(self, now):
+        now = self.clock() if now is None else now
+        if self._time is not None and now > self._time:
+            factor = 0.5 ** ((now - self._time) / self.halflife)
+            self._sum *= factor
+            self._count *= factor
+        self._time = now if self._time is None else max(now, self._time)
+
+    def update(self, values, now=None):
+        """Add a batch of per-query values, ``np.nan`` values are ignored.
+
+        Parameters
+        ----------
+        values : scalar, iterable or ndarray of shape (n_samples,)
+            The values of the measure.
+        now : float, default=None
+            The current time in seconds. If None, use ``clock``.
+        """
+        values = np.atleast_1d(values)
+        values = values[~np.isnan(values)]
+
+        self._decay(now)
+        self._sum += values.sum()
+        self._count += values.size
+
+    def add(self, y_true, y_pred, now=None, **kwargs):
+        """Evaluate ``measure`` on the raw inputs and add the values.
+        The keyword arguments are passed to ``measure``.
+        """
+        self.update(self.measure(y_true, y_pred, **kwargs), now)
+
+    def mean(self, now=None):
+        """Calculate the decayed mean value.
+
+        Parameters
+        ----------
+        now : float, default=None
+            The current time in seconds. If None, use ``clock``.
+        """
+        self._decay(now)
+        return self._sum / self._count if self._count else np.nan
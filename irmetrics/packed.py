@@ -0,0 +1,346 @@
+import numpy as np
+
+from irmetrics.relevance import multilabel as _multilabel
+
+# The properties of all byte values, the first position is the highest bit
+_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)
+_POPCOUNT = _BITS.sum(-1, dtype=np.uint8)
+_FIRST = np.where(_POPCOUNT > 0, _BITS.argmax(-1), 8)
+_RANKS = np.cumsum(_BITS, axis=-1) * _BITS
+
+# The largest number of bytes whose (float) sums are looked up at once
+BLOCK_SIZE = 2 ** 20
+
+
+class PackedRelevance:
+    """Binary relevance judgements packed with ``np.packbits``.
+    Each byte holds the judgements of 8 consecutive positions, the first
+    position is the highest bit. The metrics from `irmetrics.topk` accept
+    the instances of this class as the outputs of the relevance functions,
+    see ``irmetrics.packed.multilabel``.
+
+    Parameters
+    ----------
+    bits : ndarray of shape (n_samples, ceil(n_labels / 8))
+        The packed judgements, ``np.uint8``.
+    n_labels : int
+        The number of positions.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.packed import PackedRelevance
+    >>> packed = PackedRelevance.pack(np.array([[0, 1, 0, 1]], dtype=bool))
+    >>> packed.bits
+    array([[80]], dtype=uint8)
+    >>> packed.counts()
+    array([2])
+    >>> packed.first()
+    array([1])
+    """
+
+    def __init__(self, bits, n_labels):
+        self.bits = bits
+        self.n_labels = n_labels
+
+    @classmethod
+    def pack(cls, relevance):
+        """Pack the boolean judgements of shape (n_samples, n_labels)."""
+        relevance = np.asarray(relevance, dtype=bool)
+        return cls(np.packbits(relevance, axis=-1), relevance.shape[-1])
+
+    @property
+    def shape(self):
+        return self.bits.shape[:-1] + (self.n_labels,)
+
+    def unpack(self):
+        """Convert to the boolean judgements of shape (n_samples, n_labels).
+        """
+        return np.unpackbits(
+            self.bits, axis=-1, count=self.n_labels).astype(bool)
+
+    def truncate(self, k=None):
+        """Keep the first k positions only."""
+        if k is None or k >= self.n_labels:
+            return self
+
+        bits = self.bits[..., :-(-k // 8)].copy()
+        if k % 8:
+            bits[..., -1] &= np.uint8(0xff << (8 - k % 8) & 0xff)
+        return PackedRelevance(bits, k)
+
+    def __and__(self, other):
+        if not isinstance(other, PackedRelevance):
+            other = PackedRelevance.pack(np.broadcast_to(other, self.shape))
+        return PackedRelevance(self.bits & other.bits, self.n_labels)
+
+    def counts(self):
+        """Count the relevant positions in each row."""
+        return np.add.reduce(_POPCOUNT[self.bits], axis=-1, dtype=np.int64)
+
+    def first(self):
+        """Find the first relevant position in each row, -1 if none."""
+        nonzero = self.bits != 0
+        index = nonzero.argmax(-1)
+        byte = np.take_along_axis(self.bits, index[..., None], -1)[..., 0]
+        return np.where(nonzero.any(-1), index * 8 + _FIRST[byte], -1)
+
+    def reduce(self, weights, ranked=None):
+        """Sum the weights of the relevant positions byte by byte.
+
+        Parameters
+        ----------
+        weights : ndarray of shape (n_labels,)
+            The weights of the positions.
+        ranked : ndarray of shape (n_labels,), default=None
+            If not None, each relevant position also adds its weight
+            multiplied by the number of relevant positions up to (and
+            including) it within its byte.
+
+        Returns
+        -------
+        sums : ndarray of shape (n_samples, n_bytes)
+            The sums for each byte.
+        """
+        n_bytes = self.bits.shape[-1]
+        weights = np.resize(np.append(weights, np.zeros(8)), n_bytes * 8)
+        weights = weights.reshape(n_bytes, 8)
+
+        # The sums for all byte values at all offsets: (256, n_bytes)
+        table = _BITS @ weights.T
+        if ranked is not None:
+            ranked = np.resize(np.append(ranked, np.zeros(8)), n_bytes * 8)
+            table = table + _RANKS @ ranked.reshape(n_bytes, 8).T
+        return table[self.bits, np.arange(n_bytes)]
+
+
+def ispacked(x):
+    """Check if ``x`` is a ``PackedRelevance``."""
+    return isinstance(x, PackedRelevance)
+
+
+def multilabel(y_true, y_pred, block=4096):
+    """Compute packed relevance(s) of predicted labels.
+    The same as ``irmetrics.relevance.multilabel``, but the boolean
+    judgements are calculated and packed in blocks of positions, so the full
+    boolean matrix is never allocated.
+
+    Parameters
+    ----------
+    y_true : ndarray of shape (n_samples, n_true), where `n_samples >= 1`
+        Ground true labels for a given query (as returned by an IR system).
+    y_pred : ndarray of shape (n_samples, n_labels), where `n_samples >= 1`
+        Target labels sorted by relevance (as returned by an IR system).
+    block : int, default=4096
+        The number of positions processed at once, a multiple of 8.
+
+    Returns
+    -------
+    relevance : PackedRelevance
+        The packed relevance judgements of shape (n_samples, n_labels).
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.packed import multilabel
+    >>> from irmetrics.topk import rr
+    >>> y_true = np.array([[1, 4]])
+    >>> y_pred = np.array([[0, 1, 4]])
+    >>> multilabel(y_true, y_pred).unpack()
+    array([[False,  True,  True]])
+    >>> rr(y_true, y_pred, relevance=multilabel)
+    0.5
+    """
+    bits = [
+        np.packbits(_multilabel(y_true, y_pred[:, i:i + block]), axis=-1)
+        for i in range(0, y_pred.shape[-1], block)
+    ]
+    return PackedRelevance(np.concatenate(bits, axis=-1), y_pred.shape[-1])
+
+
+def _discounts(n_labels):
+    return 1. / np.log2(np.arange(n_labels) + 2)
+
+
+def _by_rows(f, relevance, *args):
+    # The sums of the bytes are floats, 8 times the packed bits, so only
+    # the blocks of rows are reduced at once
+    n_bytes = relevance.bits.shape[-1]
+    bits = relevance.bits.reshape(-1, n_bytes)
+    step = max(BLOCK_SIZE // max(n_bytes, 1), 1)
+    outputs = [
+        f(PackedRelevance(bits[i:i + step], relevance.n_labels), *args)
+        for i in range(0, max(len(bits), 1), step)
+    ]
+    return np.concatenate(outputs).reshape(relevance.shape[:-1])
+
+
+def _gains(relevance):
+    return relevance.reduce(_discounts(relevance.n_labels)).sum(-1)
+
+
+def _precisions(relevance, n_labels):
+    # hits / position = (before + rank within the byte) / position
+    inverse = 1. / np.arange(1, relevance.n_labels + 1)
+    counts = _POPCOUNT[relevance.bits]
+    before = np.cumsum(counts, axis=-1, dtype=np.int64) - counts
+    per_position = relevance.reduce(inverse)
+    ranked = relevance.reduce(np.zeros(relevance.n_labels), inverse)
+    return (before * per_position + ranked).sum(-1) / n_labels
+
+
+def rr(relevance):
+    """Compute Reciprocal Rank(s) from the first set bits.
+
+    Parameters
+    ----------
+    relevance : PackedRelevance of shape (n_samples, n_labels)
+        The packed relevance judgements.
+
+    Returns
+    -------
+    rr : ndarray of shape (n_samples,)
+        The reciprocal ranks for all samples.
+
+    Examples
+    --------
+    >>> from irmetrics.packed import PackedRelevance, rr
+    >>> rr(PackedRelevance.pack([[0, 1, 0, 0], [0, 0, 0, 0]]))
+    array([0.5, 0. ])
+    """
+    first = relevance.first()
+    return (first >= 0) / (np.maximum(first, 0) + 1)
+
+
+def recall(relevance, n_relevant):
+    """Compute Recall(s) from the number of set bits.
+
+    Parameters
+    ----------
+    relevance : PackedRelevance of shape (n_samples, n_labels)
+        The packed relevance judgements.
+    n_relevant : int or ndarray of shape (n_samples,)
+        The total number of relevant labels per sample.
+
+    Returns
+    -------
+    recall : ndarray of shape (n_samples,)
+        The fraction of relevant labels found.
+
+    Examples
+    --------
+    >>> from irmetrics.packed import PackedRelevance, recall
+    >>> recall(PackedRelevance.pack([[0, 1, 0, 1]]), 4)
+    array([0.5])
+    """
+    return relevance.counts() / n_relevant
+
+
+def precision(relevance):
+    """Compute Precision(s) from the number of set bits.
+
+    Parameters
+    ----------
+    relevance : PackedRelevance of shape (n_samples, n_labels)
+        The packed relevance judgements.
+
+    Returns
+    -------
+    precision : ndarray of shape (n_samples,)
+        The fraction of relevant labels among all positions.
+
+    Examples
+    --------
+    >>> from irmetrics.packed import PackedRelevance, precision
+    >>> precision(PackedRelevance.pack([[0, 1, 0, 1]]))
+    array([0.5])
+    """
+    return relevance.counts() / relevance.n_labels
+
+
+def dcg(relevance, k=None, weights=1.):
+    """Compute Discounted Cumulative Gain score(s) of binary judgements.
+    The gains are summed byte by byte, see ``PackedRelevance.reduce``.
+
+    Parameters
+    ----------
+    relevance : PackedRelevance of shape (n_samples, n_labels)
+        The packed relevance judgements.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    weights : default=1.0, scalar, iterable or ndarray of shape (n_samples,)
+        takes into account the importance of each sample, if relevant.
+
+    Returns
+    -------
+    dcg : ndarray of shape (n_samples,)
+        The discounted cumulative gains for samples.
+
+    Examples
+    --------
+    >>> from irmetrics.packed import PackedRelevance, dcg
+    >>> dcg(PackedRelevance.pack([[0, 1, 0, 0]]))
+    array([0.63092975])
+    """
+    return _by_rows(_gains, relevance.truncate(k)) * weights
+
+
+def ndcg(relevance, k=None, weights=1.):
+    """Compute Normalized Discounted Cumulative Gain score(s), the ideal
+    ranking puts all set bits first.
+
+    Parameters
+    ----------
+    relevance : PackedRelevance of shape (n_samples, n_labels)
+        The packed relevance judgements.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    weights : default=1.0, scalar, iterable or ndarray of shape (n_samples,)
+        Represents the weights of each sample.
+
+    Returns
+    -------
+    ndcg : ndarray of shape (n_samples,)
+        The normalized discounted cumulative gains for samples.
+
+    Examples
+    --------
+    >>> from irmetrics.packed import PackedRelevance, ndcg
+    >>> ndcg(PackedRelevance.pack([[0, 1, 0, 0], [1, 1, 0, 0]]))
+    array([0.63092975, 1.        ])
+    """
+    relevance = relevance.truncate(k)
+    ideal = np.cumsum(np.append(0., _discounts(relevance.n_labels)))
+    idcg = ideal[relevance.counts()]
+    return dcg(relevance) / (idcg * weights)
+
+
+def ap(relevance, n_true):
+    """Compute Average Precision score(s), the normalization is the same as
+    for ``irmetrics.topk.ap``. The number of set bits before each byte is
+    the exclusive cumulative sum of the byte popcounts.
+
+    Parameters
+    ----------
+    relevance : PackedRelevance of shape (n_samples, n_labels)
+        The packed relevance judgements.
+    n_true : int
+        The number of true labels per sample, only the first ``n_true``
+        positions contribute to the score.
+
+    Returns
+    -------
+    ap : ndarray of shape (n_samples,)
+        The average precision for all samples.
+
+    Examples
+    --------
+    >>> from irmetrics.packed import PackedRelevance, ap
+    >>> ap(PackedRelevance.pack([[1, 0, 0]]), 3)
+    array([0.33333333])
+    """
+    n_labels = relevance.n_labels
+    relevance = relevance.truncate(min(n_true, n_labels))
+    return _by_rows(_precisions, relevance, n_labels)
@@ -1,11 +1,18 @@
+import numpy as np
+
+# The largest number of true labels compared one by one
+SMALL_N_TRUE = 32
+
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+
 def unilabel(y_true, y_pred):
     """Compute relevance(s) of predicted labels.
     This version of the relevance function works only for the queries
     (problems) with a single groud truth label.
 
-    It is provided mainly for two reasons: there is a slight speedup (order of
-    seconds for the large `n_samples`) and it adds expresivity
-    if needed.
+    It is provided mainly for the expresivity: ``multilabel`` already uses
+    the same comparison for a single true label.
 
     Parameters
     ----------
@@ -50,6 +57,10 @@ def unilabel(y_true, y_pred):
 
 def multilabel(y_true, y_pred):
     """Compute relevance(s) of predicted labels.
+    The comparisons are chosen by the shapes and the dtypes of the labels:
+    a single true label is compared directly, up to ``SMALL_N_TRUE`` labels
+    are compared one by one, more labels are looked up in the sorted integer
+    codes of the labels. Object arrays are always compared with broadcasting.
 
     Parameters
     ----------
@@ -87,9 +98,87 @@ def multilabel(y_true, y_pred):
     >>> multilabel(y_true, y_pred)
     array([[False,  True,  True]])
     """
+    return _kernel(y_true, y_pred)(y_true, y_pred)
+
+
+def _kernel(y_true, y_pred):
+    # Choose the comparisons by the number of true labels and the dtypes
+    n_true = y_true.shape[-1]
+    if object in (y_true.dtype, y_pred.dtype):
+        return _broadcast
+    if n_true == 1:
+        return _equal
+    if 1 < n_true <= SMALL_N_TRUE:
+        return _unrolled
+    if n_true > SMALL_N_TRUE and _sortable(y_true, y_pred):
+        return _sorted
+    return _broadcast
+
+
+def _broadcast(y_true, y_pred):
+    # The generic path, any labels that support `==`
     return (y_pred[:, :, None] == y_true[:, None]).any(axis=-1)
 
 
+def _equal(y_true, y_pred):
+    return y_pred == y_true
+
+
+def _unrolled(y_true, y_pred):
+    # No (n_samples, n_labels, n_true) intermediate arrays
+    relevant = y_pred == y_true[:, [0]]
+    for i in range(1, y_true.shape[-1]):
+        relevant |= y_pred == y_true[:, [i]]
+    return relevant
+
+
+def _sortable(y_true, y_pred):
+    kinds = {y_true.dtype.kind, y_pred.dtype.kind}
+    if kinds <= set("iub"):
+        return np.result_type(y_true, y_pred).kind in "iub"
+    return len(kinds) == 1 and kinds <= set("fUSM")
+
+
+def _codes(y_true, y_pred):
+    # The integer codes of the labels in the same order as the labels
+    if y_true.dtype.kind in "iub":
+        low = int(min(y_true.min(initial=0), y_pred.min(initial=0)))
+        high = int(max(y_true.max(initial=0), y_pred.max(initial=0)))
+        span = high - low + 1
+        if high <= _INT64_MAX and span * y_pred.shape[0] <= _INT64_MAX:
+            return y_true.astype(np.int64) - low, \
+                y_pred.astype(np.int64) - low, span
+
+    labels = np.concatenate([y_true.ravel(), y_pred.ravel()])
+    uniques, codes = np.unique(labels, return_inverse=True)
+    return codes[:y_true.size].reshape(y_true.shape), \
+        codes[y_true.size:].reshape(y_pred.shape), uniques.size
+
+
+def _sorted(y_true, y_pred):
+    # Look up the (row, label) keys of y_pred among the sorted keys of y_true
+    n_samples = max(y_true.shape[0], y_pred.shape[0])
+    y_true = np.broadcast_to(y_true, (n_samples, y_true.shape[-1]))
+    y_pred = np.broadcast_to(y_pred, (n_samples, y_pred.shape[-1]))
+
+    true_codes, pred_codes, span = _codes(y_true, y_pred)
+    rows = np.arange(n_samples)[:, None] * span
+    keys = np.sort((true_codes + rows).ravel())
+    queries = pred_codes + rows
+
+    if not keys.size:
+        return np.zeros(queries.shape, dtype=bool)
+
+    position = np.searchsorted(keys, queries)
+    position = np.minimum(position, keys.size - 1)
+    relevant = keys[position] == queries
+
+    # NaN labels are equal after the encoding, but not for `==`
+    if y_pred.dtype.kind == "f":
+        relevant &= y_pred == y_pred
+    return relevant
+
+
 def relevant_counts(y_pred, y_true):
     """Calculate the total number of relevant items.
 
@@ -0,0 +1,127 @@
+import numpy as np
+
+from irmetrics.topk import rr, recall, ndcg, ap
+
+
+def _merge(scores, indices, block_scores, offset, k):
+    # Keep the k highest scores of the running top-k and the new block
+    scores = np.concatenate([scores, block_scores], axis=-1)
+    block_indices = np.broadcast_to(
+        np.arange(offset, offset + block_scores.shape[-1]), block_scores.shape)
+    indices = np.concatenate([indices, block_indices], axis=-1)
+    if scores.shape[-1] <= k:
+        return scores, indices
+
+    top = np.argpartition(-scores, k - 1, axis=-1)[:, :k]
+    return (
+        np.take_along_axis(scores, top, axis=-1),
+        np.take_along_axis(indices, top, axis=-1),
+    )
+
+
+def search(queries, docs, k, query_block=1024, doc_block=16384):
+    """Find the k documents with the highest dot products for each query.
+    The similarities are calculated in blocks of ``query_block`` queries by
+    ``doc_block`` documents, so the memory doesn't depend on the size of
+    the corpus. The running top-k of each query is merged with each block
+    using ``np.argpartition``.
+
+    Parameters
+    ----------
+    queries : ndarray of shape (n_queries, n_features)
+        The query embeddings.
+    docs : ndarray of shape (n_docs, n_features)
+        The document embeddings, e.g. a memory-mapped array.
+    k : int
+        The number of documents to retrieve.
+    query_block : int, default=1024
+        The number of queries processed at once.
+    doc_block : int, default=16384
+        The number of documents processed at once.
+
+    Returns
+    -------
+    scores : ndarray of shape (n_queries, k)
+        The highest similarities sorted in descending order.
+    indices : ndarray of shape (n_queries, k)
+        The indices (rows of ``docs``) of the retrieved documents.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.retrieval import search
+    >>> queries = np.array([[1., 0.], [0., 1.]])
+    >>> docs = np.array([[1., 0.], [0., 1.], [.5, .5]])
+    >>> scores, indices = search(queries, docs, k=2)
+    >>> indices
+    array([[0, 2],
+           [1, 2]])
+    """
+    queries, docs = np.asarray(queries), np.asarray(docs)
+    k = min(k, docs.shape[0])
+    dtype = np.result_type(queries, docs)
+
+    all_scores = np.empty((queries.shape[0], k), dtype=dtype)
+    all_indices = np.empty((queries.shape[0], k), dtype=np.intp)
+    for start in range(0, queries.shape[0], query_block):
+        batch = queries[start:start + query_block]
+        scores = np.empty((batch.shape[0], 0), dtype=dtype)
+        indices = np.empty((batch.shape[0], 0), dtype=np.intp)
+        for offset in range(0, docs.shape[0], doc_block):
+            block = batch @ docs[offset:offset + doc_block].T
+            scores, indices = _merge(scores, indices, block, offset, k)
+
+        order = np.argsort(-scores, axis=-1, kind="stable")
+        stop = start + batch.shape[0]
+        all_scores[start:stop] = np.take_along_axis(scores, order, axis=-1)
+        all_indices[start:stop] = np.take_along_axis(indices, order, axis=-1)
+    return all_scores, all_indices
+
+
+def evaluate(y_true, queries, docs, k, measures=None, doc_ids=None,
+             **kwargs):
+    """Evaluate the exact top-k retrieval with the embeddings.
+    Retrieve the documents with ``irmetrics.retrieval.search`` and evaluate
+    the rankings with the measures from `irmetrics.topk`.
+
+    Parameters
+    ----------
+    y_true : scalar, iterable or ndarray of shape (n_queries, n_true)
+        The ids of the relevant documents for each query.
+    queries : ndarray of shape (n_queries, n_features)
+        The query embeddings.
+    docs : ndarray of shape (n_docs, n_features)
+        The document embeddings.
+    k : int
+        The number of documents to retrieve.
+    measures : dict, default=None
+        The measures (from `irmetrics.topk`) to calculate, by names.
+        If None, calculate ``rr``, ``recall``, ``ndcg`` and ``ap``.
+    doc_ids : iterable, ndarray of shape (n_docs,), default=None
+        The ids of the documents. If None, use the row indices of ``docs``.
+    **kwargs : dict
+        The parameters passed to ``irmetrics.retrieval.search``.
+
+    Returns
+    -------
+    results : dict
+        The per-query values of each measure, by names.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.retrieval import evaluate
+    >>> queries = np.array([[1., 0.], [0., 1.]])
+    >>> docs = np.array([[1., 0.], [0., 1.], [.5, .5]])
+    >>> evaluate([2, 1], queries, docs, k=2)["rr"]
+    array([0.5, 1. ])
+    """
+    if measures is None:
+        measures = {"rr": rr, "recall": recall, "ndcg": ndcg, "ap": ap}
+
+    _, indices = search(queries, docs, k, **kwargs)
+    y_pred = indices if doc_ids is None else np.asarray(doc_ids)[indices]
+    return {
+        name: measure(y_true, y_pred, k)
+        for name, measure in measures.items()
+    }
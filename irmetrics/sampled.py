@@ -0,0 +1,287 @@
+import numpy as np
+
+from irmetrics.io import to_scalar
+
+METHODS = ("adjusted", "expected")
+
+
+def ranks(positives, negatives):
+    """Compute the ranks of the positives among the sampled negatives.
+
+    Parameters
+    ----------
+    positives : iterable, ndarray of shape (n_queries,) or (n_queries, n_pos)
+        The scores of the relevant items, ``np.nan`` is padding.
+    negatives : iterable, ndarray of shape (n_queries, n_sampled)
+        The scores of the sampled negatives.
+
+    Returns
+    -------
+    ranks : ndarray of shape (n_queries, n_pos)
+        The ranks starting from 1: one plus the number of the sampled
+        negatives with the higher scores, ``np.nan`` for the padding.
+
+    Examples
+    --------
+    >>> from irmetrics.sampled import ranks
+    >>> ranks([0.5, 0.9], [[0.1, 0.7, 0.8], [0.1, 0.2, 0.3]])
+    array([[3.],
+           [1.]])
+    """
+    positives = np.asarray(positives, dtype=np.float64)
+    if positives.ndim == 1:
+        positives = positives[:, None]
+    negatives = np.asarray(negatives, dtype=np.float64)
+
+    higher = np.sum(negatives[:, None] > positives[..., None], axis=-1)
+    return np.where(np.isnan(positives), np.nan, higher + 1.)
+
+
+def _log_factorials(n):
+    return np.concatenate([[0.], np.cumsum(np.log(np.arange(1, n + 1)))])
+
+
+def _log_binomial(sampled, n, rate, log_factorials):
+    # log P(sampled | n negatives above, each kept with `rate`)
+    above = n - sampled
+    possible = above >= 0
+    above = np.where(possible, above, 0)
+    # All negatives are kept if rate is 1, (1 - rate) ** 0 is 1
+    dropped = np.where(above > 0, -np.inf, 0.)
+    if rate < 1:
+        dropped = above * np.log1p(-rate)
+
+    log_pmf = (
+        log_factorials[n] - log_factorials[sampled] - log_factorials[above] +
+        sampled * np.log(rate) + dropped
+    )
+    return np.where(possible, log_pmf, -np.inf)
+
+
+def _normalizer(sampled, rate, n_items):
+    # The sum of the likelihoods over all full ranks:
+    # sum_{n < n_items} P(sampled | n) = P(Binomial(n_items, rate) > sampled)
+    if n_items is None:
+        return np.full(sampled.shape, 1. / rate)
+
+    from scipy.special import betainc
+
+    tail = betainc(sampled + 1., np.maximum(n_items - sampled, 1e-12), rate)
+    return np.where(sampled < n_items, tail / rate, 0.)
+
+
+def _adjusted(sampled, rate, gains, n_items, block):
+    # The posterior mean of the gains with the uniform prior of the ranks
+    uniques, inverse = np.unique(sampled, return_inverse=True)
+    log_factorials = _log_factorials(max(gains.size, uniques.max() + 1))
+
+    # The likelihoods of at most `block` (sampled, full rank) pairs at once
+    step = max(block // uniques.size, 1)
+    totals = np.zeros(uniques.size)
+    for start in range(0, gains.size, step):
+        n = np.arange(start, min(start + step, gains.size))
+        log_pmf = _log_binomial(
+            uniques[:, None], n[None], rate, log_factorials)
+        totals += np.exp(log_pmf) @ gains[n]
+
+    return (totals / _normalizer(uniques, rate, n_items))[inverse]
+
+
+def _expected(sampled, rate, gain, n_items):
+    # The expected number of the negatives above, given the sampled ones
+    full = 1. + sampled / rate
+    if n_items is not None:
+        full = np.minimum(full, n_items)
+    return gain(full)
+
+
+def _estimate(ranks, rate, gain, cutoff, n_items, method, block):
+    if method not in METHODS:
+        raise ValueError(
+            "Expected method to be one of {}, got {}".format(METHODS, method))
+    if not 0 < rate <= 1:
+        raise ValueError("Expected rate in (0, 1], got {}".format(rate))
+
+    ranks = np.asarray(ranks, dtype=np.float64)
+    valid = ~np.isnan(ranks)
+    sampled = ranks[valid].astype(np.int64) - 1
+
+    values = np.full(ranks.shape, np.nan)
+    if method == "expected":
+        values[valid] = _expected(sampled, rate, gain, n_items)
+        return values
+
+    # Only the possible full ranks up to the cutoff have nonzero gains
+    if cutoff is None:
+        cutoff = n_items
+    if cutoff is None:
+        raise ValueError("Either k or n_items is needed for this method")
+    if n_items is not None:
+        cutoff = min(cutoff, n_items)
+    gains = gain(np.arange(1., cutoff + 1))
+    values[valid] = _adjusted(sampled, rate, gains, n_items, block)
+    return values
+
+
+def _mean(values):
+    # The mean over the positives of each query, ignoring the padding
+    values = np.atleast_1d(values)
+    if values.ndim == 1:
+        return values
+    count = np.sum(~np.isnan(values), axis=-1)
+    with np.errstate(invalid="ignore"):
+        return np.nansum(values, axis=-1) / count
+
+
+def _cutoff(k):
+    if k is None:
+        return lambda full: np.ones_like(full)
+    return lambda full: (full <= k).astype(np.float64)
+
+
+def recall(ranks, rate, k, n_items=None, method="adjusted", block=2 ** 22):
+    """Estimate Recall@k(s) of the full catalog from the sampled ranks.
+    Each positive is ranked against the sampled negatives only (the
+    leave-one-out protocol), the estimates are averaged over the positives
+    of a query.
+
+    The ``"adjusted"`` method calculates the expected value of the metric
+    given the sampled rank: the number of the sampled negatives above a
+    positive is binomial, ``Binomial(full rank - 1, rate)``, all full ranks
+    are equally likely a priori. The ``"expected"`` method calculates the
+    metric at the expected full rank ``1 + (rank - 1) / rate``.
+
+    Parameters
+    ----------
+    ranks : iterable, ndarray of shape (n_queries,) or (n_queries, n_pos)
+        The ranks (starting from 1) of the positives among the sampled
+        negatives, see ``irmetrics.sampled.ranks``. ``np.nan`` is padding.
+    rate : float in (0., 1.]
+        The sampling rate: the probability of each negative to be sampled,
+        e.g. ``n_sampled / (n_items - 1)``.
+    k : int
+        The cutoff in the full catalog.
+    n_items : int, default=None
+        The number of items in the catalog. If None, the catalog is
+        considered infinite. The ``"adjusted"`` method needs ``scipy`` for
+        the finite catalogs.
+    method : {"adjusted", "expected"}, default="adjusted"
+        The estimator of the metric.
+    block : int, default=2 ** 22
+        The number of the (sampled rank, full rank) pairs processed at once
+        by the ``"adjusted"`` method, the memory is ``8 * block`` bytes.
+
+    Returns
+    -------
+    recall : float in [0., 1.]
+        The estimated recalls for all queries.
+
+    References
+    ----------
+    `Krichene and Rendle. On Sampled Metrics for Item Recommendation (2020)
+    <https://doi.org/10.1145/3394486.3403226>`_
+
+    Examples
+    --------
+    >>> from irmetrics.sampled import recall
+    >>> recall(1, rate=1., k=1)
+    1.0
+    >>> recall(1, rate=0.5, k=1)
+    0.5
+    >>> recall(1, rate=0.5, k=1, method="expected")
+    1.0
+    """
+    values = _estimate(ranks, rate, _cutoff(k), k, n_items, method, block)
+    return to_scalar(np.squeeze(_mean(values)))
+
+
+def ndcg(ranks, rate, k, n_items=None, method="adjusted", block=2 ** 22):
+    """Estimate Normalized Discounted Cumulative Gain@k score(s) of the full
+    catalog from the sampled ranks, see ``irmetrics.sampled.recall``. With
+    a single positive the ideal DCG is 1.
+
+    Parameters
+    ----------
+    ranks : iterable, ndarray of shape (n_queries,) or (n_queries, n_pos)
+        The ranks (starting from 1) of the positives among the sampled
+        negatives, see ``irmetrics.sampled.ranks``. ``np.nan`` is padding.
+    rate : float in (0., 1.]
+        The sampling rate: the probability of each negative to be sampled.
+    k : int
+        The cutoff in the full catalog.
+    n_items : int, default=None
+        The number of items in the catalog. If None, the catalog is
+        considered infinite.
+    method : {"adjusted", "expected"}, default="adjusted"
+        The estimator of the metric.
+    block : int, default=2 ** 22
+        The number of the (sampled rank, full rank) pairs processed at once
+        by the ``"adjusted"`` method, the memory is ``8 * block`` bytes.
+
+    Returns
+    -------
+    ndcg : float in [0., 1.]
+        The estimated normalized discounted cumulative gains for all queries.
+
+    Examples
+    --------
+    >>> from irmetrics.sampled import ndcg
+    >>> ndcg(2, rate=1., k=10)
+    0.6309297535714575
+    """
+    cutoff = _cutoff(k)
+
+    def gain(full):
+        return cutoff(full) / np.log2(full + 1)
+
+    values = _estimate(ranks, rate, gain, k, n_items, method, block)
+    return to_scalar(np.squeeze(_mean(values)))
+
+
+def rr(ranks, rate, k=None, n_items=None, method="adjusted", block=2 ** 22):
+    """Estimate Reciprocal Rank(s) of the full catalog from the sampled
+    ranks, see ``irmetrics.sampled.recall``. Only the highest ranked
+    positive of each query is used.
+
+    Parameters
+    ----------
+    ranks : iterable, ndarray of shape (n_queries,) or (n_queries, n_pos)
+        The ranks (starting from 1) of the positives among the sampled
+        negatives, see ``irmetrics.sampled.ranks``. ``np.nan`` is padding.
+    rate : float in (0., 1.]
+        The sampling rate: the probability of each negative to be sampled.
+    k : int, default=None
+        The cutoff in the full catalog. If None, use all ranks, then the
+        ``"adjusted"`` method needs ``n_items`` and sums over all full ranks
+        of the catalog: the time is proportional to ``n_items`` times the
+        number of the distinct sampled ranks.
+    n_items : int, default=None
+        The number of items in the catalog. If None, the catalog is
+        considered infinite.
+    method : {"adjusted", "expected"}, default="adjusted"
+        The estimator of the metric.
+    block : int, default=2 ** 22
+        The number of the (sampled rank, full rank) pairs processed at once
+        by the ``"adjusted"`` method, the memory is ``8 * block`` bytes.
+
+    Returns
+    -------
+    rr : float in [0., 1.]
+        The estimated reciprocal ranks for all queries.
+
+    Examples
+    --------
+    >>> from irmetrics.sampled import rr
+    >>> rr([[3, 2]], rate=1., n_items=10)
+    0.5
+    """
+    cutoff = _cutoff(k)
+
+    def gain(full):
+        return cutoff(full) / full
+
+    ranks = np.asarray(ranks, dtype=np.float64)
+    if ranks.ndim > 1:
+        ranks = np.fmin.reduce(ranks, axis=-1)
+    values = _estimate(ranks, rate, gain, k, n_items, method, block)
+    return to_scalar(np.squeeze(values))
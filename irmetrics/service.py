@@ -0,0 +1,278 @@
+import json
+import asyncio
+import numpy as np
+
+from collections import defaultdict
+from irmetrics.topk import rr, recall
+
+_SCALARS = (str, bytes, int, float, np.generic)
+
+
+class MetricsService:
+    """Evaluate a stream of ``(y_true, y_pred)`` events in micro-batches.
+    The events are queued and coalesced into batches either of
+    ``batch_size`` events or of the events received within ``max_delay``
+    seconds. Each batch is evaluated with the vectorized metrics and the
+    running means are updated. The queue is bounded: ``submit`` waits for
+    the free space when the evaluation can't keep up with the traffic.
+
+    The service can be used directly from ``asyncio`` code or over HTTP, see
+    ``MetricsService.serve``:
+
+    - ``POST /events`` accepts a JSON object
+      ``{"y_true": ..., "y_pred": [...]}`` or a list of such objects.
+    - ``GET /metrics`` returns the running means as a JSON object.
+
+    Parameters
+    ----------
+    measures : dict, default=None
+        The measures (from `irmetrics.topk`) to calculate, by names.
+        If None, calculate ``rr`` and ``recall``.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    batch_size : int, default=256
+        The maximal number of events in a batch.
+    max_delay : float, default=0.05
+        The maximal time in seconds to wait for a batch to fill up.
+    max_queue : int, default=4096
+        The maximal number of the events waiting for evaluation.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from irmetrics.service import MetricsService
+    >>> async def evaluate():
+    ...     async with MetricsService() as service:
+    ...         await service.submit(1, [0, 1, 4])
+    ...         await service.submit(1, [1, 0, 4])
+    ...         await service.flush()
+    ...         return service.summary()
+    >>> asyncio.new_event_loop().run_until_complete(evaluate())
+    {'count': 2, 'errors': 0, 'rr': 0.75, 'recall': 1.0}
+    """
+
+    def __init__(self, measures=None, k=None, batch_size=256, max_delay=0.05,
+                 max_queue=4096):
+        self.measures = measures or {"rr": rr, "recall": recall}
+        self.k = k
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.count = 0
+        self.errors = 0
+        self._sums = dict.fromkeys(self.measures, 0.)
+        self._counts = dict.fromkeys(self.measures, 0)
+        self._queue = None
+        self._worker = None
+
+    @property
+    def queue(self):
+        # Create the queue lazily: it should belong to the running loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        return self._queue
+
+    async def submit(self, y_true, y_pred):
+        """Add the event to the queue, wait if the queue is full."""
+        await self.queue.put((y_true, y_pred))
+
+    async def flush(self):
+        """Wait until all submitted events are evaluated."""
+        await self.queue.join()
+
+    def evaluate(self, events):
+        """Evaluate a batch of ``(y_true, y_pred)`` events.
+        The events with the same shapes and kinds of labels are evaluated
+        together, so the labels of different kinds (e.g. str and int) are
+        never compared as strings. The events
+        that are not a label (or a list of labels) and a non-empty list of
+        labels are counted as errors, as well as the groups that fail.
+        """
+        groups = defaultdict(list)
+        for y_true, y_pred in events:
+            try:
+                y_true, y_pred = _labels(y_true, y_pred)
+            except ValueError:
+                self.errors += 1
+                continue
+            key = (y_true.shape, y_true.dtype.kind,
+                   y_pred.shape, y_pred.dtype.kind)
+            groups[key].append((y_true, y_pred))
+
+        for group in groups.values():
+            try:
+                outputs = self._evaluate(*map(np.stack, zip(*group)))
+            except Exception:
+                # A failed group should never stop the worker
+                self.errors += len(group)
+                continue
+
+            for name, values in outputs.items():
+                finite = values[~np.isnan(values)]
+                self._sums[name] += finite.sum()
+                self._counts[name] += finite.size
+            self.count += len(group)
+
+    def _evaluate(self, y_true, y_pred):
+        return {
+            name: np.atleast_1d(measure(y_true, y_pred, self.k))
+            for name, measure in self.measures.items()
+        }
+
+    def summary(self):
+        """Report the number of events, failed events and the running means.
+        """
+        means = {
+            name: float(self._sums[name] / self._counts[name])
+            if self._counts[name] else None
+            for name in self.measures
+        }
+        return dict(count=self.count, errors=self.errors, **means)
+
+    async def _batch(self):
+        loop = asyncio.get_running_loop()
+        events = [await self.queue.get()]
+        deadline = loop.time() + self.max_delay
+        while len(events) < self.batch_size:
+            if not self.queue.empty():
+                events.append(self.queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            # Unlike `wait_for`, `wait` never drops an item that was received
+            getter = asyncio.ensure_future(self.queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=timeout)
+            if not done:
+                getter.cancel()
+                break
+            events.append(getter.result())
+        return events
+
+    async def _run(self):
+        while True:
+            events = await self._batch()
+            try:
+                self.evaluate(events)
+            finally:
+                for _ in events:
+                    self.queue.task_done()
+
+    async def start(self):
+        """Start evaluating the queued events in the background."""
+        if self._worker is None:
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop the evaluation, the events left in the queue are kept."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def handle(self, reader, writer):
+        """Handle a single HTTP request, see ``asyncio.start_server``."""
+        try:
+            method, path, body = await _read_request(reader)
+            status, payload = await self._respond(method, path, body)
+        except asyncio.IncompleteReadError:
+            # The client has disconnected before sending the whole request
+            writer.close()
+            return
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = "400 Bad Request", {"error": str(e)}
+
+        content = json.dumps(payload).encode()
+        writer.write(
+            "HTTP/1.1 {}\r\n"
+            "Content-Type: application/json\r\n"
+            "Content-Length: {}\r\n"
+            "Connection: close\r\n\r\n".format(status, len(content)).encode()
+            + content
+        )
+        await writer.drain()
+        writer.close()
+
+    async def _respond(self, method, path, body):
+        if (method, path) == ("GET", "/metrics"):
+            return "200 OK", self.summary()
+
+        if (method, path) == ("POST", "/events"):
+            events = json.loads(body.decode() or "[]")
+            if isinstance(events, dict):
+                events = [events]
+            for event in events:
+                await self.submit(event["y_true"], event["y_pred"])
+            return "202 Accepted", {"accepted": len(events)}
+
+        return "404 Not Found", {"error": "{} {}".format(method, path)}
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """Start the evaluation and the HTTP server.
+
+        Returns
+        -------
+        server : asyncio.AbstractServer
+            The running server, close it to stop accepting the requests.
+        """
+        await self.start()
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def _labels(y_true, y_pred):
+    y_true, y_pred = np.atleast_1d(y_true), np.asarray(y_pred)
+    if y_true.ndim != 1 or y_pred.ndim != 1 or not y_pred.size:
+        raise ValueError("Expected a label or a list of labels and "
+                         "a non-empty list of labels")
+    for labels in (y_true, y_pred):
+        if labels.dtype == object and not all(
+                isinstance(v, _SCALARS) for v in labels.tolist()):
+            raise ValueError("Expected scalar labels, got {}".format(labels))
+    return y_true, y_pred
+
+
+async def _read_request(reader):
+    method, path, _ = (await reader.readline()).decode().split(" ", 2)
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return method, path, body
+
+
+def main(host="127.0.0.1", port=8000, **kwargs):
+    """Run the service until interrupted."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    service = MetricsService(**kwargs)
+    server = loop.run_until_complete(service.serve(host, port))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.run_until_complete(service.stop())
+        loop.close()
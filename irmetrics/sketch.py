@@ -0,0 +1,165 @@
+import numpy as np
+
+
+class QuantileSketch:
+    """Mergeable KLL quantile sketch of per-query measures.
+    The values are kept in a hierarchy of compactors: the items of level
+    ``h`` have the weight ``2 ** h``. When a level overflows, its items are
+    sorted and every other item is promoted to the next level. The memory is
+    ``O(k)`` regardless of the number of values and the rank error is
+    ``O(1 / k)``.
+
+    The sketches built on different shards can be merged with ``merge`` and
+    transferred with ``to_bytes`` / ``from_bytes``.
+
+    Parameters
+    ----------
+    k : int, default=200
+        The capacity of the top level, controls the accuracy and the memory.
+    measure : callable, default=None
+        The measure (one from `irmetrics.topk`) used to evaluate the raw
+        ``(y_true, y_pred)`` inputs, see ``QuantileSketch.add``.
+    seed : int, default=None
+        The seed for choosing the promoted items.
+
+    Examples
+    --------
+    >>> from irmetrics.sketch import QuantileSketch
+    >>> from irmetrics.topk import rr
+    >>> sketch = QuantileSketch(measure=rr)
+    >>> sketch.add([1, 1, 1, 1], [[1, 2], [2, 1], [1, 2], [2, 3]])
+    >>> sketch.quantile([0.1, 0.5, 0.9])
+    array([0. , 0.5, 1. ])
+
+    The sketches are combined by merging:
+
+    >>> other = QuantileSketch.from_bytes(sketch.to_bytes())
+    >>> sketch.merge(other).n
+    8
+    """
+
+    def __init__(self, k=200, measure=None, seed=None):
+        self.k = k
+        self.measure = measure
+        self.n = 0
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # The lower levels are smaller, see Karnin, Lang and Liberty (2016)
+        depth = len(self._levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+
+                # Keep one item if the number of items is odd
+                items = np.sort(items)
+                odd = items.size % 2
+                promoted = items[odd + self._rng.integers(2)::2]
+                self._levels[level] = items[:odd]
+                self._levels[level + 1] = np.concatenate(
+                    [self._levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add a batch of per-query values, ``np.nan`` values are ignored.
+
+        Parameters
+        ----------
+        values : scalar, iterable or ndarray of shape (n_samples,)
+            The values of the measure.
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64)).ravel()
+        values = values[~np.isnan(values)]
+        self.n += values.size
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+
+    def add(self, y_true, y_pred, **kwargs):
+        """Evaluate ``measure`` on the raw inputs and add the values.
+        The keyword arguments are passed to ``measure``.
+        """
+        self.update(self.measure(y_true, y_pred, **kwargs))
+
+    def merge(self, other):
+        """Add the values of the other sketch to this one.
+
+        Parameters
+        ----------
+        other : QuantileSketch
+            The sketch to merge, it is not modified.
+
+        Returns
+        -------
+        self : QuantileSketch
+            The merged sketch.
+        """
+        for level, items in enumerate(other._levels):
+            if level == len(self._levels):
+                self._levels.append(np.empty(0))
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _weighted(self):
+        weights = [np.full(items.size, 2. ** h)
+                   for h, items in enumerate(self._levels)]
+        items = np.concatenate(self._levels)
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(np.concatenate(weights)[order])
+
+    def quantile(self, q):
+        """Estimate the quantiles of the values.
+
+        Parameters
+        ----------
+        q : scalar or iterable of floats
+            The quantiles to estimate, between 0 and 1.
+
+        Returns
+        -------
+        quantiles : scalar or ndarray of shape (n_quantiles,)
+            The smallest value with the rank at least ``q * n``.
+            ``np.nan`` for the empty sketch.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if not self.n:
+            return np.full(q.shape, np.nan)[()]
+
+        items, ranks = self._weighted()
+        index = np.searchsorted(ranks, q * ranks[-1], side="left")
+        return items[np.minimum(index, items.size - 1)][()]
+
+    def rank(self, x):
+        """Estimate the fraction of the values less or equal than ``x``."""
+        items, ranks = self._weighted()
+        index = np.searchsorted(items, x, side="right")
+        ranks = np.concatenate([[0.], ranks])
+        return (ranks[index] / max(ranks[-1], 1))[()]
+
+    def to_bytes(self):
+        """Serialize the sketch, see ``QuantileSketch.from_bytes``."""
+        sizes = [items.size for items in self._levels]
+        header = np.array([self.k, self.n, len(sizes)] + sizes, dtype="<i8")
+        values = np.concatenate(self._levels).astype("<f8")
+        return header.tobytes() + values.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, measure=None, seed=None):
+        """Restore the sketch serialized with ``QuantileSketch.to_bytes``."""
+        k, n, n_levels = np.frombuffer(data, dtype="<i8", count=3)
+        header = np.frombuffer(data, dtype="<i8", count=3 + n_levels)
+        values = np.frombuffer(data, dtype="<f8", offset=header.nbytes)
+
+        sketch = cls(int(k), measure, seed)
+        sketch.n = int(n)
+        bounds = np.cumsum(header[3:])[:-1]
+        sketch._levels = [items.copy() for items in np.split(values, bounds)]
+        return sketch
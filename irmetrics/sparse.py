@@ -0,0 +1,399 @@
+import numpy as np
+
+
+def issparse(x):
+    """Check if ``x`` is a sparse (``scipy.sparse``-like) matrix.
+
+    Parameters
+    ----------
+    x : object
+        Any object, typically the output of a relevance function.
+
+    Returns
+    -------
+    issparse : bool
+        True if ``x`` can be converted to the CSR format.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import issparse
+    >>> issparse(csr_matrix([[0, 1]]))
+    True
+    >>> issparse(np.array([[0, 1]]))
+    False
+    """
+    return hasattr(x, "tocsr") and hasattr(x, "nnz")
+
+
+def _canonical(x):
+    # The positions of the canonical CSR judgements can't repeat in a row
+    return (
+        issparse(x) and getattr(x, "format", None) == "csr" and
+        x.has_canonical_format
+    )
+
+
+def positions(relevance, k=None):
+    """Extract the positions of nonzero relevance judgements.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance judgements, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k positions. If None, use all outputs.
+
+    Returns
+    -------
+    rows : ndarray of shape (n_nonzero,)
+        The sample index of each judgement, sorted in ascending order.
+    cols : ndarray of shape (n_nonzero,)
+        The position of each judgement, sorted in ascending order per sample.
+    data : ndarray of shape (n_nonzero,)
+        The nonzero relevance judgements.
+    n_samples : int
+        The total number of samples, including the ones without judgements.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import positions
+    >>> rows, cols, data, n_samples = positions(csr_matrix([[0, 1, 1]]))
+    >>> cols
+    array([1, 2], dtype=int32)
+    """
+    csr = relevance.tocsr()
+    if not csr.has_canonical_format:
+        csr = csr.copy()
+        csr.sum_duplicates()
+
+    n_samples = csr.shape[0]
+    rows = np.repeat(np.arange(n_samples), np.diff(csr.indptr))
+
+    keep = csr.data != 0
+    if k is not None:
+        keep &= csr.indices < k
+    return rows[keep], csr.indices[keep], csr.data[keep], n_samples
+
+
+def _counts(rows, n_samples):
+    counts = np.bincount(rows, minlength=n_samples)
+    return counts, np.cumsum(counts) - counts
+
+
+def _dcg(rows, cols, data, n_samples):
+    gains = (2. ** data - 1) / np.log2(cols + 2)
+    return np.bincount(rows, weights=gains, minlength=n_samples)
+
+
+def _idcg(rows, cols, data, n_samples):
+    # Rows are already sorted, lexsort keeps them and sorts the judgements
+    data = data[np.lexsort((-data.astype(float), rows))]
+    _, starts = _counts(rows, n_samples)
+    ranks = np.arange(rows.shape[0]) - starts[rows]
+    return _dcg(rows, ranks, data, n_samples)
+
+
+def _ndcg(rows, cols, data, n_samples, weights=1.):
+    idcg = _idcg(rows, cols, data, n_samples)
+    return _dcg(rows, cols, data, n_samples) / (idcg * weights)
+
+
+def _rr(rows, cols, data, n_samples):
+    counts, starts = _counts(rows, n_samples)
+    found = counts > 0
+
+    # Same as `argmax` for dense inputs: the first of the highest judgements
+    highest = np.zeros(n_samples, dtype=data.dtype)
+    highest[found] = np.maximum.reduceat(data, starts[found])
+    first = data == highest[rows]
+    rows, cols = rows[first], cols[first]
+    _, starts = _counts(rows, n_samples)
+
+    outputs = np.zeros(n_samples)
+    outputs[found] = 1. / (cols[starts[found]] + 1)
+    return outputs
+
+
+def _ap(rows, cols, data, n_samples, n_labels, n_true=None):
+    _, starts = _counts(rows, n_samples)
+    hits = np.arange(rows.shape[0]) - starts[rows] + 1
+
+    # Only the first n_true positions contribute, the same as in `topk.ap`
+    weights = hits / (cols + 1) * (cols < (n_true or n_labels))
+    return np.bincount(rows, weights=weights, minlength=n_samples) / n_labels
+
+
+def _exclusive(x, rows, starts):
+    # The sums of the previous entries within the same row, a segmented scan
+    # doubling the span, so each row is summed from zero
+    ranks = np.arange(rows.shape[0]) - starts[rows]
+    totals = np.where(ranks > 0, np.roll(x, 1), 0.)
+    shift = 1
+    while shift <= ranks.max(initial=0):
+        inside = np.flatnonzero(ranks >= shift)
+        totals[inside] += totals[inside - shift]
+        shift *= 2
+    return totals
+
+
+def _clip(data, max_grade):
+    # The grades above max_grade are counted as max_grade
+    return np.minimum(data, max_grade)
+
+
+def _err(rows, cols, data, n_samples, max_grade=1.):
+    stop = (2. ** _clip(data, max_grade) - 1) / 2. ** max_grade
+
+    # The products over the previous positions as the sums of logarithms
+    _, starts = _counts(rows, n_samples)
+    reach = np.exp(_exclusive(np.log1p(-stop), rows, starts))
+    return np.bincount(
+        rows, weights=stop * reach / (cols + 1), minlength=n_samples)
+
+
+def _rbp(rows, cols, data, n_samples, p=0.8, max_grade=1.):
+    gains = _clip(data, max_grade) / max_grade * p ** cols
+    return (1 - p) * np.bincount(rows, weights=gains, minlength=n_samples)
+
+
+def dcg(relevance, k=None, weights=1.):
+    """Compute Discounted Cumulative Gain score(s) from sparse `relevance`.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance judgements, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    weights : default=1.0, scalar, iterable or ndarray of shape (n_samples,)
+        takes into account the importance of each sample, if relevant.
+
+    Returns
+    -------
+    dcg : ndarray of shape (n_samples,)
+        The discounted cumulative gains for samples.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import dcg
+    >>> dcg(csr_matrix([[0, 1, 0, 0]]))
+    array([0.63092975])
+    """
+    return _dcg(*positions(relevance, k)) * weights
+
+
+def ndcg(relevance, k=None, weights=1.):
+    """Compute Normalized Discounted Cumulative Gain score(s) from sparse
+    `relevance`. The ideal ordering is obtained by sorting the nonzero
+    judgements only.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance judgements, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    weights : default=1.0, scalar, iterable or ndarray of shape (n_samples,)
+        Represents the weights of each sample.
+
+    Returns
+    -------
+    ndcg : ndarray of shape (n_samples,)
+        The normalized discounted cumulative gains for samples.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import ndcg
+    >>> ndcg(csr_matrix([[0, 1, 0, 0], [3, 1, 0, 0]]))
+    array([0.63092975, 1.        ])
+    """
+    return _ndcg(*positions(relevance, k), weights=weights)
+
+
+def rr(relevance, k=None):
+    """Compute Reciprocal Rank(s) from sparse `relevance`.
+    The position of the first highest judgement is used, the same as for
+    dense inputs. For binary judgements this is the first match.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance judgements, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+
+    Returns
+    -------
+    rr : ndarray of shape (n_samples,)
+        The reciprocal ranks for all samples.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import rr
+    >>> rr(csr_matrix([[0, 1, 0, 0], [0, 0, 0, 0]]))
+    array([0.5, 0. ])
+    """
+    return _rr(*positions(relevance, k))
+
+
+def recall(relevance, k=None, n_relevant=None):
+    """Compute Recall(s) from sparse `relevance`.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance judgements, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    n_relevant : iterable or ndarray of shape (n_samples,), default=None
+        The total number of relevant labels per sample. If None, use the
+        number of nonzero judgements in ``relevance``.
+
+    Returns
+    -------
+    recall : ndarray of shape (n_samples,)
+        The fraction of relevant labels found in the first k positions.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import recall
+    >>> recall(csr_matrix([[0, 1, 0, 1]]), k=2)
+    array([0.5])
+    """
+    rows, cols, _, n_samples = positions(relevance)
+    if n_relevant is None:
+        n_relevant = np.bincount(rows, minlength=n_samples)
+
+    if k is not None:
+        rows = rows[cols < k]
+    return np.bincount(rows, minlength=n_samples) / n_relevant
+
+
+def precision(relevance, k=None):
+    """Compute Precision(s) from sparse `relevance`.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance judgements, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+
+    Returns
+    -------
+    precision : ndarray of shape (n_samples,)
+        The fraction of relevant labels in the first k positions.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import precision
+    >>> precision(csr_matrix([[0, 1, 0, 1]]))
+    array([0.5])
+    """
+    rows, _, _, n_samples = positions(relevance, k)
+    n_labels = min(i for i in (k, relevance.shape[-1]) if i is not None)
+    return np.bincount(rows, minlength=n_samples) / n_labels
+
+
+def ap(relevance, k=None, n_true=None):
+    """Compute Average Precision score(s) from sparse `relevance`.
+    The normalization is the same as for ``irmetrics.topk.ap``.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance judgements, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    n_true : int, default=None
+        The number of true labels per sample, only the first ``n_true``
+        positions contribute to the score. If None, use all positions.
+
+    Returns
+    -------
+    ap : ndarray of shape (n_samples,)
+        The average precision for all samples.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import ap
+    >>> ap(csr_matrix([[1, 0, 0]]))
+    array([0.33333333])
+    """
+    n_labels = min(i for i in (k, relevance.shape[-1]) if i is not None)
+    return _ap(*positions(relevance, k), n_labels=n_labels, n_true=n_true)
+
+
+def err(relevance, k=None, max_grade=1.):
+    """Compute Expected Reciprocal Rank(s) from sparse `relevance`.
+    The products over the previous positions are calculated as the sums of
+    logarithms within each row.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance grades, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    max_grade : float, default=1.
+        The highest possible grade, the higher grades are clipped to it.
+
+    Returns
+    -------
+    err : ndarray of shape (n_samples,)
+        The expected reciprocal ranks for all samples.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import err
+    >>> err(csr_matrix([[0, 1, 0, 0]]))
+    array([0.25])
+    """
+    return _err(*positions(relevance, k), max_grade=max_grade)
+
+
+def rbp(relevance, k=None, p=0.8, max_grade=1.):
+    """Compute Rank-Biased Precision score(s) from sparse `relevance`.
+
+    Parameters
+    ----------
+    relevance : sparse matrix of shape (n_samples, n_labels)
+        The relevance grades, the column index is used as position.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    p : float, default=0.8
+        The persistence: the probability to examine the next position.
+    max_grade : float, default=1.
+        The highest possible grade, the higher grades are clipped to it.
+
+    Returns
+    -------
+    rbp : ndarray of shape (n_samples,)
+        The rank-biased precisions for all samples.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from irmetrics.sparse import rbp
+    >>> rbp(csr_matrix([[1, 0, 0, 0]]))
+    array([0.2])
+    """
+    return _rbp(*positions(relevance, k), p=p, max_grade=max_grade)
@@ -0,0 +1,257 @@
+import os
+import hashlib
+import numpy as np
+
+from irmetrics.io import ensure_inputs, row_hashes, _mix, _broadcast_rows
+
+
+def _as_ids(ids):
+    # The shards are loaded without pickle, store the python objects as str
+    ids = np.asarray(ids)
+    return ids.astype(str) if ids.dtype == object else ids
+
+
+def _name(f):
+    return getattr(f, "__module__", "") + "." + getattr(
+        f, "__qualname__", repr(f))
+
+
+def run_key(measure, k=None, **kwargs):
+    """Compute the fingerprint of the evaluation run.
+    The functions are identified by their names, the other parameters by
+    their ``repr``.
+
+    Examples
+    --------
+    >>> from irmetrics.store import run_key
+    >>> from irmetrics.topk import rr
+    >>> run_key(rr, k=10) == run_key(rr, k=5)
+    False
+    """
+    params = sorted(
+        (name, _name(v) if callable(v) else repr(v))
+        for name, v in kwargs.items()
+    )
+    text = repr((_name(measure), k, params))
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class ResultStore:
+    """Persistent per-query results for the incremental evaluation.
+    The values of a measure are stored in ``.npz`` shards in the directory
+    ``path/<run key>`` together with the query ids and the hashes of the
+    inputs, see ``irmetrics.store.run_key``. Each evaluation computes the
+    measure only for the queries that are new or changed and appends them as
+    a new shard. The latest value of a query wins.
+
+    Parameters
+    ----------
+    path : str
+        The root directory of the store.
+    measure : callable
+        The measure (one from `irmetrics.topk`) to calculate.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    **kwargs : dict
+        The other parameters of the measure (e.g. ``relevance``).
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> from irmetrics.topk import rr
+    >>> from irmetrics.store import ResultStore
+    >>> store = ResultStore(tempfile.mkdtemp(), rr)
+    >>> store.evaluate([10, 11], [1, 2], [[0, 1], [2, 0]])
+    array([0.5, 1. ])
+    >>> store.evaluate([11, 12], [2, 1], [[2, 0], [1, 0]])
+    array([1., 1.])
+    >>> store.n_computed
+    3
+    >>> store.mean()
+    0.8333333333333334
+    """
+
+    def __init__(self, path, measure, k=None, **kwargs):
+        self.measure = measure
+        self.k = k
+        self.kwargs = kwargs
+        self.path = os.path.join(path, run_key(measure, k, **kwargs))
+        self.n_computed = 0
+
+        self._ids = np.empty(0)
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._values = np.empty(0)
+        self._sum, self._count = 0., 0
+
+        os.makedirs(self.path, exist_ok=True)
+        for shard in self._shards():
+            with np.load(shard) as data:
+                self._merge(data["ids"], data["hashes"], data["values"])
+
+    def _shards(self):
+        names = sorted(f for f in os.listdir(self.path) if f.endswith(".npz"))
+        return [os.path.join(self.path, name) for name in names]
+
+    def _find(self, ids):
+        if not self._ids.size:
+            return np.zeros(ids.size, dtype=int), np.zeros(ids.size, bool)
+        position = np.searchsorted(self._ids, ids)
+        position = np.minimum(position, self._ids.size - 1)
+        return position, self._ids[position] == ids
+
+    def _merge(self, ids, hashes, values):
+        # Only the first occurrence of a query in the update counts
+        ids, index = np.unique(ids, return_index=True)
+        hashes, values = hashes[index], values[index]
+
+        # Update the aggregates only with the difference
+        position, found = self._find(ids)
+        old = self._values[position[found]]
+        self._sum += np.nansum(values) - np.nansum(old)
+        self._count += np.count_nonzero(~np.isnan(values))
+        self._count -= np.count_nonzero(~np.isnan(old))
+
+        if not self._ids.size:
+            self._ids, self._hashes, self._values = ids, hashes, values
+            return
+
+        # Replace the known queries, insert the new ones in the sorted order
+        self._hashes[position[found]] = hashes[found]
+        self._values[position[found]] = values[found]
+        at = np.searchsorted(self._ids, ids[~found])
+        self._ids = np.insert(self._ids, at, ids[~found])
+        self._hashes = np.insert(self._hashes, at, hashes[~found])
+        self._values = np.insert(self._values, at, values[~found])
+
+    def lookup(self, ids, hashes):
+        """Find the stored values for the queries with the same inputs.
+
+        Parameters
+        ----------
+        ids : iterable, ndarray of shape (n_queries,)
+            The query ids.
+        hashes : iterable, ndarray of shape (n_queries,)
+            The hashes of the inputs, see ``irmetrics.store.row_hashes``.
+
+        Returns
+        -------
+        values : ndarray of shape (n_queries,)
+            The stored values, ``np.nan`` for the missing ones.
+        missing : ndarray of shape (n_queries,)
+            True for the queries that are new or changed.
+        """
+        ids, hashes = _as_ids(ids), np.asarray(hashes)
+        position, found = self._find(ids)
+
+        missing = ~found
+        missing[found] = self._hashes[position[found]] != hashes[found]
+        values = np.full(ids.size, np.nan)
+        values[~missing] = self._values[position[~missing]]
+        return values, missing
+
+    def update(self, ids, hashes, values):
+        """Store the values of the queries as a new shard."""
+        ids, hashes = _as_ids(ids), np.asarray(hashes, dtype=np.uint64)
+        values = np.asarray(values, dtype=np.float64)
+        if not ids.size:
+            return
+
+        # Write to a temporary file first, the shards are never partial
+        shards = self._shards()
+        number = int(os.path.basename(shards[-1])[:-4]) + 1 if shards else 0
+        shard = os.path.join(self.path, "{:08d}.npz".format(number))
+        with open(shard + ".tmp", "wb") as f:
+            np.savez(f, ids=ids, hashes=hashes, values=values)
+        os.replace(shard + ".tmp", shard)
+        self._merge(ids, hashes, values)
+
+    def _evaluate(self, ids, hashes, compute):
+        ids = _as_ids(ids)
+        values, missing = self.lookup(ids, hashes)
+        if missing.any():
+            values[missing] = compute(missing)
+            self.update(ids[missing], hashes[missing], values[missing])
+            self.n_computed += np.count_nonzero(missing)
+        return values
+
+    def evaluate(self, ids, y_true, y_pred):
+        """Calculate the measure for the new or changed queries only.
+
+        Parameters
+        ----------
+        ids : iterable, ndarray of shape (n_queries,)
+            The query ids.
+        y_true : scalar, iterable or ndarray of shape (n_queries, n_labels)
+            True labels of entities to be ranked.
+        y_pred : iterable, ndarray of shape (n_queries, n_labels)
+            Target labels sorted by relevance (as returned by an IR system).
+
+        Returns
+        -------
+        values : ndarray of shape (n_queries,)
+            The values of the measure for all queries.
+        """
+        y_true, y_pred = _broadcast_rows(*ensure_inputs(y_true, y_pred))
+        hashes = _mix(row_hashes(y_true) ^ _mix(row_hashes(y_pred)))
+
+        def compute(missing):
+            return self.measure(
+                y_true[missing], y_pred[missing], self.k, **self.kwargs)
+
+        return self._evaluate(ids, hashes, compute)
+
+    def flat(self, df, query_col, relevance_col):
+        """Calculate the measure for the new or changed queries in the flat
+        format, see `irmetrics.flat.flat`.
+
+        Returns
+        -------
+        measures : pandas.core.series.Series
+            The values of the measure calculated per each query.
+        """
+        from pandas import Series
+        from irmetrics.flat import flat, _positions
+
+        # The nonzero judgements, their positions and the number of rows
+        # (e.g. for recall or precision) affect the measures
+        (rows, cols, data, n_queries), index = _positions(
+            df, query_col, relevance_col)
+        sizes = df.groupby(query_col).size().to_numpy()
+        hashes = _mix(sizes.astype(np.uint64))
+        words = _mix(cols.astype(np.uint64)) ^ data.view(np.uint64)
+        np.bitwise_xor.at(hashes, rows, _mix(words))
+
+        def compute(missing):
+            subset = df[df[query_col].isin(index[missing])]
+            values = flat(subset, query_col, relevance_col, self.measure,
+                          self.k, **self.kwargs)
+            return values.reindex(index[missing]).to_numpy()
+
+        values = self._evaluate(index.to_numpy(), hashes, compute)
+        return Series(values, index=index, name=relevance_col)
+
+    def totals(self):
+        """Report the sum and the number of all stored values."""
+        return self._sum, self._count
+
+    def mean(self):
+        """Calculate the mean of all stored values."""
+        return self._sum / self._count if self._count else np.nan
+
+    def values(self):
+        """Report the ids and values of all stored queries."""
+        return self._ids, self._values
+
+    def compact(self):
+        """Rewrite all shards as a single one."""
+        shards = self._shards()
+        if len(shards) < 2:
+            return
+
+        with open(shards[0] + ".tmp", "wb") as f:
+            np.savez(f, ids=self._ids, hashes=self._hashes,
+                     values=self._values)
+        os.replace(shards[0] + ".tmp", shards[0])
+        for shard in shards[1:]:
+            os.remove(shard)
@@ -0,0 +1,282 @@
+import numpy as np
+
+from irmetrics.io import _ensure_array, ensure_inputs, _warn_repeated
+from irmetrics.relevance import multilabel, _sortable, _INT64_MAX
+from irmetrics.relevance import SMALL_N_TRUE
+
+# The largest number of (query, label) pairs for the direct lookup table
+MAX_TABLE_SIZE = 2 ** 24
+
+# The largest number of predicted labels of a block of systems
+MAX_BLOCK_SIZE = 2 ** 20
+
+
+class Qrels:
+    """The true labels prepared once to evaluate many systems (runs).
+    The labels of each query are stored as the sorted ``(query, label)``
+    keys, the relevance of the predictions is then a binary search in the
+    keys. If there are at most ``MAX_TABLE_SIZE`` possible keys, they are
+    looked up in a boolean table instead. Up to ``SMALL_N_TRUE`` true labels,
+    object labels and the labels of different dtypes are compared with
+    ``irmetrics.relevance.multilabel``, it is faster than the lookups.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_queries,) or (n_queries, n_true)
+        True labels of entities to be ranked.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from irmetrics.systems import Qrels
+    >>> qrels = Qrels([[1, 4], [2, 3]])
+    >>> qrels.relevance(qrels.y_true, np.array([[0, 1, 4], [4, 2, 0]]))
+    array([[False,  True,  True],
+           [False,  True, False]])
+    """
+
+    def __init__(self, y_true):
+        y_true = np.asarray(_ensure_array(y_true))
+        if y_true.ndim == 1:
+            y_true = y_true[:, None]
+        self.y_true = y_true
+        self.n_queries = y_true.shape[0]
+
+        self.low, self.uniques, self.keys, self.table = (None,) * 4
+        self._tile = y_true
+        small = y_true.shape[-1] <= SMALL_N_TRUE
+        if y_true.dtype == object or small or not y_true.size:
+            return
+
+        # Integer labels are codes themselves, the others are encoded
+        if y_true.dtype.kind in "iu":
+            self.low, self.high = int(y_true.min()), int(y_true.max())
+            self.span = self.high - self.low + 1
+        if self.low is None or not self._fits():
+            self.low = None
+            self.uniques = np.unique(y_true)
+            self.span = self.uniques.size
+
+        # NaN labels are not equal to any predictions
+        codes = self._encode(y_true)
+        codes = (codes + self._offsets(self.n_queries))[codes < self.span]
+        self.keys = np.sort(codes)
+
+        # Small label spaces are looked up directly
+        size = self.n_queries * (self.span + 1)
+        if size <= MAX_TABLE_SIZE:
+            self.table = np.zeros(size, dtype=bool)
+            self.table[self.keys] = True
+
+    def _fits(self):
+        # The keys `code + query * (span + 1)` should be int64
+        return (
+            self.high <= _INT64_MAX and
+            (self.span + 1) * self.n_queries <= _INT64_MAX
+        )
+
+    def _encode(self, labels):
+        # The code `span` is reserved for the labels that are not in y_true
+        if self.uniques is None:
+            inside = (labels >= self.low) & (labels <= self.high)
+            codes = np.where(inside, labels, self.low).astype(np.int64)
+            return np.where(inside, codes - self.low, self.span)
+
+        position = np.searchsorted(self.uniques, labels)
+        position = np.minimum(position, self.uniques.size - 1)
+        found = self.uniques[position] == labels
+        return np.where(found, position, self.span)
+
+    def _offsets(self, n_samples):
+        rows = np.arange(n_samples) % self.n_queries
+        return rows[:, None] * (self.span + 1)
+
+    def _tiled(self, y_true):
+        # The rows should be the true labels of the consecutive systems,
+        # the subsets of the rows (e.g. ``dedup=True``) are not
+        if y_true.shape[0] % self.n_queries or y_true.shape[1:] != \
+                self.y_true.shape[1:]:
+            return False
+        blocks = y_true.reshape(-1, *self.y_true.shape)
+        return np.array_equal(
+            blocks, np.broadcast_to(self.y_true, blocks.shape),
+            equal_nan=self.y_true.dtype.kind in "fc",
+        )
+
+    def _indexed(self, y_true, y_pred):
+        return (
+            self.keys is not None and
+            y_true.shape[0] == y_pred.shape[0] and
+            _sortable(self.y_true, y_pred) and
+            self._tiled(y_true)
+        )
+
+    def _usable(self, y_pred, k=None):
+        # The index holds all true labels, k shouldn't truncate them
+        return (
+            self.keys is not None and
+            (k is None or k >= self.y_true.shape[-1]) and
+            _sortable(self.y_true, y_pred)
+        )
+
+    def _lookup(self, y_true, y_pred):
+        # y_true are the tiled true labels, see `Qrels.evaluate`
+        queries = self._encode(y_pred) + self._offsets(y_pred.shape[0])
+        if self.table is not None:
+            return self.table[queries]
+        if not self.keys.size:
+            return np.zeros(queries.shape, dtype=bool)
+
+        position = np.searchsorted(self.keys, queries)
+        position = np.minimum(position, self.keys.size - 1)
+        return self.keys[position] == queries
+
+    def _tiled_rows(self, n_systems):
+        # The true labels of the consecutive systems, reused by the blocks
+        if self._tile.shape[0] != n_systems * self.n_queries:
+            self._tile = np.tile(self.y_true, (n_systems, 1))
+        return self._tile
+
+    def relevance(self, y_true, y_pred):
+        """Compute relevance(s) of the predicted labels.
+        The rows of ``y_pred`` are the queries of the consecutive systems.
+        The index is used only if ``y_true`` holds all true labels of all
+        queries in this order, i.e. ``k`` doesn't truncate ``y_true`` (see
+        `irmetrics.io.ensure_inputs`) and the rows are not deduplicated.
+
+        Parameters
+        ----------
+        y_true : ndarray of shape (n_samples, n_true)
+            The true labels, only used if the index can't be.
+        y_pred : ndarray of shape (n_samples, n_labels)
+            Target labels sorted by relevance (as returned by an IR system).
+
+        Returns
+        -------
+        relevance : bolean ndarray
+            The relevance judgements for `y_pred` of shape
+            (n_samples, n_labels)
+        """
+        if not self._indexed(y_true, y_pred):
+            return multilabel(y_true, y_pred)
+        return self._lookup(y_true, y_pred)
+
+    def evaluate(self, y_pred, measure, k=None, **kwargs):
+        """Evaluate a block of systems at once.
+        The predictions are validated once and passed to the measure without
+        its input checks, unless ``dedup`` is given.
+
+        Parameters
+        ----------
+        y_pred : ndarray of shape (n_systems, n_queries, n_labels)
+            The predicted labels of the systems.
+        measure : callable
+            The measure (one from `irmetrics.topk`) to calculate.
+        k : int, default=None
+            Only consider the highest k scores in the ranking. If None, use
+            all outputs.
+        **kwargs : dict
+            The other parameters of the measure.
+
+        Returns
+        -------
+        values : ndarray of shape (n_systems, n_queries)
+            The values of the measure.
+        """
+        n_systems = y_pred.shape[0]
+        y_true = self._tiled_rows(n_systems)
+        y_pred = y_pred.reshape(n_systems * self.n_queries, -1)
+        if kwargs.get("dedup"):
+            kwargs.setdefault("relevance", self.relevance)
+            values = np.atleast_1d(measure(y_true, y_pred, k, **kwargs))
+        else:
+            values = self._measure(y_true, y_pred, measure, k, kwargs)
+
+        # The samples are along the last axis of the outputs
+        values = values.reshape(values.shape[:-1] + (n_systems, -1))
+        return np.moveaxis(values, -2, 0)
+
+    def _measure(self, y_true, y_pred, measure, k, kwargs):
+        y_true, y_pred = ensure_inputs(y_true, y_pred, k)
+        _warn_repeated(y_pred, kwargs.get("pad_token"))
+        if "relevance" not in kwargs:
+            usable = self._usable(y_pred, k)
+            kwargs["relevance"] = self._lookup if usable else multilabel
+
+        # The metrics from `irmetrics.topk` wrap the calculation with checks
+        f = measure
+        while hasattr(f, "__wrapped__"):
+            f = f.__wrapped__
+        return np.atleast_1d(f(y_true, y_pred, k, **kwargs))
+
+
+def _block(run, block):
+    # Small blocks stay in the cache, the measures are elementwise mostly
+    if block is None:
+        return max(MAX_BLOCK_SIZE // max(run.size, 1), 1)
+    return block
+
+
+def _blocks(runs, block):
+    if isinstance(runs, np.ndarray):
+        block = _block(runs[0], block) if len(runs) else 1
+        yield from (runs[i:i + block] for i in range(0, len(runs), block))
+        return
+
+    pending = []
+    for run in runs:
+        pending.append(np.asarray(_ensure_array(run)))
+        block = _block(pending[0], block)
+        if len(pending) == block:
+            yield np.stack(pending)
+            pending = []
+    if pending:
+        yield np.stack(pending)
+
+
+def evaluate(y_true, runs, measure, k=None, block=None, **kwargs):
+    """Evaluate many systems (runs) against the same true labels.
+    The true labels are prepared once, see ``irmetrics.systems.Qrels``, the
+    systems are evaluated in blocks: the predictions of a block are stacked
+    and passed to the measure in a single call.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_queries, n_true) or Qrels
+        True labels of entities to be ranked, the same for all systems.
+    runs : ndarray of shape (n_systems, n_queries, n_labels) or iterable
+        The predicted labels of the systems, an iterable of the arrays of
+        shape (n_queries, n_labels) is consumed block by block.
+    measure : callable
+        The measure (one from `irmetrics.topk`) to calculate.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    block : int, default=None
+        The number of systems evaluated at once, the memory is proportional
+        to it. If None, evaluate as many systems at once as fit
+        ``MAX_BLOCK_SIZE`` predicted labels (at least one).
+    **kwargs : dict
+        The other parameters of the measure.
+
+    Returns
+    -------
+    values : ndarray of shape (n_systems, n_queries)
+        The values of the measure for all systems and queries.
+
+    Examples
+    --------
+    >>> from irmetrics.topk import rr
+    >>> from irmetrics.systems import evaluate
+    >>> y_true = [1, 2]
+    >>> runs = [[[0, 1], [2, 0]], [[1, 0], [0, 1]]]
+    >>> evaluate(y_true, iter(runs), rr)
+    array([[0.5, 1. ],
+           [1. , 0. ]])
+    """
+    qrels = y_true if isinstance(y_true, Qrels) else Qrels(y_true)
+    values = [
+        qrels.evaluate(y_pred, measure, k, **kwargs)
+        for y_pred in _blocks(runs, block)
+    ]
+    return np.concatenate(values, axis=0)
@@ -0,0 +1,268 @@
+import numpy as np
+
+from collections import namedtuple
+from irmetrics.io import to_scalar
+
+Ties = namedtuple("Ties", [
+    "relevance", "position", "size", "offset", "count", "before", "gains"])
+
+
+def ties(y_true, y_score):
+    """Sort the judgements by the scores and find the groups of ties.
+    All quantities are aligned with the sorted positions, so the expected
+    values of the metrics over the permutations within the groups are
+    calculated without enumerating the permutations.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_samples, n_labels)
+        The relevance judgements of the candidates (higher is better).
+    y_score : iterable, ndarray of shape (n_samples, n_labels)
+        The scores of the candidates, the higher scores are ranked first.
+
+    Returns
+    -------
+    ties : Ties
+        The named tuple of arrays of shape (n_samples, n_labels): the sorted
+        ``relevance``, the ``position`` in the ranking, the ``size`` of the
+        tie group, the ``offset`` within the group, the ``count`` of the
+        relevant (nonzero) items in the group, the number of the relevant
+        items ranked ``before`` the group and the mean ``gains``
+        ``2 ** relevance - 1`` within the group.
+
+    Examples
+    --------
+    >>> from irmetrics.ties import ties
+    >>> groups = ties([[1, 0, 0]], [[0.5, 0.5, 0.1]])
+    >>> groups.size
+    array([[2, 2, 1]])
+    >>> groups.count
+    array([[1, 1, 0]])
+    """
+    y_true, y_score = np.atleast_2d(y_true, y_score)
+    order = np.argsort(-y_score, axis=-1, kind="stable")
+    relevance = np.take_along_axis(y_true, order, -1).astype(np.float64)
+    scores = np.take_along_axis(y_score, order, -1)
+
+    # Each row starts a new group, the group ids are global
+    new = np.ones(scores.shape, dtype=bool)
+    new[:, 1:] = scores[:, 1:] != scores[:, :-1]
+    group = np.cumsum(new.ravel()).reshape(scores.shape) - 1
+    starts = np.flatnonzero(new)
+
+    relevant = (relevance > 0).ravel()
+    size = np.bincount(group.ravel())
+    count = np.bincount(group.ravel(), weights=relevant).astype(int)
+    gains = np.bincount(group.ravel(), weights=(2 ** relevance - 1).ravel())
+
+    # The relevant items in the previous groups of the same row
+    before = np.cumsum(relevance > 0, axis=-1) - (relevance > 0)
+
+    n_labels = scores.shape[-1]
+    position = np.broadcast_to(np.arange(n_labels), scores.shape)
+    return Ties(
+        relevance=relevance,
+        position=position,
+        size=size[group],
+        offset=np.arange(scores.size).reshape(scores.shape) - starts[group],
+        count=count[group],
+        before=before.ravel()[starts][group],
+        gains=(gains / size)[group],
+    )
+
+
+def _cutoff(groups, k):
+    return groups.position < (groups.position.shape[-1] if k is None else k)
+
+
+def rr(y_true, y_score, k=None):
+    """Compute the expected Reciprocal Rank(s) over the orders of ties.
+    The position of the first relevant item is distributed as the minimum of
+    the positions of ``count`` items placed randomly within the first tie
+    group with relevant items.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_samples, n_labels)
+        The relevance judgements of the candidates. Same as for
+        ``irmetrics.topk.rr``, only the highest judgements in each row are
+        considered relevant.
+    y_score : iterable, ndarray of shape (n_samples, n_labels)
+        The scores of the candidates, the higher scores are ranked first.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+
+    Returns
+    -------
+    rr : float in [0., 1.]
+        The expected reciprocal ranks for all samples.
+
+    Examples
+    --------
+    >>> from irmetrics.ties import rr
+    >>> rr([1, 0, 0], [0.5, 0.5, 0.1])
+    0.75
+    """
+    y_true = np.atleast_2d(y_true)
+    highest = y_true.max(-1, keepdims=True)
+    groups = ties((y_true == highest) & (highest > 0), y_score)
+
+    # The tie group where the first relevant item is
+    found = groups.count > 0
+    first = found & (groups.before == 0)
+
+    # The probability that none of the relevant items is at this offset
+    # or above, the product is over the offsets within the group
+    size, count, offset = groups.size, groups.count, groups.offset
+    survive = np.where(first, (size - count - offset) / (size - offset), 1.)
+    after = np.cumprod(survive, axis=-1)
+    before = np.concatenate([np.ones_like(after[:, :1]), after[:, :-1]], -1)
+
+    probability = (before - after) * first * _cutoff(groups, k)
+    return to_scalar(np.squeeze(
+        np.sum(probability / (groups.position + 1), axis=-1)))
+
+
+def _hits(groups, k):
+    # The expected number of relevant items at each position
+    return groups.count / groups.size * _cutoff(groups, k)
+
+
+def recall(y_true, y_score, k=None):
+    """Compute the expected Recall(s) over the orders of ties.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_samples, n_labels)
+        The relevance judgements of the candidates, nonzero judgements are
+        relevant.
+    y_score : iterable, ndarray of shape (n_samples, n_labels)
+        The scores of the candidates, the higher scores are ranked first.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+
+    Returns
+    -------
+    recall : float in [0., 1.]
+        The expected recalls for all samples.
+
+    Examples
+    --------
+    >>> from irmetrics.ties import recall
+    >>> recall([1, 0, 0], [0.5, 0.5, 0.1], k=1)
+    0.5
+    """
+    groups = ties(y_true, y_score)
+    n_relevant = np.sum(groups.relevance > 0, axis=-1)
+    return to_scalar(np.squeeze(_hits(groups, k).sum(-1) / n_relevant))
+
+
+def precision(y_true, y_score, k=None):
+    """Compute the expected Precision(s) over the orders of ties.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_samples, n_labels)
+        The relevance judgements of the candidates, nonzero judgements are
+        relevant.
+    y_score : iterable, ndarray of shape (n_samples, n_labels)
+        The scores of the candidates, the higher scores are ranked first.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+
+    Returns
+    -------
+    precision : float in [0., 1.]
+        The expected precisions for all samples.
+
+    Examples
+    --------
+    >>> from irmetrics.ties import precision
+    >>> precision([1, 0, 0], [0.5, 0.5, 0.1], k=1)
+    0.5
+    """
+    groups = ties(y_true, y_score)
+    n_labels = _cutoff(groups, k).sum(-1)
+    return to_scalar(np.squeeze(_hits(groups, k).sum(-1) / n_labels))
+
+
+def ndcg(y_true, y_score, k=None):
+    """Compute the expected Normalized Discounted Cumulative Gain(s) over
+    the orders of ties. Each position gets the mean gain of its tie group.
+    The ideal ranking is the ranking of all candidates, it doesn't depend on
+    the order of ties.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_samples, n_labels)
+        The relevance judgements of the candidates (higher is better).
+    y_score : iterable, ndarray of shape (n_samples, n_labels)
+        The scores of the candidates, the higher scores are ranked first.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+
+    Returns
+    -------
+    ndcg : float in [0., 1.]
+        The expected normalized discounted cumulative gains for all samples.
+
+    Examples
+    --------
+    >>> from irmetrics.ties import ndcg
+    >>> ndcg([1, 0], [0.5, 0.5])
+    0.8154648767857288
+    """
+    groups = ties(y_true, y_score)
+    discounts = _cutoff(groups, k) / np.log2(groups.position + 2)
+    ideal = np.flip(np.sort(groups.relevance, axis=-1), axis=-1)
+    idcg = np.sum((2 ** ideal - 1) * discounts, axis=-1)
+    dcg = np.sum(groups.gains * discounts, axis=-1)
+    return to_scalar(np.squeeze(dcg / idcg))
+
+
+def ap(y_true, y_score, k=None):
+    """Compute the expected Average Precision score(s) over the orders of
+    ties. The normalization is the same as for ``irmetrics.topk.ap``: the
+    first ``min(k, n_relevant)`` positions contribute and the sum is divided
+    by the number of positions.
+
+    Parameters
+    ----------
+    y_true : iterable, ndarray of shape (n_samples, n_labels)
+        The relevance judgements of the candidates, nonzero judgements are
+        relevant.
+    y_score : iterable, ndarray of shape (n_samples, n_labels)
+        The scores of the candidates, the higher scores are ranked first.
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+
+    Returns
+    -------
+    ap : float
+        The expected average precisions for all samples.
+
+    Examples
+    --------
+    >>> from irmetrics.ties import ap
+    >>> ap([1, 0, 0], [0.5, 0.5, 0.1])
+    0.16666666666666666
+    """
+    groups = ties(y_true, y_score)
+    size, count, offset = groups.size, groups.count, groups.offset
+
+    # E[rel_i * rel_j] for the positions j before i: the items in the same
+    # group are drawn without replacement, the groups are independent
+    rate = count / size
+    pairs = count * (count - 1) / np.maximum(size * (size - 1), 1)
+    hits = rate * (1 + groups.before) + offset * pairs
+
+    n_relevant = np.sum(groups.relevance > 0, axis=-1, keepdims=True)
+    cutoff = _cutoff(groups, k) & (groups.position < n_relevant)
+    n_labels = _cutoff(groups, k).sum(-1)
+    return to_scalar(np.squeeze(
+        np.sum(hits / (groups.position + 1) * cutoff, axis=-1) / n_labels))
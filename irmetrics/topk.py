@@ -1,6 +1,8 @@
 import numpy as np
 
-from irmetrics.io import _ensure_io, _validate_unique
+from irmetrics import packed, sparse
+from irmetrics.cache import RelevanceCache
+from irmetrics.io import _ensure_io, _validate_unique, lengths, valid
 from irmetrics.relevance import multilabel
 
 
@@ -50,10 +52,29 @@ def rr(y_true, y_pred, k=None, relevance=multilabel):
     0.5
     """
     relevant = relevance(y_true, y_pred)
+    if sparse.issparse(relevant):
+        return sparse.rr(relevant)
+    if packed.ispacked(relevant):
+        return packed.rr(relevant)
+
     index = relevant.argmax(-1)
     return relevant.any(-1) / (index + 1)
 
 
+def _cached_counts(relevance, y_true, y_pred):
+    # The cache keeps the prefix sums, the counts at any cutoff are a column
+    if not isinstance(relevance, RelevanceCache) or not y_pred.shape[-1]:
+        return None
+    cumsum = relevance.cumsum(y_true, y_pred)
+    return None if cumsum is None else cumsum[..., -1]
+
+
+def _unpadded(relevant, mask):
+    if sparse.issparse(relevant):
+        return relevant.multiply(mask).tocsr()
+    return relevant & mask
+
+
 @_ensure_io
 @_validate_unique
 def recall(y_true, y_pred=None, k=None, relevance=multilabel, pad_token=None):
@@ -76,11 +97,12 @@ def recall(y_true, y_pred=None, k=None, relevance=multilabel, pad_token=None):
     relevance : callable, default=topk.relevance.multilabel
         A function that calculates relevance judgements based on input
         ``y_pred`` and ``y_true``.
-    pad_token : callable, default=None
-        A value that was used to pad the `y_true`. This is needed to ignore
-        the padding when calculating the recall. The default value is `None`,
-        this means `numpy` will do element-wise comparison for `None`, change
-        it to somehting else if your predictions may contain `None` objects.
+    pad_token : scalar, str, default=None
+        A value that was used to pad the `y_true` (and `y_pred`). This is
+        needed to ignore the padding when calculating the recall. The default
+        value is `None`, it only affects the object arrays. Integer sentinels
+        (e.g. `-1`) keep the labels integer and are much cheaper to compare
+        than `None` or `np.nan`, see `irmetrics.io.valid`.
 
     Returns
     -------
@@ -106,9 +128,22 @@ def recall(y_true, y_pred=None, k=None, relevance=multilabel, pad_token=None):
     >>> recall(y_true, y_pred)
     1.0
     """
-    # This performes element-wise comparison if dtypes agree
-    positives = ~(y_true == pad_token)
-    return relevance(y_true, y_pred).sum(-1) / positives.sum(-1)
+    positives = lengths(y_true, pad_token)
+    counts = None if pad_token else _cached_counts(relevance, y_true, y_pred)
+    if counts is not None:
+        return counts / positives
+
+    relevant = relevance(y_true, y_pred)
+
+    # Padding in y_pred may match the padding in y_true
+    if pad_token is not None:
+        relevant = _unpadded(relevant, valid(y_pred, pad_token))
+
+    if sparse.issparse(relevant):
+        return sparse.recall(relevant, n_relevant=positives)
+    if packed.ispacked(relevant):
+        return packed.recall(relevant, n_relevant=positives)
+    return relevant.sum(-1) / positives
 
 
 @_ensure_io
@@ -158,7 +193,17 @@ def precision(y_true, y_pred=None, k=None, relevance=multilabel):
     >>> precision(y_true, y_pred)
     0.25
     """
-    return relevance(y_true, y_pred).sum(-1) / y_pred.shape[-1]
+    counts = _cached_counts(relevance, y_true, y_pred)
+    if counts is not None:
+        return counts / y_pred.shape[-1]
+
+    relevant = relevance(y_true, y_pred)
+    if sparse.issparse(relevant):
+        return sparse.precision(relevant)
+    if packed.ispacked(relevant):
+        return packed.precision(relevant)
+
+    return relevant.sum(-1) / y_pred.shape[-1]
 
 
 def dcg_score(relevance, k=None, weights=1.0):
@@ -171,9 +216,11 @@ def dcg_score(relevance, k=None, weights=1.0):
 
     Parameters
     ----------
-    relevance : iterable or ndarray of shape (n_samples, n_labels) or simply
-        (n_labels,). The last dimension of the parameter is used as position.
-        The relevance judgements provided by experts.
+    relevance : iterable, ndarray or sparse matrix of shape
+        (n_samples, n_labels) or simply (n_labels,). The last dimension of the
+        parameter is used as position. The relevance judgements provided by
+        experts. Sparse matrices are evaluated with `irmetrics.sparse.dcg`,
+        packed judgements with `irmetrics.packed.dcg`.
     weights : default=1.0, scalar, iterable or ndarray of shape (n_samples,)
         takes into account the importance of each sample, if relevant.
     k : int, default=None
@@ -209,6 +256,11 @@ def dcg_score(relevance, k=None, weights=1.0):
     >>> dcg_score(relevance_judgements)
     array([0.63092975])
     """
+    if sparse.issparse(relevance):
+        return sparse.dcg(relevance, k, weights)
+    if packed.ispacked(relevance):
+        return packed.dcg(relevance, k, weights)
+
     top = relevance[..., :k]
     gains = (2 ** top - 1) / np.log2(np.arange(top.shape[-1]) + 2)[None, ...]
     return np.sum(gains * weights, axis=-1)
@@ -262,6 +314,10 @@ def ndcg(y_true, y_pred, k=None, relevance=multilabel, weights=1.):
     0.6309297535714575
     """
     relevant = relevance(y_true, y_pred)
+    if sparse.issparse(relevant):
+        return sparse.ndcg(relevant, k, weights)
+    if packed.ispacked(relevant):
+        return packed.ndcg(relevant, k, weights)
 
     # Sort in descending order, calculate the gain
     idcg = dcg_score(np.flip(np.sort(relevant, axis=-1), axis=-1), k, weights)
@@ -324,6 +380,10 @@ def ap(y_true, y_pred, k=None, relevance=multilabel):
     array([0.2, 0. , 0. ])
     """
     relevant = relevance(y_true, y_pred)
+    if sparse.issparse(relevant):
+        return sparse.ap(relevant, k, n_true=y_true.shape[-1])
+    if packed.ispacked(relevant):
+        return packed.ap(relevant, n_true=y_true.shape[-1])
 
     # Handle k=None, without if else branching
     max_iter = min(i for i in (k, y_true.shape[-1]) if i is not None)
@@ -336,3 +396,115 @@ def ap(y_true, y_pred, k=None, relevance=multilabel):
     ], axis=-1)
 
     return ap / y_pred.shape[-1]
+
+
+@_ensure_io
+@_validate_unique
+def err(y_true, y_pred, k=None, relevance=multilabel, max_grade=1.):
+    """Compute Expected Reciprocal Rank(s).
+    The cascade model: a user examines the positions one by one and stops at
+    each position with the probability ``(2 ** grade - 1) / 2 ** max_grade``.
+    ERR is the expected reciprocal of the position where the user stops.
+
+    Parameters
+    ----------
+    y_true : scalar, iterable or ndarray of shape (n_samples, n_labels)
+        True labels of entities to be ranked. In case of scalars ``y_pred``
+        should be of shape (1, n_labels).
+    y_pred : iterable, ndarray of shape (n_samples, n_labels)
+        Target labels sorted by relevance (as returned by an IR system).
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    relevance : callable, default=topk.relevance.multilabel
+        A function that calculates relevance judgements (grades) based on
+        input ``y_pred`` and ``y_true``.
+    max_grade : float, default=1.
+        The highest possible grade, the higher grades are clipped to it. It
+        doesn't depend on the data, so the values of a query don't depend
+        on the other queries.
+
+    Returns
+    -------
+    err : float in [0., 1.]
+        The expected reciprocal ranks for all samples.
+
+    References
+    ----------
+    `Chapelle et al. Expected reciprocal rank for graded relevance (2009)
+    <https://doi.org/10.1145/1645953.1646033>`_
+
+    Examples
+    --------
+    >>> from irmetrics.topk import err
+    >>> y_true = 1
+    >>> y_pred = [0, 1, 4]
+    >>> err(y_true, y_pred)
+    0.25
+    """
+    relevant = relevance(y_true, y_pred)
+    if sparse.issparse(relevant):
+        return sparse.err(relevant, k, max_grade)
+    if packed.ispacked(relevant):
+        relevant = relevant.unpack()
+
+    stop = (2. ** sparse._clip(relevant, max_grade) - 1) / 2. ** max_grade
+    reach = np.cumprod(1 - stop, axis=-1)[..., :-1]
+    reach = np.concatenate([np.ones_like(stop[..., :1]), reach], axis=-1)
+    return np.sum(stop * reach / np.arange(1, stop.shape[-1] + 1), axis=-1)
+
+
+@_ensure_io
+@_validate_unique
+def rbp(y_true, y_pred, k=None, relevance=multilabel, p=0.8,
+        max_grade=1.):
+    """Compute Rank-Biased Precision score(s).
+    A user examines the next position with the probability ``p``, RBP is the
+    expected rate of relevant items among the examined ones.
+
+    Parameters
+    ----------
+    y_true : scalar, iterable or ndarray of shape (n_samples, n_labels)
+        True labels of entities to be ranked. In case of scalars ``y_pred``
+        should be of shape (1, n_labels).
+    y_pred : iterable, ndarray of shape (n_samples, n_labels)
+        Target labels sorted by relevance (as returned by an IR system).
+    k : int, default=None
+        Only consider the highest k scores in the ranking. If None, use all
+        outputs.
+    relevance : callable, default=topk.relevance.multilabel
+        A function that calculates relevance judgements (grades) based on
+        input ``y_pred`` and ``y_true``.
+    p : float, default=0.8
+        The persistence: the probability to examine the next position.
+    max_grade : float, default=1.
+        The highest possible grade, the grades are divided by it. The higher
+        grades are clipped to it.
+
+    Returns
+    -------
+    rbp : float in [0., 1.]
+        The rank-biased precisions for all samples.
+
+    References
+    ----------
+    `Moffat and Zobel. Rank-biased precision for measurement of retrieval
+    effectiveness (2008) <https://doi.org/10.1145/1416950.1416952>`_
+
+    Examples
+    --------
+    >>> from irmetrics.topk import rbp
+    >>> y_true = 1
+    >>> y_pred = [0, 1, 4]
+    >>> rbp(y_true, y_pred, p=0.5)
+    0.25
+    """
+    relevant = relevance(y_true, y_pred)
+    if sparse.issparse(relevant):
+        return sparse.rbp(relevant, k, p, max_grade)
+    if packed.ispacked(relevant):
+        relevant = relevant.unpack()
+
+    gains = sparse._clip(relevant, max_grade) / max_grade
+    gains = gains * p ** np.arange(relevant.shape[-1])
+    return (1 - p) * np.sum(gains, axis=-1)
@@ -37,5 +37,11 @@ setup(
     extras_require={
         # Didn't come up with a better name
         "pandas": ["pandas"],
+        "arrow": ["pyarrow"],
+        "dask": ["dask[array,dataframe]"],
+        "scipy": ["scipy"],
+    },
+    entry_points={
+        "console_scripts": ["irmetrics=irmetrics.cli:main"],
     },
 )
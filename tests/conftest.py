@@ -2,7 +2,7 @@ import pytest
 import numpy as np
 
 from contextlib import contextmanager
-from irmetrics.topk import rr, recall, precision, ndcg, ap
+from irmetrics.topk import rr, recall, precision, ndcg, ap, err, rbp
 
 
 @contextmanager
@@ -10,6 +10,25 @@ def does_not_raise():
     yield
 
 
+@pytest.fixture
+def rankings():
+    """Generate the random true labels and the rankings of all labels.
+    The rankings of ``n_systems`` systems (if given) are stacked along the
+    first axis, the rankings are cut at ``top``.
+    """
+    def generate(n_samples, n_labels, n_true=1, top=None, n_systems=None,
+                 seed=137):
+        rng = np.random.default_rng(seed)
+        y_true = rng.integers(0, n_labels, (n_samples, n_true))
+        shape = (n_samples, n_labels)
+        if n_systems is not None:
+            shape = (n_systems,) + shape
+        y_pred = np.argsort(rng.random(shape), axis=-1)[..., :top]
+        return y_true, y_pred
+
+    return generate
+
+
 @pytest.fixture
 def inputs():
     return [
@@ -81,6 +100,26 @@ _OUTPUTS = {
         (1. / 3., does_not_raise),
         # (1. / 3., does_not_raise),
     ],
+    err: [
+        (1. / 2., does_not_raise),
+        (1. / 2. / 2, does_not_raise),  # stops at the first position or not
+        (1. / 2. / 3, does_not_raise),
+        (1. / 2., does_not_raise),
+        (0., does_not_raise),
+        (0., does_not_raise),
+        (1. / 2., does_not_raise),
+        (1. / 2., does_not_raise),
+    ],
+    rbp: [
+        ((1 - .8), does_not_raise),
+        ((1 - .8) * .8, does_not_raise),
+        ((1 - .8) * .64, does_not_raise),
+        ((1 - .8), does_not_raise),
+        (0., does_not_raise),
+        (0., does_not_raise),
+        ((1 - .8), does_not_raise),
+        ((1 - .8), does_not_raise),
+    ],
 }
 
 
@@ -97,3 +136,8 @@ def expected(raw_outputs):
 @pytest.fixture
 def exceptions(raw_outputs):
     return raw_outputs[1]
+
+
+@pytest.fixture
+def cases(inputs, expected, exceptions):
+    return zip(inputs, expected, exceptions)
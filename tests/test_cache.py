@@ -0,0 +1,95 @@
+import pytest
+import numpy as np
+
+from irmetrics.cache import RelevanceCache
+from irmetrics.relevance import multilabel
+from irmetrics.topk import rr, recall, precision, ndcg, ap
+
+
+@pytest.fixture
+def data(rankings):
+    return rankings(n_samples=128, n_labels=40, top=20)
+
+
+@pytest.mark.parametrize("content", [False, True])
+def test_reuses_relevance(data, content):
+    y_true, y_pred = data
+    cache = RelevanceCache(content=content)
+    for measure in [rr, recall, precision, ndcg, ap]:
+        for k in [None, 10, 5, 1]:
+            np.testing.assert_equal(
+                measure(y_true, y_pred, k, relevance=cache),
+                measure(y_true, y_pred, k, relevance=multilabel),
+            )
+
+    # Content based fingerprints can't reuse the judgements for smaller k
+    assert cache.cache_info().misses == (4 if content else 1)
+
+
+def test_cumsum(data):
+    y_true, y_pred = data
+    cache = RelevanceCache()
+    expected = np.cumsum(multilabel(y_true, y_pred), axis=-1)
+    np.testing.assert_equal(cache.cumsum(y_true, y_pred), expected)
+    np.testing.assert_equal(
+        cache.cumsum(y_true, y_pred[:, :5]), expected[:, :5])
+    assert cache.cache_info().misses == 1
+
+
+@pytest.mark.parametrize("measure", [recall, precision])
+def test_counts_from_cumsum(data, measure, monkeypatch):
+    y_true, y_pred = data
+    cache = RelevanceCache()
+    outputs = [measure(y_true, y_pred, k, relevance=cache) for k in [10, 5]]
+
+    # The counts are read from the cumulative sums, not the judgements
+    def judgements(self, y_true, y_pred):
+        raise AssertionError("The judgements shouldn't be summed")
+
+    monkeypatch.setattr(RelevanceCache, "__call__", judgements)
+    for k, output in zip([10, 5], outputs):
+        np.testing.assert_equal(output, measure(y_true, y_pred, k))
+        np.testing.assert_equal(
+            measure(y_true, y_pred, k, relevance=cache), output)
+
+
+def test_content_fingerprints_lists():
+    cache = RelevanceCache(content=True)
+    assert rr([1, 2], [[0, 1], [2, 0]], relevance=cache).tolist() == [.5, 1.]
+    assert rr([1, 2], [[0, 1], [2, 0]], relevance=cache).tolist() == [.5, 1.]
+    assert cache.cache_info().hits == 1
+
+
+def test_evicts_least_recently_used(data):
+    y_true, y_pred = data
+    cache = RelevanceCache(maxsize=2)
+
+    copies = [y_pred.copy() for _ in range(3)]
+    rr(y_true, copies[0], relevance=cache)
+    rr(y_true, copies[1], relevance=cache)
+    rr(y_true, copies[0], relevance=cache)
+    rr(y_true, copies[2], relevance=cache)
+    assert cache.cache_info().currsize == 2
+
+    # copies[1] was evicted, copies[0] was still there
+    rr(y_true, copies[0], relevance=cache)
+    rr(y_true, copies[1], relevance=cache)
+    assert cache.cache_info().hits == 2
+    assert cache.cache_info().misses == 4
+
+
+def test_invalidates(data):
+    y_true, y_pred = data
+    cache = RelevanceCache()
+    original = rr(y_true, y_pred, relevance=cache)
+
+    y_pred[:, [0, 1]] = y_pred[:, [1, 0]]
+    cache.invalidate(y_pred)
+    assert cache.cache_info().currsize == 0
+
+    modified = rr(y_true, y_pred, relevance=cache)
+    np.testing.assert_equal(modified, rr(y_true, y_pred))
+    assert not np.array_equal(original, modified)
+
+    cache.invalidate()
+    assert cache.cache_info().currsize == 0
@@ -0,0 +1,135 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from irmetrics.cli import main, run, source
+from irmetrics.topk import rr, ndcg
+
+
+@pytest.fixture
+def data(rankings):
+    return rankings(n_samples=500, n_labels=30, top=10)
+
+
+@pytest.fixture(params=["npy", "parquet", "csv"])
+def paths(request, tmp_path, data):
+    y_true, y_pred = data
+    if request.param == "npy":
+        np.save(tmp_path / "y_true.npy", y_true)
+        np.save(tmp_path / "y_pred.npy", y_pred)
+        return [str(tmp_path / "y_true.npy"), str(tmp_path / "y_pred.npy")]
+
+    if request.param == "parquet":
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        table = pa.table({"y_true": y_true[:, 0], "y_pred": list(y_pred)})
+        pq.write_table(table, tmp_path / "data.parquet", row_group_size=128)
+        return [str(tmp_path / "data.parquet")]
+
+    df = pd.DataFrame({
+        "y_true": y_true[:, 0].astype(str),
+        "y_pred": [" ".join(map(str, labels)) for labels in y_pred],
+    })
+    df.to_csv(tmp_path / "data.csv", index=False)
+    return [str(tmp_path / "data.csv")]
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_run(paths, data, n_jobs, dedup):
+    y_true, y_pred = data
+    batches = list(run(source(paths, batch_size=128), ["rr"], [None, 5],
+                       n_jobs=n_jobs, dedup=dedup))
+    assert len(batches) == 4
+    for k in [None, 5]:
+        name = "rr@{}".format(k or "all")
+        outputs = np.concatenate([batch[name] for batch in batches])
+        np.testing.assert_equal(outputs, rr(y_true, y_pred, k))
+
+
+@pytest.mark.parametrize("output", ["results.parquet", "results.npz"])
+def test_main(paths, data, tmp_path, capsys, output):
+    pytest.importorskip("pyarrow")
+    y_true, y_pred = data
+    output = str(tmp_path / output)
+    main(paths + ["-m", "rr", "ndcg", "-k", "5", "-o", output])
+
+    if output.endswith(".npz"):
+        results = dict(np.load(output))
+    else:
+        results = pd.read_parquet(output)
+    np.testing.assert_equal(results["rr@5"], rr(y_true, y_pred, 5))
+    np.testing.assert_equal(results["ndcg@5"], ndcg(y_true, y_pred, 5))
+
+    summary = capsys.readouterr().out.splitlines()
+    assert [line.split("\t")[0] for line in summary] == ["rr@5", "ndcg@5"]
+    assert float(summary[0].split("\t")[1]) == pytest.approx(
+        rr(y_true, y_pred, 5).mean(), abs=1e-6)
+
+
+def test_ragged_csv(tmp_path):
+    pd.DataFrame({"y_true": ["1", "2"], "y_pred": ["0 1 4", "2"]}).to_csv(
+        tmp_path / "data.csv", index=False)
+    batches = list(run(source([str(tmp_path / "data.csv")]), ["rr"]))
+    np.testing.assert_equal(batches[0]["rr@all"], [0.5, 1.])
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def ragged(request, tmp_path):
+    y_true, y_pred = [[1, 2], [3], [5]], [[0, 1, 4], [2], [6, 5, 7]]
+    if request.param == "csv":
+        pd.DataFrame({
+            "y_true": [" ".join(map(str, labels)) for labels in y_true],
+            "y_pred": [" ".join(map(str, labels)) for labels in y_pred],
+        }).to_csv(tmp_path / "data.csv", index=False)
+        return source([str(tmp_path / "data.csv")])
+
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pa.table({"y_true": y_true, "y_pred": y_pred})
+    pq.write_table(table, tmp_path / "data.parquet")
+    return source([str(tmp_path / "data.parquet")], pad_token=-1)
+
+
+def test_ragged(ragged):
+    batches = list(run(ragged, ["rr", "recall", "precision"]))
+    np.testing.assert_almost_equal(batches[0]["rr@all"], [0.5, 0., 0.5])
+    np.testing.assert_almost_equal(batches[0]["recall@all"], [0.5, 0., 1.])
+    np.testing.assert_almost_equal(
+        batches[0]["precision@all"], [1 / 3, 0., 1 / 3])
+
+
+def test_unknown_inputs():
+    with pytest.raises(ValueError):
+        source(["data.json"])
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3, 128])
+@pytest.mark.parametrize("block_size", [5, 2 ** 24])
+def test_csv_ranges(tmp_path, monkeypatch, batch_size, block_size):
+    y_true, y_pred = ["1", "2", "3", "4"], ["0 1", "2", "3 1 0", "5 4"]
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"y_true": y_true, "y_pred": y_pred}).to_csv(
+        path, index=False)
+    # The last line may lack the line break
+    path.write_text(path.read_text().rstrip("\n"))
+
+    csv = source([str(path)], batch_size=batch_size)
+    monkeypatch.setattr(csv, "block_size", block_size)
+    batches = list(run(csv, ["rr"]))
+    assert len(batches) == -(-len(y_true) // batch_size)
+    np.testing.assert_equal(
+        np.concatenate([batch["rr@all"] for batch in batches]),
+        [0.5, 1., 1., 0.5],
+    )
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_warns_once(tmp_path, n_jobs):
+    y_pred = np.tile([[1, 1, 2]], (8, 1))
+    np.save(tmp_path / "y_true.npy", np.ones((8, 1), dtype=int))
+    np.save(tmp_path / "y_pred.npy", y_pred)
+    paths = [str(tmp_path / "y_true.npy"), str(tmp_path / "y_pred.npy")]
+    with pytest.warns(RuntimeWarning) as caught:
+        list(run(source(paths, batch_size=2), ["rr"], n_jobs=n_jobs))
+    assert len(caught) == 1
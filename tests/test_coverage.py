@@ -3,6 +3,8 @@ import numpy as np
 
 from contextlib import contextmanager
 from irmetrics.coverage import coverage, iou
+from irmetrics.coverage import exposure, catalog_coverage
+from irmetrics.coverage import gini, concentration, novelty
 
 
 @contextmanager
@@ -36,8 +38,10 @@ def test_coverage(y_pred, output, n_samples=128):
         (1, [2, 1, 3], 1. / 3, does_not_raise()),
         (1, [2, 3, 1], 1. / 3, does_not_raise()),
         (1, [3, 4, 5], 0, does_not_raise()),
-        (1, [1, 1, 1], 0, pytest.raises(ValueError)),
-        ([1, 1, 1], 1, 0, pytest.raises(ValueError)),
+        (1, [1, 1, 1], 1., does_not_raise()),
+        ([1, 1, 1], 1, 1., does_not_raise()),
+        ([1, 2], [2, 2, 3], 1. / 3, does_not_raise()),
+        (["a", "b"], ["b", "c", "a"], 2. / 3, does_not_raise()),
     ])
 def test_iou(y_true, y_pred, output, exception, n_samples=128):
     with exception:
@@ -49,8 +53,9 @@ def test_iou(y_true, y_pred, output, exception, n_samples=128):
     (1, [2, 1, 3], 1. / 3, does_not_raise()),
     (1, [2, 3, 1], 1. / 3, does_not_raise()),
     (1, [3, 4, 5], 0, does_not_raise()),
-    (1, [1, 1, 1], 0, pytest.raises(ValueError)),
-    ([1, 1, 1], 1, 0, pytest.raises(ValueError)),
+    (1, [1, 1, 1], 1., does_not_raise()),
+    ([1, 1, 1], 1, 1., does_not_raise()),
+    ([1, 2], [2, 2, 3], 1. / 3, does_not_raise()),
 ])
 def test_iou_vectorized(y_true, y_pred, output, exception, n_samples=128):
     y_trues = np.repeat(np.array(y_true), n_samples)
@@ -58,3 +63,94 @@ def test_iou_vectorized(y_true, y_pred, output, exception, n_samples=128):
     outputs = np.repeat(np.array(output), n_samples)
     with exception:
         np.testing.assert_array_equal(iou(y_trues, y_preds), outputs)
+
+
+@pytest.mark.parametrize("y_pred, pad_token, output", [
+    ([[1, -1], [-1, -1]], -1, [1, 0]),
+    ([[1., np.nan], [np.nan, np.nan]], np.nan, [1, 0]),
+    ([["a", ""], ["", ""]], "", [1, 0]),
+])
+def test_coverage_padding(y_pred, pad_token, output):
+    np.testing.assert_equal(coverage(y_pred, pad_token=pad_token), output)
+
+
+@pytest.fixture
+def recommendations(n_samples=1000, n_labels=10, n_items=500, seed=137):
+    rng = np.random.default_rng(seed)
+    y_pred = rng.zipf(1.5, (n_samples, n_labels)) % n_items
+    y_pred[rng.random(y_pred.shape) < 0.1] = -1
+    return y_pred, n_items
+
+
+def test_exposure_streaming(recommendations, batch_size=128):
+    y_pred, n_items = recommendations
+    counts = None
+    for start in range(0, y_pred.shape[0], batch_size):
+        batch = y_pred[start:start + batch_size]
+        counts = exposure(batch, n_items, pad_token=-1, counts=counts)
+
+    items, expected = np.unique(y_pred[y_pred >= 0], return_counts=True)
+    np.testing.assert_equal(counts[items], expected)
+    assert counts.sum() == expected.sum()
+
+
+@pytest.mark.parametrize("y_pred", [[[0, 4]], [[-2, 1]]])
+def test_exposure_raises(y_pred):
+    with pytest.raises(ValueError):
+        exposure(y_pred, n_items=4)
+
+
+def test_catalog_metrics(recommendations):
+    y_pred, n_items = recommendations
+    counts = exposure(y_pred, n_items, pad_token=-1)
+    items = y_pred[y_pred >= 0]
+
+    assert catalog_coverage(counts) == np.unique(items).size / n_items
+
+    # The mean absolute difference definition
+    diffs = np.abs(counts[:, None] - counts[None]).sum()
+    expected = diffs / (2 * n_items ** 2 * counts.mean())
+    np.testing.assert_almost_equal(gini(counts), expected)
+
+    top = np.sort(counts)[::-1][:10].sum() / counts.sum()
+    np.testing.assert_almost_equal(concentration(counts, 10), top)
+
+    expected = -np.log2(counts[items] / items.size).mean()
+    np.testing.assert_almost_equal(novelty(counts), expected)
+
+
+@pytest.mark.parametrize("counts", [np.zeros(4, dtype=int), np.zeros(0)])
+def test_catalog_metrics_empty(counts):
+    with np.errstate(all="raise"):
+        assert catalog_coverage(counts) == 0.
+        assert gini(counts) == 0.
+        assert concentration(counts, 10) == 0.
+        assert novelty(counts) == 0.
+    assert concentration(np.array([1, 2]), top_n=0) == 0.
+
+
+@pytest.mark.parametrize("y_true, y_pred, pad_token, output", [
+    ([[1, -1], [1, 2]], [[1, 1, -1], [2, -1, -1]], -1, [1., .5]),
+    ([1., np.nan], [1., 2., np.nan], np.nan, .5),
+    (["a", None], ["a", None, None], None, 1.),
+    ([-1, -1], [-1, -1], -1, np.nan),
+    (np.array(["a", 1], dtype=object), np.array(["a", 1., "1"], dtype=object),
+     None, 2 / 3),
+    (np.array(["a", 1], dtype=object), [1, 2], None, 1 / 3),
+])
+def test_iou_padding(y_true, y_pred, pad_token, output):
+    with np.errstate(invalid="ignore"):
+        outputs = iou(y_true, y_pred, pad_token=pad_token)
+    np.testing.assert_equal(outputs, output)
+
+
+def test_iou_sets(n_samples=64, seed=137):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 10, (n_samples, 5))
+    y_pred = rng.integers(0, 10, (n_samples, 8))
+
+    expected = [
+        len(set(t) & set(p)) / len(set(t) | set(p))
+        for t, p in zip(y_true, y_pred)
+    ]
+    np.testing.assert_almost_equal(iou(y_true, y_pred), expected)
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from irmetrics.flat import flat
+from irmetrics.topk import rr, recall, ndcg, err
+
+dask = pytest.importorskip("dask")
+da = pytest.importorskip("dask.array")
+dd = pytest.importorskip("dask.dataframe")
+irdask = pytest.importorskip("irmetrics.dask")
+
+
+@pytest.fixture
+def data(rankings):
+    y_true, y_pred = rankings(n_samples=200, n_labels=30, top=10)
+    return y_true[:, 0], y_pred
+
+
+@pytest.fixture
+def long(data, seed=137):
+    # Shuffle the rows, the positions are kept by the order within a query
+    y_true, y_pred = data
+    rows = np.repeat(np.arange(y_pred.shape[0]), y_pred.shape[1])
+    grades = (y_pred == y_true[:, None]).ravel() * rows % 3
+    df = pd.DataFrame({"query": rows, "relevance": grades})
+    order = np.random.default_rng(seed).permutation(len(df))
+    return df.iloc[np.sort(order)].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("scheduler", ["threads", "processes"])
+@pytest.mark.parametrize("measure", [rr, recall, ndcg])
+def test_evaluate(data, measure, scheduler):
+    y_true, y_pred = data
+    chunked = da.from_array(y_true, 37), da.from_array(y_pred, (37, 5))
+    values = irdask.evaluate(*chunked, measure, k=5)
+    np.testing.assert_equal(
+        values.compute(scheduler=scheduler), measure(y_true, y_pred, k=5))
+
+
+def test_frame(data):
+    y_true, y_pred = data
+    df = pd.DataFrame({"y_true": y_true, "y_pred": list(y_pred)})
+    with dask.config.set({"dataframe.convert-string": False}):
+        ddf = dd.from_pandas(df, npartitions=7)
+        values = irdask.frame(ddf, "y_true", "y_pred", rr).compute(
+            scheduler="threads")
+    np.testing.assert_equal(values.to_numpy(), rr(y_true, y_pred))
+
+
+@pytest.mark.parametrize("measure", [rr, ndcg, err])
+def test_flat(long, measure):
+    ddf = dd.from_pandas(long, npartitions=5, sort=False)
+    kwargs = {"max_grade": 2} if measure is err else {}
+    outputs = irdask.flat(ddf, "query", "relevance", measure, k=5, **kwargs)
+    outputs = outputs.compute(scheduler="threads").sort_index()
+    expected = flat(long, "query", "relevance", measure, k=5, **kwargs)
+    np.testing.assert_almost_equal(outputs.to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize("split_every", [None, 2])
+def test_summary(split_every, n_samples=1000, seed=137):
+    values = np.random.default_rng(seed).random(n_samples)
+    values[::10] = np.nan
+    count, mean, var = irdask.summary(
+        da.from_array(values, chunks=33), split_every).compute()
+    assert count == np.count_nonzero(~np.isnan(values))
+    np.testing.assert_almost_equal(mean, np.nanmean(values))
+    np.testing.assert_almost_equal(var, np.nanvar(values, ddof=1))
+
+    series = dd.from_pandas(pd.Series(values), npartitions=4)
+    np.testing.assert_almost_equal(
+        irdask.summary(series, split_every).compute()[1], np.nanmean(values))
+
+
+@pytest.mark.parametrize("split_every", [None, 2])
+def test_summary_offset(split_every, n_samples=1000, seed=137):
+    # The sums of squares would cancel the variance of the large values
+    values = 1e9 + np.random.default_rng(seed).random(n_samples)
+    _, mean, var = irdask.summary(
+        da.from_array(values, chunks=33), split_every).compute()
+    np.testing.assert_allclose(mean, values.mean())
+    np.testing.assert_allclose(var, values.var(ddof=1), rtol=1e-6)
+    assert np.isnan(irdask.summary(da.from_array([np.nan])).compute()[1])
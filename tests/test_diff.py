@@ -0,0 +1,50 @@
+import pytest
+import numpy as np
+
+from irmetrics.diff import RunDiff, diff
+from irmetrics.topk import rr, ndcg, recall
+
+
+@pytest.fixture
+def data(rankings):
+    y_true, (old, new) = rankings(
+        n_samples=500, n_labels=20, n_true=2, n_systems=2)
+    return y_true, old[:, :10], new[:, :8]
+
+
+@pytest.mark.parametrize("measure", [rr, ndcg, recall])
+@pytest.mark.parametrize("chunk", [37, 500])
+@pytest.mark.parametrize("k", [None, 5])
+def test_run_diff(data, measure, chunk, k, top_n=7):
+    y_true, old, new = data
+    ids = np.arange(len(y_true)) + 1000
+
+    run_diff = RunDiff([measure], k, top_n=top_n)
+    for i in range(0, len(y_true), chunk):
+        run_diff.update(y_true[i:i + chunk], old[i:i + chunk],
+                        new[i:i + chunk], ids[i:i + chunk])
+    report = run_diff.report()[measure.__name__]
+
+    with np.errstate(invalid="ignore"):
+        deltas = measure(y_true, new, k) - measure(y_true, old, k)
+    defined = ~np.isnan(deltas)
+    assert report.improved == np.sum(deltas[defined] > 0)
+    assert report.degraded == np.sum(deltas[defined] < 0)
+    assert report.unchanged == np.sum(deltas[defined] == 0)
+    assert report.undefined == np.sum(~defined)
+    assert report.mean == pytest.approx(np.mean(deltas[defined]))
+
+    ordered = np.sort(deltas[defined])
+    np.testing.assert_almost_equal(report.wins.deltas, ordered[::-1][:top_n])
+    np.testing.assert_almost_equal(report.losses.deltas, ordered[:top_n])
+    np.testing.assert_almost_equal(
+        deltas[report.wins.ids - 1000], report.wins.deltas)
+    np.testing.assert_almost_equal(
+        deltas[report.losses.ids - 1000], report.losses.deltas)
+
+
+def test_diff_tolerance(data):
+    y_true, old, _ = data
+    report = diff(y_true, old, old, measures=[rr], tol=0.1)["rr"]
+    assert report.unchanged == len(y_true)
+    assert report.wins.ids.size == report.losses.ids.size == 0
@@ -2,7 +2,7 @@ import pytest
 import numpy as np
 import pandas as pd
 from irmetrics.flat import flat
-from irmetrics.topk import rr, ndcg
+from irmetrics.topk import rr, ndcg, err, rbp
 
 
 @pytest.fixture
@@ -23,6 +23,8 @@ def data(inputs):
 @pytest.mark.parametrize("measure", [
     rr,
     ndcg,
+    err,
+    rbp,
     # Not going to support these methods as they require
     # true shapes of y_pred/y_true.
     # recall,
@@ -78,3 +80,14 @@ def test_nonbinary_ndcg(nonbinary_data):
         measure=ndcg,
     )
     np.testing.assert_almost_equal(outputs.values, expected)
+
+
+@pytest.mark.parametrize("measure", [err, rbp])
+def test_nonbinary_cascade(nonbinary_data, measure):
+    df, _ = nonbinary_data
+    outputs = flat(df, query_col="query", relevance_col="relevance",
+                   measure=measure)
+
+    expected = df.groupby("query")["relevance"].apply(
+        lambda x: measure(x.to_numpy(), None, relevance=lambda t, p: t))
+    np.testing.assert_almost_equal(outputs.values, expected.values)
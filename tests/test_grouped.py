@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from irmetrics.grouped import grouped
+
+
+@pytest.fixture
+def data(n_queries=1000, seed=137):
+    rng = np.random.default_rng(seed)
+    values = rng.random((n_queries, 2))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    segments = pd.DataFrame({
+        "locale": rng.choice(["de", "en", "fr"], n_queries),
+        "bucket": rng.integers(0, 5, n_queries),
+    })
+    return values, segments
+
+
+def test_matches_pandas(data):
+    values, segments = data
+    groups = grouped(values, segments)
+
+    for name, column in segments.items():
+        expected = pd.DataFrame(values).groupby(column.values)
+        np.testing.assert_equal(groups[name].labels, expected.mean().index)
+        np.testing.assert_equal(groups[name].count, expected.count())
+        np.testing.assert_almost_equal(groups[name].mean, expected.mean())
+        np.testing.assert_almost_equal(groups[name].var, expected.var())
+
+
+def test_columns(data):
+    values, segments = data
+    groups = grouped(values[:, 0], segments.values)
+    assert len(groups) == 2
+
+    single = grouped(values[:, 0], segments["bucket"])
+    assert single.mean.shape == (5,)
+    np.testing.assert_equal(single.mean, groups[1].mean)
+
+
+def test_weights(data):
+    values, segments = data
+    weights = np.arange(values.shape[0]) % 3
+    groups = grouped(values[:, 0], segments["locale"], weights, ddof=0)
+
+    for label, count, weight, mean, var in zip(
+            groups.labels, groups.count, groups.weight, groups.mean,
+            groups.var):
+        idx = (segments["locale"].values == label) & ~np.isnan(values[:, 0])
+        assert count == np.count_nonzero(idx)
+        assert weight == weights[idx].sum()
+        expected = np.average(values[idx, 0], weights=weights[idx])
+        np.testing.assert_almost_equal(mean, expected)
+
+        deviations = (values[idx, 0] - expected) ** 2
+        expected = np.average(deviations, weights=weights[idx])
+        np.testing.assert_almost_equal(var, expected)
+
+
+def test_aligns_series():
+    values = pd.Series([1., 0.], index=[20, 10])
+    segments = pd.Series(["a", "b"], index=[10, 20])
+    groups = grouped(values, segments)
+    np.testing.assert_equal(groups.mean, [0., 1.])
+    np.testing.assert_equal(groups.var, [np.nan, np.nan])
+
+
+def test_missing_labels():
+    segments = np.array(["b", None, "a", None, "b"], dtype=object)
+    groups = grouped([1., 0., 1., 1., 0.], segments)
+    np.testing.assert_equal(groups.labels, ["b", None, "a"])
+    np.testing.assert_equal(groups.count, [2, 2, 1])
+    np.testing.assert_equal(groups.mean, [0.5, 0.5, 1.])
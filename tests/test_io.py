@@ -2,7 +2,9 @@ import pytest
 import numpy as np
 
 from numpy import array as ar
-from irmetrics.io import ensure_inputs
+from irmetrics import io
+from irmetrics.io import ensure_inputs, lengths, valid, from_arrow
+from irmetrics.io import row_hashes, unique_rows, _repeated
 
 
 # Identity shortcut
@@ -40,3 +42,106 @@ def test_handles_inputs(y_true, y_pred, y_true_ex, y_pred_ex):
 
     np.testing.assert_array_equal(true, y_true_ex)
     np.testing.assert_array_equal(pred, y_pred_ex)
+
+
+@pytest.mark.parametrize("x, pad_token, expected", [
+    (ar([[1, 2, -1]]), -1, ar([2])),
+    (ar([[1, 2, -1]]), None, ar([3])),
+    (ar([[1, 2, -1]]), np.nan, ar([3])),
+    (ar([[1., 2., np.nan]]), np.nan, ar([2])),
+    (ar([[1, None, None]]), None, ar([1])),
+    (ar([[1, np.nan, None]], dtype=object), np.nan, ar([2])),
+    (ar([["a", "b", ""], ["a", "", ""]]), "", ar([2, 1])),
+])
+def test_lengths(x, pad_token, expected):
+    np.testing.assert_equal(lengths(x, pad_token), expected)
+    np.testing.assert_equal(valid(x, pad_token).sum(-1), expected)
+
+
+@pytest.fixture
+def column(lists, kind):
+    pa = pytest.importorskip("pyarrow")
+    if kind == "fixed":
+        return pa.array(lists, pa.list_(pa.int64(), len(lists[0])))
+    if kind == "chunked":
+        return pa.chunked_array([lists[:1], lists[1:]])
+    if kind == "pandas":
+        pd = pytest.importorskip("pandas")
+        return pd.Series(lists, dtype=pd.ArrowDtype(pa.list_(pa.int64())))
+    return pa.array(lists)
+
+
+@pytest.mark.parametrize("kind", ["list", "fixed", "chunked", "pandas"])
+@pytest.mark.parametrize("lists", [[[1, 2], [3, 4], [5, 6]]])
+def test_from_arrow(column, lists):
+    labels = from_arrow(column)
+    np.testing.assert_equal(labels, lists)
+
+    true, pred = ensure_inputs([1, 3, 5], column)
+    np.testing.assert_equal(pred, lists)
+
+
+@pytest.mark.parametrize("kind", ["list"])
+@pytest.mark.parametrize("lists", [[[1, 2], [3, 4], [5, 6]]])
+def test_from_arrow_zero_copy(column, lists):
+    values = column.values.to_numpy()
+    assert np.shares_memory(from_arrow(column), values)
+    assert np.shares_memory(from_arrow(column.slice(1)), values)
+    np.testing.assert_equal(from_arrow(column.slice(1)), lists[1:])
+
+
+@pytest.mark.parametrize("kind", ["list", "chunked", "pandas"])
+@pytest.mark.parametrize("lists", [[[1, 2, 3], [4], [], [5, 6]]])
+@pytest.mark.parametrize("pad_token, expected", [
+    (-1, [[1, 2, 3], [4, -1, -1], [-1, -1, -1], [5, 6, -1]]),
+    (None, [[1, 2, 3], [4, None, None], [None] * 3, [5, 6, None]]),
+])
+def test_from_arrow_ragged(column, pad_token, expected):
+    labels = from_arrow(column, pad_token=pad_token)
+    np.testing.assert_equal(labels, expected)
+
+
+@pytest.mark.parametrize("y_pred, pad_token, expected", [
+    (ar([[1, 2, 3]]), None, False),
+    (ar([[1, 3, 1]]), None, True),
+    (ar([[1, -1, -1]]), -1, False),
+    (ar([[1., np.nan, np.nan]]), None, False),
+    (ar([[1, None, None]], dtype=object), None, False),
+    (ar([[1, 1, None]], dtype=object), None, True),
+    (ar([["a", "b", "a"]]), None, True),
+])
+def test_repeated(y_pred, pad_token, expected):
+    assert _repeated(y_pred, pad_token) == expected
+
+
+@pytest.mark.parametrize("y_true, y_pred, index, counts", [
+    (ar([[1], [2], [1]]), ar([[1, 2]] * 3), ar([0, 1, 0]), ar([2, 1])),
+    (ar([[1]]), ar([[1, 2], [2, 1], [1, 2]]), ar([0, 1, 0]), ar([2, 1])),
+    (ar([[1, None]] * 2, dtype=object), ar([[1, 2]] * 2), ar([0, 0]), ar([2])),
+])
+def test_unique_rows(y_true, y_pred, index, counts):
+    first, inverse, n = unique_rows(y_true, y_pred)
+    np.testing.assert_equal(np.sort(n), np.sort(counts))
+    np.testing.assert_equal(first[inverse], index)
+
+
+def test_row_hashes():
+    x = np.array([[1, 2, 3], [1, 2, 4], [1, 2, 3]])
+    hashes = row_hashes(x)
+    assert hashes.dtype == np.uint64
+    assert hashes[0] == hashes[2] != hashes[1]
+    assert row_hashes(x.astype(float))[0] != hashes[0]
+    assert row_hashes(x[:, ::-1])[0] != hashes[0]
+    assert len(set(row_hashes(np.arange(10000).reshape(-1, 1)))) == 10000
+
+
+def test_unique_rows_collisions(monkeypatch):
+    def collide(x):
+        return np.zeros(len(x), dtype=np.uint64)
+
+    monkeypatch.setattr(io, "row_hashes", collide)
+    y_true = np.array([[1], [2], [1]])
+    y_pred = np.array([[1., np.nan], [1., np.nan], [1., np.nan]])
+    index, inverse, counts = unique_rows(y_true, y_pred)
+    np.testing.assert_equal(index[inverse], [0, 1, 0])
+    np.testing.assert_equal(counts[inverse], [2, 1, 2])
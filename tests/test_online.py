@@ -0,0 +1,85 @@
+import pytest
+import numpy as np
+
+from irmetrics.online import Window, Decayed
+from irmetrics.topk import rr
+
+
+@pytest.fixture
+def events(n_events=500, seed=137):
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.uniform(0, 3600, n_events))
+    # Long gaps between the bursts of events
+    times[n_events // 2:] += 7200
+    values = rng.random(n_events)
+    values[rng.random(n_events) < 0.1] = np.nan
+    return times, values
+
+
+@pytest.mark.parametrize("window", [None, 60., 90., 600.])
+def test_window(events, window, n_buckets=15, resolution=60.):
+    times, values = events
+    online = Window(n_buckets, resolution)
+    for now, value in zip(times, values):
+        online.update(value, now=now)
+
+        # Compare to the bruteforce over the whole buckets
+        buckets = times // resolution
+        size = n_buckets if window is None else np.ceil(window / resolution)
+        seen = times <= now
+        inside = seen & (buckets > now // resolution - size)
+        expected = values[inside & ~np.isnan(values)]
+        total, count = online.totals(window, now=now)
+        assert count == expected.size
+        np.testing.assert_allclose(total, expected.sum(), atol=1e-9)
+
+    assert online._starts.shape == (n_buckets, 2)
+
+
+def test_window_expires():
+    online = Window(4, resolution=1.)
+    online.update([1., 2.], now=0.)
+    assert online.mean(now=3.) == 1.5
+    assert np.isnan(online.mean(now=4.))
+    assert np.isnan(online.mean(now=1e6))
+
+
+def test_window_precision():
+    online = Window(2, resolution=1.)
+    online.update([1e17, 3.], now=0.)
+    online.update([1.], now=1.)
+    assert online.mean(now=1.) == pytest.approx(1e17 / 3)
+    assert online.mean(now=2.) == 1.
+    online.update([0.5], now=2.)
+    assert online.mean(now=2.) == 0.75
+
+
+def test_window_running_sums(n_buckets=3):
+    online = Window(n_buckets, resolution=1.)
+    for now in range(10000):
+        online.update([1e12 + 0.1, 0.3], now=now)
+    assert online.totals(1., now=9999.) == (1e12 + 0.4, 2)
+    assert online.totals(now=9999.) == (3 * (1e12 + 0.4), 6)
+
+
+def test_decayed(events, halflife=300.):
+    times, values = events
+    online = Decayed(halflife)
+    for now, value in zip(times, values):
+        online.update(value, now=now)
+
+    now = times[-1] + 100
+    finite = ~np.isnan(values)
+    weights = 0.5 ** ((now - times[finite]) / halflife)
+    expected = np.sum(weights * values[finite]) / weights.sum()
+    np.testing.assert_allclose(online.mean(now=now), expected)
+
+
+@pytest.mark.parametrize("online", [
+    Window(10, measure=rr),
+    Decayed(60., measure=rr),
+])
+def test_add(online):
+    online.add([1, 2], [[0, 1], [2, 3]], now=0.)
+    online.add(1, [0, 1, 4], k=1, now=1.)
+    assert online.mean(now=1.) == pytest.approx(0.5, rel=1e-2)
@@ -0,0 +1,111 @@
+import pytest
+import numpy as np
+
+from irmetrics import packed
+from irmetrics.topk import rr, recall, precision, ndcg, ap, err, rbp
+from irmetrics.topk import dcg_score
+from irmetrics.relevance import multilabel
+
+
+def packed_multilabel(y_true, y_pred):
+    return packed.multilabel(y_true, y_pred, block=16)
+
+
+@pytest.fixture
+def relevance(n_samples=128, n_labels=43, seed=137):
+    rng = np.random.default_rng(seed)
+    return rng.random((n_samples, n_labels)) < 0.1
+
+
+@pytest.mark.parametrize("k", [None, 1, 5, 8, 17, 100])
+def test_truncate(relevance, k):
+    outputs = packed.PackedRelevance.pack(relevance).truncate(k)
+    np.testing.assert_equal(outputs.unpack(), relevance[:, :k])
+
+
+@pytest.mark.parametrize("k", [None, 1, 5, 8, 17, 100])
+def test_dcg_score(relevance, k):
+    np.testing.assert_almost_equal(
+        dcg_score(packed.PackedRelevance.pack(relevance), k),
+        dcg_score(relevance, k),
+    )
+
+
+@pytest.mark.parametrize("k", [None, 1, 5, 8, 17])
+def test_metrics(relevance, k):
+    relevance[0] = False
+    relevance[1, :3] = True
+
+    def dense(y_true, y_pred):
+        return relevance[:, :y_pred.shape[-1]]
+
+    def bits(y_true, y_pred):
+        return packed.PackedRelevance.pack(dense(y_true, y_pred))
+
+    # `topk.ap` uses the default relevance for the precisions, see test_ap
+    for measure in [rr, recall, precision, ndcg, err, rbp]:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            np.testing.assert_almost_equal(
+                measure(relevance, relevance, k, relevance=bits),
+                measure(relevance, relevance, k, relevance=dense),
+            )
+
+
+@pytest.mark.parametrize("n_true", [1, 5, 8, 17, 100])
+def test_ap(relevance, n_true):
+    top = relevance[:, :n_true]
+    hits = np.cumsum(top, axis=-1) / np.arange(1, top.shape[-1] + 1)
+    expected = np.sum(hits * top, axis=-1) / relevance.shape[-1]
+    outputs = packed.ap(packed.PackedRelevance.pack(relevance), n_true)
+    np.testing.assert_almost_equal(outputs, expected)
+
+
+@pytest.mark.parametrize("measure", [
+    rr,
+    recall,
+    precision,
+    ndcg,
+    ap,
+    err,
+    rbp,
+])
+@pytest.mark.parametrize("k", [None, 2])
+def test_topk_packed_relevance(cases, measure, k, n_samples=16):
+    for (y_true, y_pred), expected, exception in cases:
+        y_trues = np.tile(np.array(y_true), (n_samples, 1))
+        y_preds = np.tile(np.atleast_2d(y_pred), (n_samples, 1))
+
+        with exception():
+            np.testing.assert_equal(
+                measure(y_trues, y_preds, k, relevance=packed_multilabel),
+                measure(y_trues, y_preds, k, relevance=multilabel),
+            )
+
+
+def test_recall_pad_token():
+    y_true = np.array([[1, 2, -1]])
+    y_pred = np.array([[1, 0, -1, 2]])
+    np.testing.assert_almost_equal(
+        recall(y_true, y_pred, pad_token=-1, relevance=packed.multilabel),
+        recall(y_true, y_pred, pad_token=-1),
+    )
+
+
+def test_memory(n_labels=10000):
+    y_pred = np.arange(n_labels)[None]
+    relevant = packed.multilabel(np.array([[5]]), y_pred)
+    assert relevant.bits.nbytes == n_labels // 8
+
+
+@pytest.mark.parametrize("block_size", [1, 16, 2 ** 20])
+def test_row_blocks(relevance, block_size, monkeypatch):
+    monkeypatch.setattr(packed, "BLOCK_SIZE", block_size)
+    bits = packed.PackedRelevance.pack(relevance)
+    assert bits.counts().dtype == np.int64
+    np.testing.assert_almost_equal(packed.dcg(bits), dcg_score(relevance))
+    positions = np.arange(1, relevance.shape[-1] + 1)
+    hits = np.cumsum(relevance, axis=-1) / positions
+    np.testing.assert_almost_equal(
+        packed.ap(bits, relevance.shape[-1]),
+        np.sum(hits * relevance, axis=-1) / relevance.shape[-1],
+    )
@@ -37,3 +37,47 @@ def conditional_raises(relevance):
 def test_multiple_labels(y_true, y_pred, output, relevance):
     with conditional_raises(relevance):
         np.testing.assert_equal(relevance(y_true, y_pred), output)
+
+
+def labels(dtype, shape, seed=137):
+    rng = np.random.default_rng(seed)
+    x = rng.integers(0, 50, shape)
+    if dtype == "float":
+        return np.where(x < 3, np.nan, x.astype(float))
+    if dtype == "str":
+        return x.astype(str)
+    if dtype == "object":
+        return np.where(x < 3, None, x).astype(object)
+    return x.astype(dtype)
+
+
+def broadcast(y_true, y_pred):
+    return (y_pred[:, :, None] == y_true[:, None]).any(axis=-1)
+
+
+@pytest.mark.parametrize("dtype", [
+    "int64",
+    "uint8",
+    "bool",
+    "float",
+    "str",
+    "object",
+])
+@pytest.mark.parametrize("n_true", [1, 2, 20, 40])
+@pytest.mark.parametrize("n_samples", [1, 64])
+def test_dispatch(dtype, n_true, n_samples, n_labels=30):
+    y_true = labels(dtype, (n_samples, n_true), seed=1)
+    y_pred = labels(dtype, (64, n_labels), seed=2)
+    np.testing.assert_equal(
+        multilabel(y_true, y_pred),
+        broadcast(y_true, y_pred),
+    )
+
+
+def test_dispatch_mixed_dtypes():
+    y_true = np.arange(40)[None] - 20
+    y_pred = np.array([[2 ** 63, 5, 0]], dtype=np.uint64)
+    np.testing.assert_equal(
+        multilabel(y_true, y_pred),
+        broadcast(y_true, y_pred),
+    )
@@ -0,0 +1,47 @@
+import pytest
+import numpy as np
+
+from irmetrics.retrieval import search, evaluate
+from irmetrics.topk import rr, recall, ndcg, ap
+
+
+@pytest.fixture
+def embeddings(n_queries=50, n_docs=300, n_features=16, seed=137):
+    rng = np.random.default_rng(seed)
+    queries = rng.normal(size=(n_queries, n_features))
+    docs = rng.normal(size=(n_docs, n_features))
+    return queries, docs
+
+
+@pytest.mark.parametrize("query_block", [7, 1024])
+@pytest.mark.parametrize("doc_block", [1, 13, 16384])
+@pytest.mark.parametrize("k", [1, 10])
+def test_search(embeddings, k, query_block, doc_block):
+    queries, docs = embeddings
+    similarities = queries @ docs.T
+    expected = np.argsort(-similarities, axis=-1)[:, :k]
+
+    scores, indices = search(queries, docs, k, query_block, doc_block)
+    np.testing.assert_equal(indices, expected)
+    np.testing.assert_allclose(
+        scores, np.take_along_axis(similarities, expected, axis=-1))
+
+
+def test_search_small_corpus(embeddings):
+    queries, docs = embeddings
+    scores, indices = search(queries, docs[:3], k=10)
+    assert indices.shape == (queries.shape[0], 3)
+
+
+def test_evaluate(embeddings, k=10):
+    queries, docs = embeddings
+    y_true = np.arange(queries.shape[0]).reshape(-1, 1)
+    doc_ids = np.arange(docs.shape[0]) * 2
+
+    results = evaluate(y_true * 2, queries, docs, k, doc_ids=doc_ids,
+                       doc_block=17)
+    y_pred = np.argsort(-queries @ docs.T, axis=-1)[:, :k]
+    measures = {"rr": rr, "recall": recall, "ndcg": ndcg, "ap": ap}
+    assert results.keys() == measures.keys()
+    for name, measure in measures.items():
+        np.testing.assert_equal(results[name], measure(y_true, y_pred, k))
@@ -0,0 +1,95 @@
+import pytest
+import numpy as np
+
+from irmetrics import sampled
+
+
+@pytest.fixture
+def full_ranks(n_queries=100000, n_items=2000, seed=137):
+    rng = np.random.default_rng(seed)
+    return rng.integers(1, n_items + 1, n_queries), n_items
+
+
+def exact(full, k):
+    return {
+        "recall": (full <= k).astype(float),
+        "ndcg": (full <= k) / np.log2(full + 1),
+        "rr": (full <= k) / full,
+    }
+
+
+@pytest.mark.parametrize("method", sampled.METHODS)
+@pytest.mark.parametrize("k", [1, 10])
+def test_exhaustive(full_ranks, method, k):
+    # All negatives are sampled, the estimates are exact
+    full, n_items = full_ranks
+    expected = exact(full, k)
+    for name, values in expected.items():
+        measure = getattr(sampled, name)
+        np.testing.assert_almost_equal(
+            measure(full, 1., k, n_items, method=method), values)
+
+
+@pytest.mark.parametrize("k", [5, 20])
+@pytest.mark.parametrize("rate", [0.01, 0.1])
+def test_adjusted_unbiased(full_ranks, k, rate, seed=137):
+    # The full ranks are uniform, as the prior of the adjusted estimator
+    full, n_items = full_ranks
+    rng = np.random.default_rng(seed)
+    ranks = rng.binomial(full - 1, rate) + 1
+
+    # Compare to the means over all possible full ranks
+    expected = exact(np.arange(1, n_items + 1), k)
+    for name, values in expected.items():
+        measure = getattr(sampled, name)
+        outputs = measure(ranks, rate, k, n_items, block=7)
+        assert np.mean(outputs) == pytest.approx(np.mean(values), rel=0.1)
+
+    # The metrics of the sampled ranks are strongly biased
+    assert np.mean(ranks <= k) > 2 * np.mean(expected["recall"])
+
+
+@pytest.mark.parametrize("n_items", [5, 50, None])
+def test_posterior_normalized(n_items, rate=0.2):
+    # The posterior probabilities of all full ranks sum to 1
+    size = n_items or 2000
+    outputs = sampled.recall(np.arange(1, 6), rate, size, n_items)
+    np.testing.assert_almost_equal(outputs, np.ones(5), decimal=6)
+
+
+def test_ranks():
+    positives = np.array([[0.5, np.nan], [0.9, 0.1]])
+    negatives = np.array([[0.1, 0.7, 0.8], [0.1, 0.2, 0.3]])
+    expected = 1. + np.sum(negatives[:, None] > positives[..., None], -1)
+    expected[0, 1] = np.nan
+    np.testing.assert_equal(sampled.ranks(positives, negatives), expected)
+
+
+def test_padding():
+    ranks = np.array([[1, np.nan], [1, 3]])
+    np.testing.assert_almost_equal(
+        sampled.recall(ranks, 1., 1), [1., 0.5])
+    np.testing.assert_almost_equal(
+        sampled.rr(ranks, 1., n_items=10), [1., 1.])
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"method": "unknown", "k": 1},
+    {"rate": 0., "k": 1},
+    {"k": None},
+])
+def test_raises(kwargs):
+    kwargs = {"rate": 0.5, **kwargs}
+    with pytest.raises(ValueError):
+        sampled.rr([1, 2], **kwargs)
+
+
+@pytest.mark.parametrize("measure", [
+    sampled.recall,
+    sampled.ndcg,
+    sampled.rr,
+])
+@pytest.mark.parametrize("k", [3, 10])
+def test_bounded(measure, k, n_items=5):
+    outputs = measure(np.arange(1, 4), 0.2, k, n_items=n_items)
+    assert np.all((0 <= outputs) & (outputs <= 1 + 1e-12))
@@ -0,0 +1,177 @@
+import json
+import pytest
+import asyncio
+import numpy as np
+
+from irmetrics.service import MetricsService
+from irmetrics.topk import rr, recall
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        "{} {} HTTP/1.1\r\nContent-Length: {}\r\n\r\n".format(
+            method, path, len(body)).encode() + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status, _, content = response.decode().partition("\r\n")
+    return status, json.loads(content.split("\r\n\r\n", 1)[1])
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 256])
+def test_aggregates(inputs, batch_size):
+    async def evaluate():
+        service = MetricsService(batch_size=batch_size, max_delay=0.01)
+        async with service:
+            for y_true, y_pred in inputs:
+                await service.submit(y_true, y_pred)
+            await service.flush()
+        return service.summary()
+
+    summary = run(evaluate())
+    assert summary["count"] == len(inputs)
+    assert summary["errors"] == 0
+    np.testing.assert_almost_equal(
+        summary["rr"], np.mean([rr(*x) for x in inputs]))
+    np.testing.assert_almost_equal(
+        summary["recall"], np.mean([recall(*x) for x in inputs]))
+
+
+def test_back_pressure():
+    async def evaluate():
+        service = MetricsService(max_queue=2)
+        await service.submit(1, [1, 2])
+        await service.submit(1, [2, 1])
+
+        # The queue is full and nothing is evaluated yet
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(service.submit(1, [2, 3]), 0.05)
+
+        async with service:
+            await service.submit(1, [2, 3])
+            await service.flush()
+        return service.summary()
+
+    summary = run(evaluate())
+    assert summary["count"] == 3
+    np.testing.assert_almost_equal(summary["rr"], 0.5)
+
+
+def test_http():
+    async def evaluate():
+        service = MetricsService()
+        server = await service.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            events = [
+                {"y_true": 1, "y_pred": [1, 2]},
+                {"y_true": "a", "y_pred": ["b", "a"]},
+            ]
+            accepted = await request(port, "POST", "/events", events)
+            single = await request(port, "POST", "/events", events[0])
+            invalid = await request(port, "POST", "/events", {"y": 1})
+            missing = await request(port, "GET", "/missing")
+            await service.flush()
+            metrics = await request(port, "GET", "/metrics")
+        finally:
+            server.close()
+            await server.wait_closed()
+            await service.stop()
+        return accepted, single, invalid, missing, metrics
+
+    accepted, single, invalid, missing, metrics = run(evaluate())
+    assert accepted == ("HTTP/1.1 202 Accepted", {"accepted": 2})
+    assert single == ("HTTP/1.1 202 Accepted", {"accepted": 1})
+    assert invalid[0] == "HTTP/1.1 400 Bad Request"
+    assert missing[0] == "HTTP/1.1 404 Not Found"
+    assert metrics[0] == "HTTP/1.1 200 OK"
+    assert metrics[1]["count"] == 3
+    np.testing.assert_almost_equal(metrics[1]["rr"], 5. / 6.)
+
+
+def test_counts_errors():
+    service = MetricsService()
+    service.evaluate([(1, [1, 2]), (1, [[1, 2], [3]])])
+    assert service.summary()["count"] == 1
+    assert service.summary()["errors"] == 1
+
+
+@pytest.mark.parametrize("y_true, y_pred", [
+    (1, {"a": 1}),
+    (None, [1, 2]),
+    (1, 1),
+    (1, []),
+    ({"a": 1}, [1, 2]),
+    (1, [[1, 2], [3, 4]]),
+])
+def test_rejects_malformed(y_true, y_pred):
+    service = MetricsService()
+    service.evaluate([(1, [1, 2]), (y_true, y_pred)])
+    assert service.summary()["count"] == 1
+    assert service.summary()["errors"] == 1
+
+
+def test_survives_failures():
+    def fails(y_true, y_pred, k=None):
+        if y_true.shape[-1] > 1:
+            raise RuntimeError("fails")
+        return np.ones(len(y_pred))
+
+    async def evaluate():
+        async with MetricsService({"fails": fails}, max_delay=0.01) as service:
+            await service.submit([1, 2], [1, 2])
+            await service.submit(1, [1, 2])
+            await asyncio.wait_for(service.flush(), 1)
+            await service.submit(1, [1, 2])
+            await asyncio.wait_for(service.flush(), 1)
+        return service.summary()
+
+    summary = run(evaluate())
+    assert summary["errors"] == 1
+    assert summary["count"] == 2
+
+
+@pytest.mark.parametrize("event", [("x", [0, 1, 2]), (2, ["a", "b", "c"])])
+def test_mixed_dtypes(event):
+    service = MetricsService({"rr": rr})
+    service.evaluate([(1, [0, 1, 2]), event])
+    assert service.summary() == {"count": 2, "errors": 0, "rr": 0.25}
+
+
+class Writer:
+    def __init__(self):
+        self.data, self.closed = b"", False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_disconnects():
+    async def evaluate():
+        reader, writer = asyncio.StreamReader(), Writer()
+        reader.feed_data(
+            b"POST /events HTTP/1.1\r\nContent-Length: 100\r\n\r\n{")
+        reader.feed_eof()
+        await MetricsService().handle(reader, writer)
+        return writer
+
+    writer = run(evaluate())
+    assert writer.closed
+    assert writer.data == b""
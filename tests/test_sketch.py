@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+
+from irmetrics.sketch import QuantileSketch
+from irmetrics.topk import ndcg
+
+
+@pytest.fixture
+def values(n_samples=100000, seed=137):
+    rng = np.random.default_rng(seed)
+    return rng.beta(0.5, 2., n_samples)
+
+
+def assert_ranks(sketch, values, atol=0.02):
+    q = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(q)) / values.size
+    np.testing.assert_allclose(ranks, q, atol=atol)
+
+
+@pytest.mark.parametrize("batch_size", [1000, 100000])
+def test_quantiles(values, batch_size):
+    sketch = QuantileSketch(seed=0)
+    for batch in np.split(values, values.size // batch_size):
+        sketch.update(batch)
+
+    assert sketch.n == values.size
+    assert_ranks(sketch, values)
+
+    # The memory doesn't grow with the number of values
+    assert sum(items.size for items in sketch._levels) < 4 * sketch.k
+
+
+def test_merges(values, n_shards=8):
+    shards = [QuantileSketch(seed=i) for i in range(n_shards)]
+    for shard, batch in zip(shards, np.array_split(values, n_shards)):
+        shard.update(batch)
+
+    merged = QuantileSketch(seed=0)
+    for shard in shards:
+        merged.merge(QuantileSketch.from_bytes(shard.to_bytes()))
+
+    assert merged.n == values.size
+    assert_ranks(merged, values)
+
+
+def test_exact_small_inputs():
+    sketch = QuantileSketch()
+    sketch.update([3., np.nan, 1., 2., 4.])
+    assert sketch.n == 4
+    assert sketch.quantile(0.5) == 2.
+    assert sketch.rank(2.5) == 0.5
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_serializes(values):
+    sketch = QuantileSketch(k=50, seed=0)
+    sketch.update(values[:1000])
+    restored = QuantileSketch.from_bytes(sketch.to_bytes())
+    assert restored.n == sketch.n
+    np.testing.assert_equal(
+        restored.quantile([0.1, 0.5, 0.9]), sketch.quantile([0.1, 0.5, 0.9]))
+
+
+def test_adds_measures(rankings):
+    y_true, y_pred = rankings(n_samples=1000, n_labels=20)
+    y_true = y_true[:, 0]
+
+    sketch = QuantileSketch(measure=ndcg)
+    sketch.add(y_true, y_pred, k=10)
+    expected = ndcg(y_true, y_pred, k=10)
+    expected = np.quantile(expected[~np.isnan(expected)], 0.9)
+    np.testing.assert_allclose(sketch.quantile(0.9), expected, atol=0.05)
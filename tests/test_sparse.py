@@ -0,0 +1,119 @@
+import pytest
+import numpy as np
+
+from scipy.sparse import csr_matrix
+from irmetrics import sparse
+from irmetrics.topk import rr, recall, precision, ndcg, ap, err, rbp
+from irmetrics.topk import dcg_score
+from irmetrics.relevance import multilabel
+
+
+def sparse_multilabel(y_true, y_pred):
+    return csr_matrix(multilabel(y_true, y_pred))
+
+
+@pytest.fixture
+def relevance(n_samples=128, n_labels=40, seed=137):
+    rng = np.random.default_rng(seed)
+    grades = rng.integers(0, 4, (n_samples, n_labels))
+    return grades * (rng.random((n_samples, n_labels)) < 0.1)
+
+
+@pytest.mark.parametrize("k", [None, 1, 5, 100])
+def test_dcg_score(relevance, k):
+    np.testing.assert_almost_equal(
+        dcg_score(csr_matrix(relevance), k),
+        dcg_score(relevance, k),
+    )
+
+
+@pytest.mark.parametrize("k", [None, 1, 5])
+def test_ndcg(relevance, k):
+    top = relevance[:, :k]
+    ideal = np.flip(np.sort(top, axis=-1), axis=-1)
+    expected = dcg_score(top) / dcg_score(ideal)
+    with np.errstate(invalid="ignore"):
+        outputs = sparse.ndcg(csr_matrix(relevance), k)
+    np.testing.assert_almost_equal(outputs, expected)
+
+
+@pytest.mark.parametrize("k", [None, 1, 5])
+def test_rr(relevance, k):
+    top = relevance[:, :k]
+    expected = top.any(-1) / (top.argmax(-1) + 1)
+    outputs = sparse.rr(csr_matrix(relevance), k)
+    np.testing.assert_almost_equal(outputs, expected)
+
+
+@pytest.mark.parametrize("measure", [err, rbp])
+@pytest.mark.parametrize("k", [None, 1, 5])
+def test_cascade(relevance, measure, k):
+    relevance[0, :3] = 3
+
+    def dense(y_true, y_pred):
+        return relevance[:, :y_pred.shape[-1]]
+
+    def csr(y_true, y_pred):
+        return csr_matrix(dense(y_true, y_pred))
+
+    np.testing.assert_almost_equal(
+        measure(relevance, relevance, k, relevance=csr, max_grade=3),
+        measure(relevance, relevance, k, relevance=dense, max_grade=3),
+    )
+
+
+def test_handles_unsorted_duplicates():
+    # Duplicate entries are summed, the same as in `scipy.sparse`
+    matrix = csr_matrix(([1, 1, 1], [3, 1, 3], [0, 3]), shape=(1, 4))
+    np.testing.assert_almost_equal(sparse.rr(matrix), [0.25])
+    np.testing.assert_almost_equal(sparse.dcg(matrix), dcg_score(matrix.A))
+
+
+@pytest.mark.parametrize("measure", [
+    rr,
+    recall,
+    precision,
+    ndcg,
+    ap,
+    err,
+    rbp,
+])
+@pytest.mark.parametrize("k", [None, 2])
+def test_topk_sparse_relevance(cases, measure, k, n_samples=16):
+    for (y_true, y_pred), expected, exception in cases:
+        y_trues = np.tile(np.array(y_true), (n_samples, 1))
+        y_preds = np.tile(np.atleast_2d(y_pred), (n_samples, 1))
+
+        with exception():
+            np.testing.assert_equal(
+                measure(y_trues, y_preds, k, relevance=sparse_multilabel),
+                measure(y_trues, y_preds, k, relevance=multilabel),
+            )
+
+
+def test_recall_padding():
+    outputs = recall([[1, -1]], [[1, 2, -1]], relevance=sparse_multilabel,
+                     pad_token=-1)
+    assert outputs == 1.
+
+
+def test_err_rows_precision(n_hits=100000):
+    # The long row of the large log terms shouldn't affect the next one
+    relevance = np.zeros((2, n_hits))
+    relevance[0] = 60
+    relevance[1, :3] = 1e-6
+    expected = sparse.err(csr_matrix(relevance[1:]), max_grade=60)
+    outputs = sparse.err(csr_matrix(relevance), max_grade=60)
+    np.testing.assert_allclose(outputs[1:], expected, rtol=1e-12)
+
+
+def test_skips_validation_canonical(recwarn):
+    y_pred = np.array([[1, 1, 2]])
+    rr([1], y_pred, relevance=sparse_multilabel)
+    assert not recwarn.list
+
+    def coo(y_true, y_pred):
+        return sparse_multilabel(y_true, y_pred).tocoo()
+
+    with pytest.warns(RuntimeWarning, match="Repeated"):
+        rr([1], y_pred, relevance=coo)
@@ -0,0 +1,111 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from irmetrics.flat import flat
+from irmetrics.store import ResultStore, run_key
+from irmetrics.topk import rr, ndcg, recall
+
+
+@pytest.fixture
+def data(rankings):
+    y_true, y_pred = rankings(n_samples=100, n_labels=20, top=10)
+    return np.arange(y_true.shape[0]), y_true, y_pred
+
+
+def test_evaluates_incrementally(tmp_path, data):
+    ids, y_true, y_pred = data
+    store = ResultStore(tmp_path, recall, k=5)
+    np.testing.assert_equal(
+        store.evaluate(ids[:60], y_true[:60], y_pred[:60]),
+        recall(y_true[:60], y_pred[:60], k=5),
+    )
+
+    # Modify one of the old queries
+    y_pred[0] = y_pred[0, ::-1]
+    store = ResultStore(tmp_path, recall, k=5)
+    np.testing.assert_equal(
+        store.evaluate(ids, y_true, y_pred), recall(y_true, y_pred, k=5))
+    assert store.n_computed == 41
+    assert len(store._shards()) == 2
+
+    stored_ids, values = store.values()
+    np.testing.assert_equal(stored_ids, ids)
+    np.testing.assert_allclose(store.mean(), values.mean())
+    assert store.totals()[1] == ids.size
+
+
+def test_separates_runs(tmp_path, data):
+    ids, y_true, y_pred = data
+    ResultStore(tmp_path, rr).evaluate(ids, y_true, y_pred)
+    store = ResultStore(tmp_path, rr, k=5)
+    store.evaluate(ids, y_true, y_pred)
+    assert store.n_computed == ids.size
+    assert run_key(rr, 5) != run_key(rr)
+
+
+def test_compacts(tmp_path, data):
+    ids, y_true, y_pred = data
+    store = ResultStore(tmp_path, rr)
+    for batch in np.array_split(ids, 4):
+        store.evaluate(batch, y_true[batch], y_pred[batch])
+    store.compact()
+    assert len(store._shards()) == 1
+
+    reopened = ResultStore(tmp_path, rr)
+    np.testing.assert_equal(reopened.values()[1], store.values()[1])
+    reopened.evaluate(ids, y_true, y_pred)
+    assert reopened.n_computed == 0
+
+
+def test_string_ids(tmp_path):
+    store = ResultStore(tmp_path, rr)
+    ids = np.array(["a", "b"], dtype=object)
+    store.evaluate(ids, [1, 2], [[0, 1], [2, 0]])
+    values = ResultStore(tmp_path, rr).evaluate(ids, [1, 2], [[0, 1], [2, 0]])
+    np.testing.assert_equal(values, [0.5, 1.])
+
+
+@pytest.mark.parametrize("measure", [rr, ndcg])
+def test_flat(tmp_path, measure):
+    df = pd.DataFrame({
+        "quid": [1, 1, 2, 2, 3, 3],
+        "rel": [0, 1, 1, 0, 0, 0],
+    })
+    store = ResultStore(tmp_path, measure)
+    pd.testing.assert_series_equal(
+        store.flat(df, "quid", "rel"), flat(df, "quid", "rel", measure))
+
+    df.loc[df["quid"] == 2, "rel"] = [0, 1]
+    df = pd.concat([df, pd.DataFrame({"quid": [4], "rel": [1]})])
+    pd.testing.assert_series_equal(
+        store.flat(df, "quid", "rel"), flat(df, "quid", "rel", measure))
+    assert store.n_computed == 5
+
+
+def test_flat_appended_rows(tmp_path):
+    df = pd.DataFrame({"quid": [1, 2], "rel": [1, 1]})
+    store = ResultStore(tmp_path, recall)
+    store.flat(df, "quid", "rel")
+
+    df = pd.concat([df, pd.DataFrame({"quid": [1, 1], "rel": [0, 0]})])
+    pd.testing.assert_series_equal(
+        store.flat(df, "quid", "rel"), flat(df, "quid", "rel", recall))
+    assert store.n_computed == 3
+
+
+def test_broadcasts_y_true(tmp_path, data):
+    ids, _, y_pred = data
+    store = ResultStore(tmp_path, rr)
+    np.testing.assert_equal(store.evaluate(ids, 1, y_pred), rr(1, y_pred))
+
+
+def test_merges_updates(tmp_path):
+    store = ResultStore(tmp_path, rr)
+    store.update([5, 1, 3], [0, 0, 0], [1., 2., 3.])
+    store.update([4, 3, 0], [0, 1, 0], [4., 5., np.nan])
+    ids, values = store.values()
+    np.testing.assert_equal(ids, [0, 1, 3, 4, 5])
+    np.testing.assert_equal(values, [np.nan, 2., 5., 4., 1.])
+    assert store.totals() == (12., 4)
+    np.testing.assert_equal(ResultStore(tmp_path, rr).values()[1], values)
@@ -0,0 +1,104 @@
+import pytest
+import numpy as np
+
+from irmetrics.topk import rr, recall, precision, ndcg, ap, err, rbp
+from irmetrics import systems
+from irmetrics.systems import Qrels, evaluate
+from irmetrics.relevance import multilabel
+
+
+@pytest.fixture
+def data(rankings):
+    return rankings(
+        n_samples=64, n_labels=30, n_true=3, top=10, n_systems=5)
+
+
+@pytest.fixture(params=[False, True], ids=["compared", "indexed"])
+def indexed(request, monkeypatch):
+    # The index is used only for many true labels
+    if request.param:
+        monkeypatch.setattr(systems, "SMALL_N_TRUE", 0)
+    return request.param
+
+
+@pytest.mark.parametrize("measure", [
+    rr,
+    recall,
+    precision,
+    ndcg,
+    ap,
+    err,
+    rbp,
+])
+@pytest.mark.parametrize("k", [None, 2, 5])
+@pytest.mark.parametrize("block", [1, 2, 8])
+def test_evaluate(data, measure, k, block, indexed):
+    y_true, runs = data
+    expected = np.stack([measure(y_true, run, k) for run in runs])
+    outputs = evaluate(y_true, runs, measure, k, block=block)
+    np.testing.assert_almost_equal(outputs, expected)
+
+    # Iterables are consumed block by block
+    outputs = evaluate(y_true, iter(runs), measure, k, block=block)
+    np.testing.assert_almost_equal(outputs, expected)
+
+
+@pytest.mark.parametrize("table_size", [0, 2 ** 24])
+@pytest.mark.parametrize("dtype", [int, float, str, object])
+def test_relevance(data, dtype, table_size, monkeypatch, indexed):
+    monkeypatch.setattr(systems, "MAX_TABLE_SIZE", table_size)
+    y_true, runs = data
+    y_true, runs = y_true.astype(dtype), runs.astype(dtype)
+    y_true[0, 0] = y_true[0, 1]
+
+    qrels = Qrels(y_true)
+    assert (qrels.keys is not None) == (indexed and dtype is not object)
+    y_trues = np.tile(y_true, (runs.shape[0], 1))
+    y_preds = runs.reshape(-1, runs.shape[-1])
+    np.testing.assert_equal(
+        qrels.relevance(y_trues, y_preds),
+        multilabel(y_trues, y_preds),
+    )
+
+
+@pytest.mark.parametrize("table_size", [0, 2 ** 24])
+def test_relevance_nan(table_size, monkeypatch, indexed):
+    monkeypatch.setattr(systems, "MAX_TABLE_SIZE", table_size)
+    qrels = Qrels([[1., np.nan], [2., 3.]])
+    y_pred = np.array([[np.nan, 1., 5.], [3., np.nan, 2.]])
+    np.testing.assert_equal(
+        qrels.relevance(qrels.y_true, y_pred),
+        multilabel(qrels.y_true, y_pred),
+    )
+
+
+def test_reuses_qrels(data):
+    y_true, runs = data
+    qrels = Qrels(y_true)
+    np.testing.assert_equal(
+        evaluate(qrels, runs, rr),
+        evaluate(y_true, runs, rr),
+    )
+
+
+@pytest.mark.parametrize("measure", [rr, ndcg, recall])
+def test_evaluate_dedup(data, measure, indexed):
+    y_true, runs = data
+    runs = runs.copy()
+    runs[:, ::2] = runs[:, :1]
+    y_true[::2] = y_true[:1]
+    np.testing.assert_almost_equal(
+        evaluate(y_true, runs, measure, dedup=True),
+        evaluate(y_true, runs, measure),
+    )
+
+
+@pytest.mark.parametrize("table_size", [0, 2 ** 24])
+def test_relevance_large_labels(table_size, monkeypatch, indexed):
+    monkeypatch.setattr(systems, "MAX_TABLE_SIZE", table_size)
+    qrels = Qrels([[-2 ** 62, 2 ** 62]])
+    y_pred = np.array([[2 ** 62, 0, -2 ** 62, 2 ** 63 - 1]])
+    np.testing.assert_equal(
+        qrels.relevance(qrels.y_true, y_pred),
+        [[True, False, True, False]],
+    )
@@ -0,0 +1,102 @@
+import pytest
+import itertools
+import numpy as np
+
+from irmetrics import ties, topk
+
+
+@pytest.fixture
+def data(n_samples=40, n_labels=6, seed=137):
+    rng = np.random.default_rng(seed)
+    grades = rng.integers(0, 3, (n_samples, n_labels))
+    grades[:, 0] = 1  # every row has relevant items
+    scores = rng.integers(0, 3, (n_samples, n_labels)).astype(float)
+    return grades, scores
+
+
+def orders(scores):
+    # All rankings that differ only by the order of ties
+    values = np.unique(scores)[::-1]
+    groups = [np.flatnonzero(scores == v) for v in values]
+    for order in itertools.product(*map(itertools.permutations, groups)):
+        yield np.concatenate(order)
+
+
+def ndcg(row, order, k):
+    ideal = np.flip(np.sort(row))
+    return topk.dcg_score(row[order], k) / topk.dcg_score(ideal, k)
+
+
+def ap(row, order, k):
+    # The same normalization as in `topk.ap`, without truncating y_true
+    relevant = row[order][:k] > 0
+    precisions = np.cumsum(relevant) / np.arange(1, relevant.size + 1)
+    n_iter = min(relevant.size, np.count_nonzero(row))
+    return np.sum((precisions * relevant)[:n_iter]) / relevant.size
+
+
+def bruteforce(measure, grades, scores, k):
+    outputs = []
+    for row, score in zip(grades, scores):
+        # The labels define the shapes only, the judgements are in `row`
+        labels = np.flatnonzero(row)
+        judgements = row == row.max() if measure is topk.rr else row > 0
+
+        def relevance(y_true, y_pred):
+            return judgements[y_pred]
+
+        values = []
+        for order in orders(score):
+            if measure in (ndcg, ap):
+                values.append(measure(row, order, k))
+            elif measure is topk.recall:
+                values.append(measure(labels, order[:k], relevance=relevance))
+            else:
+                values.append(measure(labels, order, k, relevance=relevance))
+        outputs.append(np.mean(values))
+    return outputs
+
+
+REFERENCES = {
+    "rr": topk.rr,
+    "recall": topk.recall,
+    "precision": topk.precision,
+    "ndcg": ndcg,
+    "ap": ap,
+}
+
+
+@pytest.mark.parametrize("measure", [
+    "rr",
+    "recall",
+    "precision",
+    "ndcg",
+    "ap",
+])
+@pytest.mark.parametrize("k", [None, 1, 3])
+def test_expected_over_permutations(data, measure, k):
+    grades, scores = data
+    np.testing.assert_almost_equal(
+        getattr(ties, measure)(grades, scores, k),
+        bruteforce(REFERENCES[measure], grades, scores, k),
+    )
+
+
+@pytest.mark.parametrize("measure", REFERENCES)
+def test_matches_topk_without_ties(data, measure, k=4):
+    grades, _ = data
+    scores = np.random.default_rng(0).random(grades.shape)
+    np.testing.assert_almost_equal(
+        getattr(ties, measure)(grades, scores, k),
+        bruteforce(REFERENCES[measure], grades, scores, k),
+    )
+
+
+def test_groups():
+    groups = ties.ties([[0, 1, 2, 0]], [[0.1, 0.5, 0.5, 0.5]])
+    np.testing.assert_equal(groups.relevance, [[1, 2, 0, 0]])
+    np.testing.assert_equal(groups.size, [[3, 3, 3, 1]])
+    np.testing.assert_equal(groups.offset, [[0, 1, 2, 0]])
+    np.testing.assert_equal(groups.count, [[2, 2, 2, 0]])
+    np.testing.assert_equal(groups.before, [[0, 0, 0, 2]])
+    np.testing.assert_almost_equal(groups.gains, [[4 / 3] * 3 + [0]])
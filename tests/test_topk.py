@@ -1,21 +1,18 @@
 import pytest
 import numpy as np
 
-from irmetrics.topk import rr, recall, precision, ndcg, ap
+from irmetrics.topk import rr, recall, precision, ndcg, ap, err, rbp
 from irmetrics.relevance import unilabel, multilabel
 
 
-@pytest.fixture
-def cases(inputs, expected, exceptions):
-    return zip(inputs, expected, exceptions)
-
-
 @pytest.mark.parametrize("measure", [
     rr,
     recall,
     precision,
     ndcg,
     ap,
+    err,
+    rbp,
 ])
 @pytest.mark.parametrize("relevance", [
     unilabel,
@@ -36,6 +33,8 @@ def test_all(cases, measure, relevance):
     precision,
     ndcg,
     ap,
+    err,
+    rbp,
 ])
 @pytest.mark.parametrize("relevance", [
     unilabel,
@@ -76,3 +75,80 @@ def test_recall_padding(cases, measure, relevance, pad_token):
                 ),
                 expected
             )
+
+
+@pytest.mark.parametrize("y_true, y_pred, pad_token, expected", [
+    ([1, -1], [1, 2, -1], -1, 1.),
+    ([1, 2], [1, 3, -1], -1, .5),
+    ([[1, -1], [1, 2]], [[1, -1, -1], [2, 3, -1]], -1, [1., .5]),
+    ([1., np.nan], [1., 2., np.nan], np.nan, 1.),
+    (["a", ""], ["a", "b", ""], "", 1.),
+])
+def test_recall_sentinel_padding(y_true, y_pred, pad_token, expected):
+    np.testing.assert_equal(
+        recall(y_true, y_pred, pad_token=pad_token),
+        expected,
+    )
+
+
+@pytest.mark.parametrize("measure", [err, rbp])
+def test_cascade_graded(measure, n_samples=64, n_labels=10, seed=137):
+    rng = np.random.default_rng(seed)
+    grades = rng.integers(0, 4, (n_samples, n_labels))
+
+    def graded(y_true, y_pred):
+        return grades
+
+    outputs = measure(grades, grades, relevance=graded, max_grade=3)
+    expected = []
+    for row in grades:
+        if measure is err:
+            stop, value = (2. ** row - 1) / 2. ** 3, 0.
+            for rank, p in enumerate(stop):
+                value += np.prod(1 - stop[:rank]) * p / (rank + 1)
+        else:
+            value = sum(.2 * g / 3 * .8 ** i for i, g in enumerate(row))
+        expected.append(value)
+    np.testing.assert_almost_equal(outputs, expected)
+
+
+@pytest.mark.parametrize("measure", [err, rbp])
+def test_cascade_default_grade(measure):
+    grades = np.array([[1, 0, 0], [3, 0, 0]])
+
+    def graded(y_true, y_pred):
+        return grades[:y_pred.shape[0]]
+
+    # The values of a query don't depend on the other queries
+    outputs = measure(grades, grades, relevance=graded)
+    assert outputs[0] == measure(grades[:1], grades[:1], relevance=graded)
+    # The grades above max_grade are clipped
+    assert outputs[0] == outputs[1]
+
+
+@pytest.mark.parametrize("measure", [
+    rr,
+    recall,
+    precision,
+    ndcg,
+    ap,
+    err,
+    rbp,
+])
+@pytest.mark.parametrize("dtype", [int, object])
+def test_dedup(measure, dtype, n_samples=256, seed=137):
+    rng = np.random.default_rng(seed)
+    rankings = np.array([[0, 1, 2, 3], [3, 2, 1, 0], [1, 0, 3, 2]])
+    y_true = rng.integers(0, 4, (n_samples, 1)).astype(dtype)
+    y_pred = rankings[rng.integers(0, 3, n_samples)].astype(dtype)
+
+    expected = measure(y_true, y_pred, 3)
+    np.testing.assert_almost_equal(
+        measure(y_true, y_pred, 3, dedup=True), expected)
+    np.testing.assert_almost_equal(
+        measure(y_true, y_pred, 3, dedup="mean"), np.mean(expected, -1))
+
+
+def test_dedup_raises():
+    with pytest.raises(ValueError):
+        rr(1, [0, 1], dedup="median")